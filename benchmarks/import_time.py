@@ -0,0 +1,53 @@
+"""Cold-start time of the eda package.
+
+Every statement runs in a fresh interpreter and the median wall-clock time
+of `--repeat` runs is reported, minus the start-up time of a bare
+interpreter. To compare two revisions, run it from a checkout of each::
+
+    $ python benchmarks/import_time.py
+    $ git stash && python benchmarks/import_time.py && git stash pop
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+STATEMENTS = {
+    "import eda": "import eda",
+    "english import": "from eda import eda_english",
+    "english first sentence": "from eda import eda_english; eda_english('the quick brown fox jumps over the lazy dog')",
+    "japanese import": "from eda import eda_japanese",
+    "japanese first sentence": (
+        "from eda import eda_japanese, get_tokenizer, get_synonym_extractor; "
+        "tokenizer = get_tokenizer('sudachi'); "
+        "eda_japanese('日本語の文章をテストします。', tokenizer, get_synonym_extractor('sudachi', tokenizer))"
+    ),
+}
+
+
+def run_time(python: str, statement: str, repeat: int) -> float:
+    """Median seconds to run `statement` in a new interpreter."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([python, "-c", statement], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure the cold-start time of the eda package.")
+    ap.add_argument("--python", type=str, default=sys.executable, help="python interpreter to measure")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per statement")
+    args = ap.parse_args()
+
+    baseline = run_time(args.python, "pass", args.repeat)
+    print(f"{'interpreter start-up':<26}{baseline * 1000:8.0f} ms")
+    for name, statement in STATEMENTS.items():
+        elapsed = run_time(args.python, statement, args.repeat) - baseline
+        print(f"{name:<26}{elapsed * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
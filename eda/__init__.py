@@ -1,8 +1,74 @@
-from .eda import eda as eda_english
-from .eda_japanese import eda_ja as eda_japanese
-from .tokenizer import get_tokenizer
-from .synonym_extractor import get_synonym_extractor
+import importlib
+import sys
+import types
+from typing import TYPE_CHECKING
 
 version = "1.1.2"
 
-__all__ = ["eda_english", "eda_japanese", "get_tokenizer", "get_synonym_extractor"]
+# Public name -> (module, attribute). The modules are only imported on first
+# access, so `import eda` does not load spaCy, fugashi, SudachiPy or requests
+# for users who never touch them.
+_LAZY_ATTRIBUTES = {
+    "eda_english": (".eda", "eda"),
+    "eda_english_batch": (".eda", "eda_batch"),
+    "eda_english_grid": (".eda", "eda_grid_batch"),
+    "eda_japanese_batch": (".eda_japanese", "eda_ja_batch"),
+    "eda_japanese_grid": (".eda_japanese", "eda_ja_grid_batch"),
+    "GridConfig": (".planner", "GridConfig"),
+    "EDAAugmenter": (".augmenter", "EDAAugmenter"),
+    "get_tokenizer": (".tokenizer", "get_tokenizer"),
+    "get_synonym_extractor": (".synonym_extractor", "get_synonym_extractor"),
+}
+
+__all__ = [
+    "eda_english",
+    "eda_english_batch",
+    "eda_japanese",
+    "eda_japanese_batch",
+    "eda_english_grid",
+    "eda_japanese_grid",
+    "GridConfig",
+    "EDAAugmenter",
+    "get_tokenizer",
+    "get_synonym_extractor",
+]
+
+
+def __getattr__(name: str):
+    try:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {"eda_japanese"})
+
+
+class _Package(types.ModuleType):
+    # `eda_japanese` names both the `eda.eda_japanese` submodule and the public
+    # alias of `eda_ja`. Importing the submodule sets the package attribute to
+    # the module, so the alias lives in a property that ignores that.
+    @property
+    def eda_japanese(self):
+        from .eda_japanese import eda_ja
+        return eda_ja
+
+    @eda_japanese.setter
+    def eda_japanese(self, module):
+        pass
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+if TYPE_CHECKING:
+    from .eda import eda as eda_english, eda_batch as eda_english_batch, eda_grid_batch as eda_english_grid
+    from .eda_japanese import eda_ja as eda_japanese, eda_ja_batch as eda_japanese_batch, eda_ja_grid_batch as eda_japanese_grid
+    from .planner import GridConfig
+    from .augmenter import EDAAugmenter
+    from .tokenizer import get_tokenizer
+    from .synonym_extractor import get_synonym_extractor
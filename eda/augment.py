@@ -1,66 +1,235 @@
 # Easy data augmentation techniques for text classification
 # Jason Wei and Kai Zou
+import collections
+import contextlib
 import functools
+import inspect
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
 
-from .eda import eda as eda_en
-from .eda_japanese import eda_ja
+from .cache import DEFAULT_CACHE_SIZE
+from .eda import build_synonym_map, eda_batch as eda_en_batch, eda_grid_batch as eda_en_grid_batch, get_techniques, synonym_cache
+from .eda_japanese import build_ja_synonym_map, eda_ja_batch, eda_ja_grid_batch, get_only_chars
+from .formats import FORMATS, AugmentedRecord, is_resumable_output, open_writer, read_chunks
+from .planner import nested_counts, parse_grid_config, plan_augmentation
+from .synonym_map import is_up_to_date, load_synonym_map, save_synonym_map, synonym_backend, synonym_map_path
 from .tokenizer import get_tokenizer
 from .synonym_extractor import get_synonym_extractor
 
 #arguments to be parsed from command line
 import argparse
 ap = argparse.ArgumentParser()
-ap.add_argument("--input", required=True, type=str, help="input file of unaugmented data")
-ap.add_argument("--output", required=False, type=str, help="output file of unaugmented data")
+ap.add_argument("--input", required=True, type=str, help="input file of unaugmented data ('-' for stdin); .tsv, .jsonl (optionally .gz / .zst), .parquet or .arrow")
+ap.add_argument("--output", required=False, type=str, help="output file of unaugmented data ('-' for stdout); .tsv, .jsonl (optionally .gz / .zst), .parquet or .arrow")
 ap.add_argument("--num_aug", required=False, type=int, help="number of augmented sentences per original sentence")
 ap.add_argument("--alpha_sr", required=False, type=float, help="percent of words in each sentence to be replaced by synonyms")
 ap.add_argument("--alpha_ri", required=False, type=float, help="percent of words in each sentence to be inserted")
 ap.add_argument("--alpha_rs", required=False, type=float, help="percent of words in each sentence to be swapped")
 ap.add_argument("--alpha_rd", required=False, type=float, help="percent of words in each sentence to be deleted")
 ap.add_argument("--add_original", action="store_true", help="whether to add original sentence in augmented data")
+ap.add_argument("--batch_size", required=False, type=int, help="number of sentences augmented together", default=1000)
+ap.add_argument("--interned", action="store_true", help="augment integer-interned word ids instead of strings")
+ap.add_argument("--vectorized", action="store_true", help="draw random swaps and deletions for whole batches with numpy")
+ap.add_argument("--synonym_cache_size", required=False, type=int, help="number of words whose synonyms are cached (0 disables the cache)", default=DEFAULT_CACHE_SIZE)
 # For Japanese
 ap.add_argument("--lang", required=False, type=str, help="language", default="en", choices=["en", "ja"])
 ap.add_argument("--tokenizer", required=False, type=str, help="tokenizer to use", default="sudachi")
 ap.add_argument("--mecab-dict", required=False, type=str, help="mecab dictionary to use", default="ipadic")
 ap.add_argument("--synonym_extractor", required=False, type=str, help="synonym extractor to use", default="sudachi")
+ap.add_argument("--conceptnet_url", required=False, type=str, help="ConceptNet API server to query", default=None)
+ap.add_argument("--conceptnet_cache", required=False, type=str, help="SQLite file that keeps ConceptNet synonyms between runs", default=None)
+ap.add_argument("--conceptnet_offline", action="store_true", help="only use the synonyms in --conceptnet_cache, without querying ConceptNet")
+ap.add_argument("--conceptnet_prefetch", action="store_true", help="look up the ConceptNet synonyms of every word of the input before augmenting")
+ap.add_argument("--conceptnet_concurrency", required=False, type=int, help="maximum number of concurrent ConceptNet requests", default=8)
 
-args = ap.parse_args()
+ap.add_argument("--workers", required=False, type=int, help="number of worker processes", default=1)
+ap.add_argument("--seed", required=False, type=int, help="random seed; every input line gets a random generator seeded from it and its line id", default=1)
+ap.add_argument("--first_line_id", required=False, type=int, help="line id of the first input line, so that a shard of a corpus is augmented like in a run over the whole corpus", default=0)
+ap.add_argument("--checkpoint_every", required=False, type=int, help="write a checkpoint to <output>.ckpt every N chunks (0 disables checkpoints)", default=0)
+ap.add_argument("--resume", action="store_true", help="continue from the checkpoint of an interrupted run")
+ap.add_argument("--input_format", required=False, type=str, help="input format (detected from the file extension by default)", choices=FORMATS)
+ap.add_argument("--output_format", required=False, type=str, help="output format (detected from the file extension by default)", choices=FORMATS)
+ap.add_argument("--nested_num_aug", required=False, type=float, nargs="+", help="numbers of augmented sentences (e.g. 0.5 1 2 4) written as nested subsets of one augmentation pass, one output per number")
+ap.add_argument("--two_pass", action="store_true", help="look up the synonyms of the input vocabulary in a first pass and save them next to the output, to be reused by later runs")
+ap.add_argument("--synonym_map", required=False, type=str, help="file of the synonym map of --two_pass (<input>.<backend>.synonyms.bin next to the output by default)")
+ap.add_argument("--grid", required=False, type=parse_grid_config, nargs="+", help="single-technique configurations technique:alpha:num_aug (e.g. sr:0.1:16) augmented in one pass, one output per configuration")
 
-#the output file
-output = None
-if args.output:
-    output = args.output
-else:
-    from os.path import dirname, basename, join
-    output = join(dirname(args.input), 'eda_' + basename(args.input))
+#build the batch augmentation function of a language, loading its tokenizer and synonym resources
+def build_eda_func(
+    lang="en",
+    tokenizer="sudachi",
+    mecab_dict="ipadic",
+    synonym_extractor="sudachi",
+    synonym_cache_size=DEFAULT_CACHE_SIZE,
+    interned=False,
+    vectorized=False,
+    grid=False,
+    synonym_extractor_options=None,
+    synonym_map_path=None,
+):
+    """Return the batch augmentation function of `lang` and its synonym cache (or None).
 
-#number of augmented sentences to generate per original sentence
-num_aug = 9 #default
-if args.num_aug:
-    num_aug = args.num_aug
+    With `grid`, the function augments a batch with a grid of configurations
+    instead (see `eda_grid_batch`), and `vectorized` does not apply.
+    `synonym_extractor_options` are passed on to the Japanese synonym extractor,
+    and the synonyms of the map at `synonym_map_path` are used instead of
+    looking them up (see `synonym_map.py`).
+    """
+    synonym_map = None
+    if synonym_map_path is not None:
+        synonym_map = load_synonym_map(synonym_map_path, lang, synonym_backend(lang, tokenizer, mecab_dict, synonym_extractor))
+    if lang == "en":
+        synonym_cache.resize(synonym_cache_size)
+        if grid:
+            return functools.partial(eda_en_grid_batch, interned=interned, synonym_map=synonym_map), synonym_cache
+        eda_func = functools.partial(eda_en_batch, interned=interned, vectorized=vectorized, synonym_map=synonym_map)
+        eda_func.eda_settings = eda_settings(lang, tokenizer, mecab_dict, synonym_extractor, interned, vectorized)
+        return eda_func, synonym_cache
+    elif lang == "ja":
+        ja_tokenizer = get_tokenizer(tokenizer, mecab_dict)
+        extractor = get_synonym_extractor(
+            synonym_extractor, ja_tokenizer, cache_size=synonym_cache_size, **(synonym_extractor_options or {}),
+        )
+        if grid:
+            eda_func = functools.partial(
+                eda_ja_grid_batch, tokenizer=ja_tokenizer, synonym_extractor=extractor, interned=interned, synonym_map=synonym_map,
+            )
+            return eda_func, getattr(extractor, "cache", None)
+        eda_func = functools.partial(
+            eda_ja_batch,
+            tokenizer=ja_tokenizer,
+            synonym_extractor=extractor,
+            interned=interned,
+            vectorized=vectorized,
+            synonym_map=synonym_map,
+        )
+        eda_func.eda_settings = eda_settings(lang, tokenizer, mecab_dict, synonym_extractor, interned, vectorized)
+        return eda_func, getattr(extractor, "cache", None)
+    else:
+        raise ValueError("Invalid language.")
+
+#the options of build_eda_func that change the augmented output, recorded in checkpoints
+#so that a run is not resumed with a different language, tokenizer or engine
+def eda_settings(lang, tokenizer, mecab_dict, synonym_extractor, interned, vectorized):
+    settings = dict(lang=lang, interned=interned, vectorized=vectorized)
+    if lang == 'ja':
+        settings.update(tokenizer=tokenizer, mecab_dict=mecab_dict, synonym_extractor=synonym_extractor)
+    return settings
+
+#eda_settings of the keyword arguments of build_eda_func
+def eda_config_settings(eda_config):
+    arguments = inspect.signature(build_eda_func).bind(**eda_config)
+    arguments.apply_defaults()
+    return eda_settings(*(arguments.arguments[name] for name in ['lang', 'tokenizer', 'mecab_dict', 'synonym_extractor', 'interned', 'vectorized']))
+
+#augment a chunk of (label, sentence) records into AugmentedRecords, which also
+#hold the id of their input line and their technique ('orig' for the original sentence)
+#with a seed every record is augmented with its own random generator (see record_rngs),
+#otherwise the global random module is used
+def augment_records(eda_func, records, first_line_id, alpha_sr, alpha_ri, alpha_rs, alpha_rd, num_aug, seed=None):
+    #the techniques are planned here so that they are known for every output sentence
+    techniques = get_techniques(alpha_sr, alpha_ri, alpha_rs, alpha_rd)
+    rng_args = rng_kwargs(seed, first_line_id, len(records))
+    plans = [plan_augmentation(techniques, num_aug, rng) for rng in rng_args.get('rngs', [random] * len(records))]
+    aug_batch = eda_func([record.sentence for record in records], alpha_sr=alpha_sr, alpha_ri=alpha_ri, alpha_rs=alpha_rs, p_rd=alpha_rd, num_aug=num_aug, plans=plans, **rng_args)
+    output_records = []
+    for line_id, record, plan, aug_sentences in zip(itertools.count(first_line_id), records, plans, aug_batch):
+        for technique, aug_sentence in zip(itertools.chain(plan, ['orig']), aug_sentences):
+            output_records.append(AugmentedRecord(line_id, record.label, aug_sentence, technique))
+    return output_records
+
+#tokenize the whole input and look up the synonyms of its distinct words up front,
+#so that augmentation only does local lookups (see ConceptNetSynonymExtractor.prefetch)
+def prefetch_synonyms(eda_func, train_orig, batch_size=1000, input_format=None):
+    tokenizer = eda_func.keywords['tokenizer']
+    synonym_extractor = eda_func.keywords['synonym_extractor']
+    vocabulary = set()
+    for records, _ in read_chunks(train_orig, batch_size, format=input_format):
+        for words in tokenizer.tokenize_batch([get_only_chars(record.sentence) for record in records]):
+            vocabulary.update(words)
+    synonym_extractor.prefetch(vocabulary)
+    return len(vocabulary)
+
+#first pass of the two-pass mode: look up the synonyms of the input vocabulary with
+#the tokenizer and synonym resources of eda_func and save them to path, with the backend they come from
+def build_input_synonym_map(eda_func, lang, train_orig, path, backend, batch_size=1000, input_format=None):
+    sentences = (record.sentence for records, _ in read_chunks(train_orig, batch_size, format=input_format) for record in records)
+    if lang == "en":
+        synonym_map = build_synonym_map(sentences)
+    else:
+        synonym_map = build_ja_synonym_map(sentences, eda_func.keywords['tokenizer'], eda_func.keywords['synonym_extractor'], batch_size)
+    save_synonym_map(path, synonym_map, lang, backend)
+    return len(synonym_map)
+
+#status messages go to stderr when the augmented data is written to stdout
+def log(message, output_file):
+    print(message, file=sys.stderr if output_file == '-' else sys.stdout)
+
+#every input line gets its own random generator, derived from the seed and its line id, so the
+#output does not depend on the batch size or on how lines are spread over processes and machines
+#(string seeds are hashed with sha512, so they are the same in every process and on every platform)
+def record_rngs(seed, first_line_id, num_records):
+    return [random.Random(str(seed) + ":" + str(line_id)) for line_id in range(first_line_id, first_line_id + num_records)]
 
-#how much to replace each word by synonyms
-alpha_sr = 0.1#default
-if args.alpha_sr is not None:
-    alpha_sr = args.alpha_sr
+#keyword arguments of the random generators of a chunk for a batch function, none without a seed
+def rng_kwargs(seed, first_line_id, num_records):
+    if seed is None:
+        return {}
+    return dict(rngs=record_rngs(seed, first_line_id, num_records))
 
-#how much to insert new words that are synonyms
-alpha_ri = 0.1#default
-if args.alpha_ri is not None:
-    alpha_ri = args.alpha_ri
+#a checkpoint records how far a run got: the next chunk, the input and output
+#offsets after the previous one and the random state
+def checkpoint_path(output_file):
+    return output_file + '.ckpt'
 
-#how much to swap words
-alpha_rs = 0.1#default
-if args.alpha_rs is not None:
-    alpha_rs = args.alpha_rs
+def save_checkpoint(output_file, writer, settings, chunk_index, input_offset):
+    #the output has to be on disk before the checkpoint that points past it
+    output_offset = writer.sync()
+    state = dict(
+        settings=settings,
+        chunk_index=chunk_index,
+        input_offset=input_offset,
+        output_offset=output_offset,
+        random_state=random.getstate(),
+    )
+    path = checkpoint_path(output_file)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+def load_checkpoint(output_file, settings):
+    """Return the checkpoint of `output_file`, or None if there is none."""
+    path = checkpoint_path(output_file)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state['settings'] != settings:
+        raise ValueError(path + " was written with different settings: " + str(state['settings']))
+    version, internal_state, gauss_next = state['random_state']
+    state['random_state'] = (version, tuple(internal_state), gauss_next)
+    return state
 
-#how much to delete words
-alpha_rd = 0.1#default
-if args.alpha_rd is not None:
-    alpha_rd = args.alpha_rd
+#where a run starts: from scratch, or from the checkpoint of an interrupted run
+def start_state(train_orig, output_file, settings, checkpoint_every, resume):
+    if (checkpoint_every or resume) and (train_orig == '-' or not is_resumable_output(output_file, settings['output_format'])):
+        raise ValueError("checkpoints need an input file and an uncompressed tsv or jsonl output file")
+    state = load_checkpoint(output_file, settings) if resume else None
+    if state is None:
+        #the output is rewritten, so an older checkpoint no longer matches it
+        remove_checkpoint(output_file)
+        return dict(chunk_index=0, input_offset=0, output_offset=None)
+    random.setstate(state['random_state'])
+    return state
 
-if alpha_sr == alpha_ri == alpha_rs == alpha_rd == 0:
-     ap.error('At least one alpha should be greater than zero')
+def remove_checkpoint(output_file):
+    if output_file != '-' and os.path.isfile(checkpoint_path(output_file)):
+        os.remove(checkpoint_path(output_file))
 
 #generate more data with standard augmentation
 def gen_eda(
@@ -72,45 +241,386 @@ def gen_eda(
     alpha_rs,
     alpha_rd,
     num_aug=9,
+    batch_size=1000,
+    seed=None,
+    checkpoint_every=0,
+    resume=False,
+    input_format=None,
+    output_format=None,
+    first_line_id=0,
 ) -> None:
+    """Augment `train_orig` with `eda_func`, a batch function such as `eda_english_batch`.
 
-    writer = open(output_file, 'w')
-    lines = open(train_orig, 'r').readlines()
+    The input is streamed in chunks of `batch_size` lines and the output of
+    each chunk is written at once, so memory stays bounded by the chunk size.
+    Every `checkpoint_every` chunks a checkpoint is written next to the
+    output, and with `resume` an interrupted run continues from it with the
+    same output as an uninterrupted run; the settings of the run, including
+    the options `eda_func` was built with (see `eda_settings`), have to be
+    the same. The input and output formats are
+    detected from the file extensions unless given (see `formats.py`).
+    With a `seed`, every line is augmented with a random generator derived
+    from the seed and its line id (see `record_rngs`), so the output does
+    not depend on `batch_size`. The lines of `train_orig` get the ids
+    `first_line_id`, `first_line_id + 1`, ..., so a shard of a corpus that
+    starts at line `first_line_id` is augmented like in a run over the whole
+    corpus.
+    """
+    settings = dict(input=train_orig, alpha_sr=alpha_sr, alpha_ri=alpha_ri, alpha_rs=alpha_rs, alpha_rd=alpha_rd, num_aug=num_aug, batch_size=batch_size, seed=seed, input_format=input_format, output_format=output_format, first_line_id=first_line_id, eda=getattr(eda_func, 'eda_settings', None))
+    state = start_state(train_orig, output_file, settings, checkpoint_every, resume)
+    chunks = read_chunks(train_orig, batch_size, state['input_offset'], input_format)
 
-    for i, line in enumerate(lines):
-        parts = line[:-1].split('\t')
-        label = parts[0]
-        sentence = parts[1]
-        aug_sentences = eda_func(sentence, alpha_sr=alpha_sr, alpha_ri=alpha_ri, alpha_rs=alpha_rs, p_rd=alpha_rd, num_aug=num_aug)
-        for aug_sentence in aug_sentences:
-            writer.write(label + "\t" + aug_sentence + '\n')
+    with open_writer(output_file, output_format, state['output_offset']) as writer:
+        for chunk_index, (records, input_offset) in enumerate(chunks, state['chunk_index']):
+            writer.write(augment_records(eda_func, records, first_line_id + chunk_index * batch_size, alpha_sr, alpha_ri, alpha_rs, alpha_rd, num_aug, seed))
+            if checkpoint_every and (chunk_index + 1) % checkpoint_every == 0:
+                save_checkpoint(output_file, writer, settings, chunk_index + 1, input_offset)
 
-    writer.close()
-    print("generated augmented sentences with eda for " + train_orig + " to " + output_file + " with num_aug=" + str(num_aug))
+    remove_checkpoint(output_file)
 
-#main function
-if __name__ == "__main__":
+    log("generated augmented sentences with eda for " + train_orig + " to " + output_file + " with num_aug=" + str(num_aug), output_file)
 
-    if args.lang == "en":
-        eda_func = eda_en
-    elif args.lang == "ja":
-        tokenizer = get_tokenizer(args.tokenizer, args.mecab_dict)
-        extractor = get_synonym_extractor(args.synonym_extractor, tokenizer)
-        eda_func = functools.partial(
-            eda_ja,
-            tokenizer=tokenizer,
-            synonym_extractor=extractor,
-        )
+#augmentation function of each worker process, loaded once by init_worker
+worker_eda_func = None
+
+def init_worker(eda_config):
+    global worker_eda_func
+    worker_eda_func, _ = build_eda_func(**eda_config)
+
+def augment_chunk(seed, records, first_line_id, aug_args):
+    return augment_records(worker_eda_func, records, first_line_id, *aug_args, seed)
+
+#generate augmented data with a pool of worker processes
+def gen_eda_parallel(
+    eda_config,
+    train_orig,
+    output_file,
+    alpha_sr,
+    alpha_ri,
+    alpha_rs,
+    alpha_rd,
+    num_aug=9,
+    batch_size=1000,
+    seed=1,
+    workers=2,
+    checkpoint_every=0,
+    resume=False,
+    input_format=None,
+    output_format=None,
+    first_line_id=0,
+) -> None:
+    """Augment `train_orig` with `workers` processes.
+
+    Every worker loads the tokenizer and synonym resources described by
+    `eda_config` (the keyword arguments of `build_eda_func`) once. Chunks of
+    `batch_size` lines are spread over the workers and written in input
+    order, and the output is the same as `gen_eda` with the same `seed`.
+    Checkpoints are compatible with `gen_eda`, so a run can be resumed with
+    a different number of workers.
+    """
+    aug_args = (alpha_sr, alpha_ri, alpha_rs, alpha_rd, num_aug)
+    settings = dict(input=train_orig, alpha_sr=alpha_sr, alpha_ri=alpha_ri, alpha_rs=alpha_rs, alpha_rd=alpha_rd, num_aug=num_aug, batch_size=batch_size, seed=seed, input_format=input_format, output_format=output_format, first_line_id=first_line_id, eda=eda_config_settings(eda_config))
+    state = start_state(train_orig, output_file, settings, checkpoint_every, resume)
+    chunks = read_chunks(train_orig, batch_size, state['input_offset'], input_format)
+
+    with open_writer(output_file, output_format, state['output_offset']) as writer, \
+            multiprocessing.Pool(workers, initializer=init_worker, initargs=(eda_config,)) as pool:
+        pending = collections.deque()
+
+        def write_next():
+            chunk_index, input_offset, result = pending.popleft()
+            writer.write(result.get())
+            if checkpoint_every and (chunk_index + 1) % checkpoint_every == 0:
+                save_checkpoint(output_file, writer, settings, chunk_index + 1, input_offset)
+
+        for chunk_index, (records, input_offset) in enumerate(chunks, state['chunk_index']):
+            result = pool.apply_async(augment_chunk, (seed, records, first_line_id + chunk_index * batch_size, aug_args))
+            pending.append((chunk_index, input_offset, result))
+            #bound the number of chunks in flight (and in memory)
+            if len(pending) >= 2 * workers:
+                write_next()
+        while pending:
+            write_next()
+
+    remove_checkpoint(output_file)
+
+    log("generated augmented sentences with eda for " + train_orig + " to " + output_file + " with num_aug=" + str(num_aug) + " using " + str(workers) + " workers", output_file)
+
+#generate augmented data for a grid of single-technique configurations in one pass
+def gen_eda_grid(
+    grid_func,
+    train_orig,
+    outputs,
+    batch_size=1000,
+    seed=None,
+    input_format=None,
+    output_format=None,
+    first_line_id=0,
+) -> None:
+    """Augment `train_orig` once for every configuration of a grid.
+
+    Args:
+        grid_func: Grid function such as `eda_english_grid`, e.g. from
+            `build_eda_func(grid=True)`.
+        outputs: `(GridConfig, output_file)` pairs.
+
+    The input is read, cleaned and looked up once, and every chunk fans out
+    to the output files of all configurations. Line ids start at
+    `first_line_id`, like in `gen_eda`.
+    """
+    configs = [config for config, _ in outputs]
+    with contextlib.ExitStack() as stack:
+        writers = [stack.enter_context(open_writer(output_file, output_format)) for _, output_file in outputs]
+        for chunk_index, (records, _) in enumerate(read_chunks(train_orig, batch_size, format=input_format)):
+            chunk_line_id = first_line_id + chunk_index * batch_size
+            rng_args = rng_kwargs(seed, chunk_line_id, len(records))
+            grid_batch = grid_func([record.sentence for record in records], configs=configs, **rng_args)
+            for config, writer, aug_batch in zip(configs, writers, grid_batch):
+                writer.write(grid_records(records, chunk_line_id, config, aug_batch))
+
+    for config, output_file in outputs:
+        log("generated augmented sentences with " + config.technique + " for " + train_orig + " to " + output_file + " with alpha=" + str(config.alpha) + " and num_aug=" + str(config.num_aug), output_file)
+
+def grid_records(records, first_line_id, config, aug_batch):
+    output_records = []
+    for line_id, record, aug_sentences in zip(itertools.count(first_line_id), records, aug_batch):
+        for technique, aug_sentence in zip(itertools.chain(config.plan(), ['orig']), aug_sentences):
+            output_records.append(AugmentedRecord(line_id, record.label, aug_sentence, technique))
+    return output_records
+
+#output file of each grid configuration, from a template such as "eda_{technique}_{alpha}_{num_aug}_train.txt"
+def grid_outputs(configs, output_template):
+    outputs = [(config, output_template.format(**config._asdict())) for config in configs]
+    if len({output_file for _, output_file in outputs}) < len(outputs):
+        raise ValueError("the grid configurations need different output files: " + output_template)
+    return outputs
+
+#generate augmented data for several num_aug values from a single augmentation pass
+def gen_eda_nested(
+    eda_func,
+    train_orig,
+    outputs,
+    alpha_sr,
+    alpha_ri,
+    alpha_rs,
+    alpha_rd,
+    batch_size=1000,
+    seed=None,
+    input_format=None,
+    output_format=None,
+    first_line_id=0,
+) -> None:
+    """Augment `train_orig` once for the largest `num_aug` of `outputs` and derive the smaller ones.
+
+    Args:
+        eda_func: Batch function such as `eda_english_batch`.
+        outputs: `(num_aug, output_file)` pairs.
+
+    Every sentence is augmented `ceil(max(num_aug))` times, and each output
+    gets a prefix of those sentences whose length is drawn by
+    `planner.nested_counts`, so smaller outputs are subsets of larger ones.
+    Line ids start at `first_line_id`, like in `gen_eda`.
+    """
+    num_augs = [num_aug for num_aug, _ in outputs]
+    max_num_aug = math.ceil(max(num_augs))
+    techniques = get_techniques(alpha_sr, alpha_ri, alpha_rs, alpha_rd)
+    with contextlib.ExitStack() as stack:
+        writers = [stack.enter_context(open_writer(output_file, output_format)) for _, output_file in outputs]
+        for chunk_index, (records, _) in enumerate(read_chunks(train_orig, batch_size, format=input_format)):
+            chunk_line_id = first_line_id + chunk_index * batch_size
+            rng_args = rng_kwargs(seed, chunk_line_id, len(records))
+            rngs = rng_args.get('rngs', [random] * len(records))
+            plans = [plan_augmentation(techniques, max_num_aug, rng) for rng in rngs]
+            counts = [nested_counts(num_augs, rng) for rng in rngs]
+            aug_batch = eda_func([record.sentence for record in records], alpha_sr=alpha_sr, alpha_ri=alpha_ri, alpha_rs=alpha_rs, p_rd=alpha_rd, num_aug=max_num_aug, plans=plans, **rng_args)
+            output_records = [[] for _ in outputs]
+            for line_id, record, plan, record_counts, aug_sentences in zip(itertools.count(chunk_line_id), records, plans, counts, aug_batch):
+                #the original sentence (if any) follows the planned ones
+                originals = [AugmentedRecord(line_id, record.label, sentence, 'orig') for sentence in aug_sentences[len(plan):]]
+                for count, nested_records in zip(record_counts, output_records):
+                    nested_records.extend(AugmentedRecord(line_id, record.label, sentence, technique) for technique, sentence in zip(plan[:count], aug_sentences))
+                    nested_records.extend(originals)
+            for writer, nested_records in zip(writers, output_records):
+                writer.write(nested_records)
+
+    for num_aug, output_file in outputs:
+        log("generated augmented sentences with eda for " + train_orig + " to " + output_file + " with num_aug=" + str(num_aug) + " (nested in num_aug=" + str(max_num_aug) + ")", output_file)
+
+#output file of each num_aug, from a template such as "eda_{num_aug}_train.txt"
+def nested_outputs(num_augs, output_template):
+    outputs = [(num_aug, output_template.format(num_aug=num_aug)) for num_aug in num_augs]
+    if len({output_file for _, output_file in outputs}) < len(outputs):
+        raise ValueError("the num_aug values need different output files: " + output_template)
+    return outputs
+
+def main():
+    args = ap.parse_args()
+
+    #the grid and nested modes augment in a single process without checkpoints
+    for option, enabled in [('--grid', args.grid), ('--nested_num_aug', args.nested_num_aug)]:
+        if enabled and (args.workers > 1 or args.checkpoint_every or args.resume):
+            ap.error(option + ' does not support --workers, --checkpoint_every or --resume')
+
+    #the grid configurations replace the alphas, num_aug and vectorized engine of a single run
+    if args.grid:
+        options = [('--num_aug', args.num_aug), ('--alpha_sr', args.alpha_sr), ('--alpha_ri', args.alpha_ri), ('--alpha_rs', args.alpha_rs), ('--alpha_rd', args.alpha_rd)]
+        ignored = [option for option, value in options if value is not None]
+        if args.vectorized:
+            ignored.append('--vectorized')
+        if ignored:
+            ap.error('--grid does not support ' + ', '.join(ignored))
+
+    #the output file
+    output = None
+    if args.output:
+        output = args.output
+    elif args.input == '-':
+        output = '-'
     else:
-        raise ValueError("Invalid language.")
-    #generate augmented sentences and output into a new file
-    gen_eda(
-        eda_func,
-        args.input,
-        output,
+        from os.path import dirname, basename, join
+        output = join(dirname(args.input), 'eda_' + basename(args.input))
+        if args.grid:
+            output = join(dirname(args.input), 'eda_{technique}_{alpha}_{num_aug}_' + basename(args.input))
+        elif args.nested_num_aug:
+            output = join(dirname(args.input), 'eda_{num_aug}_' + basename(args.input))
+
+    #options of the ConceptNet synonym extractor
+    synonym_extractor_options = {}
+    if args.synonym_extractor == 'conceptnet':
+        if args.conceptnet_url:
+            synonym_extractor_options['base_url'] = args.conceptnet_url
+        if args.conceptnet_cache:
+            synonym_extractor_options['cache_path'] = args.conceptnet_cache
+        if args.conceptnet_offline:
+            if not args.conceptnet_cache:
+                ap.error('--conceptnet_offline requires --conceptnet_cache')
+            synonym_extractor_options['offline'] = True
+        synonym_extractor_options['max_connections'] = args.conceptnet_concurrency
+    if args.conceptnet_prefetch:
+        if args.lang != 'ja' or args.synonym_extractor != 'conceptnet':
+            ap.error('--conceptnet_prefetch requires --lang ja --synonym_extractor conceptnet')
+        if args.input == '-':
+            ap.error('--conceptnet_prefetch cannot read the input twice from stdin')
+        if args.workers > 1 and not args.two_pass and not args.conceptnet_cache:
+            ap.error('--conceptnet_prefetch with --workers requires --conceptnet_cache to share the synonyms')
+
+    #first pass of the two-pass mode, skipped when the synonym map of the input is up to date
+    map_path = None
+    if args.two_pass:
+        if args.input == '-':
+            ap.error('--two_pass cannot read the input twice from stdin')
+        backend = synonym_backend(args.lang, args.tokenizer, args.mecab_dict, args.synonym_extractor)
+        map_path = args.synonym_map or synonym_map_path(args.input, output, backend)
+        if is_up_to_date(map_path, args.input, args.lang, backend):
+            log("reusing the synonym map " + map_path, output)
+        else:
+            first_pass_func, _ = build_eda_func(
+                args.lang, args.tokenizer, args.mecab_dict, args.synonym_extractor, args.synonym_cache_size,
+                synonym_extractor_options=synonym_extractor_options,
+            )
+            num_words = build_input_synonym_map(first_pass_func, args.lang, args.input, map_path, backend, args.batch_size, args.input_format)
+            log("saved the synonyms of " + str(num_words) + " words to " + map_path, output)
+
+    #resolve the synonyms of the input vocabulary before augmenting with eda_func
+    #(the synonym map of the two-pass mode already holds them)
+    def prefetch(eda_func):
+        if args.conceptnet_prefetch and not args.two_pass:
+            num_words = prefetch_synonyms(eda_func, args.input, args.batch_size, args.input_format)
+            log("prefetched the synonyms of " + str(num_words) + " words", output)
+
+    if args.grid:
+        eda_func, _ = build_eda_func(
+            args.lang, args.tokenizer, args.mecab_dict, args.synonym_extractor, args.synonym_cache_size, args.interned, grid=True,
+            synonym_extractor_options=synonym_extractor_options, synonym_map_path=map_path,
+        )
+        prefetch(eda_func)
+        gen_eda_grid(
+            eda_func, args.input, grid_outputs(args.grid, output),
+            batch_size=args.batch_size, seed=args.seed, input_format=args.input_format, output_format=args.output_format, first_line_id=args.first_line_id,
+        )
+        return
+
+    #number of augmented sentences to generate per original sentence
+    num_aug = 9 #default
+    if args.num_aug:
+        num_aug = args.num_aug
+
+    #how much to replace each word by synonyms
+    alpha_sr = 0.1#default
+    if args.alpha_sr is not None:
+        alpha_sr = args.alpha_sr
+
+    #how much to insert new words that are synonyms
+    alpha_ri = 0.1#default
+    if args.alpha_ri is not None:
+        alpha_ri = args.alpha_ri
+
+    #how much to swap words
+    alpha_rs = 0.1#default
+    if args.alpha_rs is not None:
+        alpha_rs = args.alpha_rs
+
+    #how much to delete words
+    alpha_rd = 0.1#default
+    if args.alpha_rd is not None:
+        alpha_rd = args.alpha_rd
+
+    if alpha_sr == alpha_ri == alpha_rs == alpha_rd == 0:
+         ap.error('At least one alpha should be greater than zero')
+
+    if args.nested_num_aug:
+        eda_func, _ = build_eda_func(
+            args.lang, args.tokenizer, args.mecab_dict, args.synonym_extractor, args.synonym_cache_size, args.interned, args.vectorized,
+            synonym_extractor_options=synonym_extractor_options, synonym_map_path=map_path,
+        )
+        prefetch(eda_func)
+        #integral values such as 4.0 are named like the integers
+        num_augs = [int(num_aug) if num_aug.is_integer() else num_aug for num_aug in args.nested_num_aug]
+        gen_eda_nested(
+            eda_func, args.input, nested_outputs(num_augs, output), alpha_sr, alpha_ri, alpha_rs, alpha_rd,
+            batch_size=args.batch_size, seed=args.seed, input_format=args.input_format, output_format=args.output_format, first_line_id=args.first_line_id,
+        )
+        return
+
+    eda_config = dict(
+        lang=args.lang,
+        tokenizer=args.tokenizer,
+        mecab_dict=args.mecab_dict,
+        synonym_extractor=args.synonym_extractor,
+        synonym_cache_size=args.synonym_cache_size,
+        interned=args.interned,
+        vectorized=args.vectorized,
+        synonym_extractor_options=synonym_extractor_options,
+        synonym_map_path=map_path,
+    )
+    aug_kwargs = dict(
         alpha_sr=alpha_sr,
         alpha_ri=alpha_ri,
         alpha_rs=alpha_rs,
         alpha_rd=alpha_rd,
         num_aug=num_aug,
+        batch_size=args.batch_size,
+        seed=args.seed,
+        first_line_id=args.first_line_id,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        input_format=args.input_format,
+        output_format=args.output_format,
     )
+
+    #generate augmented sentences and output into a new file
+    if args.workers > 1:
+        #the workers read the prefetched synonyms from the ConceptNet cache
+        if args.conceptnet_prefetch and not args.two_pass:
+            prefetch(build_eda_func(**eda_config)[0])
+        gen_eda_parallel(eda_config, args.input, output, workers=args.workers, **aug_kwargs)
+    else:
+        eda_func, cache = build_eda_func(**eda_config)
+        prefetch(eda_func)
+        gen_eda(eda_func, args.input, output, **aug_kwargs)
+        if cache is not None:
+            log("synonym cache: " + str(cache.info()), output)
+
+#main function
+if __name__ == "__main__":
+    main()
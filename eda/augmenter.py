@@ -0,0 +1,196 @@
+"""EDA as an object that owns its configuration, resources and randomness.
+
+`eda_english_batch` and `eda_japanese_batch` read the global `random`
+module, and callers have to pass in (or rely on module-level) tokenizers,
+synonym resources and caches. An `EDAAugmenter` holds all of them instead::
+
+    >>> augmenter = EDAAugmenter("ja", num_aug=4, seed=1)
+    >>> augmenter.augment("日本の首都は東京です。")
+
+Resources are loaded on first use. Pickling an augmenter only sends its
+configuration and the state of its random generator, so it can be handed to
+process pools cheaply and every process loads its own resources.
+"""
+import functools
+import random
+from typing import AbstractSet, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .cache import DEFAULT_CACHE_SIZE, CacheInfo, LRUCache
+from .eda import eda_batch, stop_words as english_stop_words
+from .eda_japanese import eda_ja_batch, get_stop_words
+from .formats import iter_chunks
+from .synonym_extractor import BaseSynonymExtractor, get_synonym_extractor
+from .synonym_map import load_synonym_map, synonym_backend
+from .tokenizer import BaseTokenizer, get_tokenizer
+from .wordnet_lexicon import WordNetLexicon
+
+LANGS = ("en", "ja")
+
+
+class CachedSynonymTable:
+    """Synonym table that looks words up on first access and keeps them in an LRU cache."""
+    def __init__(self, lookup: Callable[[str], List[str]], cache: LRUCache):
+        self.lookup = lookup
+        self.cache = cache
+
+    def __getitem__(self, word: str) -> List[str]:
+        return self.cache.get_or_compute(word, self.lookup)
+
+
+class EDAAugmenter:
+    """Augment sentences with EDA using resources and a random generator of its own.
+
+    Args:
+        lang: `"en"` or `"ja"`.
+        alpha_sr: Ratio of words replaced by synonyms.
+        alpha_ri: Ratio of synonyms inserted.
+        alpha_rs: Ratio of words swapped.
+        p_rd: Probability of deleting each word.
+        num_aug: Number of augmented sentences per sentence.
+        is_append_original: Whether Japanese augmentation also returns the
+            original sentence (English always does).
+        tokenizer: Japanese tokenizer name (see `get_tokenizer`).
+        mecab_dict: MeCab dictionary name.
+        synonym_extractor: Japanese synonym extractor name (see `get_synonym_extractor`).
+        synonym_extractor_options: Keyword arguments of the synonym extractor.
+        synonym_cache_size: Number of words whose synonyms are cached
+            (0 disables the cache and None makes it unbounded).
+        synonym_map_path: Synonym map of the corpus (see `synonym_map.py`),
+            looked up before the synonym resources.
+        stop_words: Words that are never replaced, instead of the default
+            stop words of the language.
+        interned: Augment integer-interned word ids instead of strings.
+        vectorized: Draw random swaps and deletions for whole batches with NumPy.
+        seed: Seed of the random generator.
+    """
+    def __init__(
+        self,
+        lang: str = "en",
+        alpha_sr: float = 0.1,
+        alpha_ri: float = 0.1,
+        alpha_rs: float = 0.1,
+        p_rd: float = 0.1,
+        num_aug: int = 9,
+        is_append_original: bool = False,
+        tokenizer: str = "sudachi",
+        mecab_dict: str = "ipadic",
+        synonym_extractor: str = "sudachi",
+        synonym_extractor_options: Optional[Dict[str, Any]] = None,
+        synonym_cache_size: Optional[int] = DEFAULT_CACHE_SIZE,
+        synonym_map_path: Optional[str] = None,
+        stop_words: Optional[AbstractSet[str]] = None,
+        interned: bool = False,
+        vectorized: bool = False,
+        seed: Optional[int] = None,
+    ):
+        if lang not in LANGS:
+            raise ValueError(f"Invalid language: {lang}")
+        self.config: Dict[str, Any] = dict(
+            lang=lang,
+            alpha_sr=alpha_sr,
+            alpha_ri=alpha_ri,
+            alpha_rs=alpha_rs,
+            p_rd=p_rd,
+            num_aug=num_aug,
+            is_append_original=is_append_original,
+            tokenizer=tokenizer,
+            mecab_dict=mecab_dict,
+            synonym_extractor=synonym_extractor,
+            synonym_extractor_options=synonym_extractor_options,
+            synonym_cache_size=synonym_cache_size,
+            synonym_map_path=synonym_map_path,
+            stop_words=stop_words,
+            interned=interned,
+            vectorized=vectorized,
+            seed=seed,
+        )
+        self.lang = lang
+        self.rng = random.Random(seed)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"config": self.config, "rng_state": self.rng.getstate()}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state["config"])
+        self.rng.setstate(state["rng_state"])
+
+    def seed(self, seed: Optional[int]) -> None:
+        """Reseed the random generator."""
+        self.rng.seed(seed)
+
+    @functools.cached_property
+    def stop_words(self) -> AbstractSet[str]:
+        if self.config["stop_words"] is not None:
+            return self.config["stop_words"]
+        return english_stop_words if self.lang == "en" else get_stop_words()
+
+    @functools.cached_property
+    def synonym_map(self) -> Optional[Dict[str, List[str]]]:
+        path = self.config["synonym_map_path"]
+        if path is None:
+            return None
+        backend = synonym_backend(self.lang, self.config["tokenizer"], self.config["mecab_dict"], self.config["synonym_extractor"])
+        return load_synonym_map(path, self.lang, backend)
+
+    @functools.cached_property
+    def tokenizer(self) -> BaseTokenizer:
+        """Japanese tokenizer."""
+        return get_tokenizer(self.config["tokenizer"], self.config["mecab_dict"])
+
+    @functools.cached_property
+    def synonym_extractor(self) -> BaseSynonymExtractor:
+        """Japanese synonym extractor, memoized by its own LRU cache."""
+        return get_synonym_extractor(
+            self.config["synonym_extractor"],
+            self.tokenizer,
+            cache_size=self.config["synonym_cache_size"],
+            **(self.config["synonym_extractor_options"] or {}),
+        )
+
+    @functools.cached_property
+    def synonyms(self) -> CachedSynonymTable:
+        """English synonym table backed by WordNet (and the synonym map)."""
+        lexicon = WordNetLexicon()
+        synonym_map = self.synonym_map
+
+        def lookup(word: str) -> List[str]:
+            if synonym_map is not None and word in synonym_map:
+                return synonym_map[word]
+            return lexicon.get_synonyms(word)
+
+        return CachedSynonymTable(lookup, LRUCache(self.config["synonym_cache_size"]))
+
+    def cache_info(self) -> Optional[CacheInfo]:
+        """Statistics of the synonym cache, or None if it is disabled."""
+        if self.lang == "en":
+            return self.synonyms.cache.info()
+        cache_info = getattr(self.synonym_extractor, "cache_info", None)
+        return cache_info() if cache_info is not None else None
+
+    def augment(self, sentence: str) -> List[str]:
+        """Augmented sentences of `sentence`."""
+        return self.augment_batch([sentence])[0]
+
+    def augment_batch(self, sentences: Iterable[str], plans: Optional[List[List[str]]] = None) -> List[List[str]]:
+        """Augmented sentences of each sentence of a batch.
+
+        `plans` optionally fixes the technique of each augmented sentence of
+        each sentence (see `planner.py`).
+        """
+        config = self.config
+        alphas = dict(alpha_sr=config["alpha_sr"], alpha_ri=config["alpha_ri"], alpha_rs=config["alpha_rs"], p_rd=config["p_rd"])
+        if self.lang == "en":
+            return eda_batch(
+                sentences, **alphas, num_aug=config["num_aug"], interned=config["interned"], vectorized=config["vectorized"],
+                plans=plans, synonym_map=self.synonyms, rng=self.rng, stop_words=self.stop_words,
+            )
+        return eda_ja_batch(
+            sentences, self.tokenizer, self.synonym_extractor, **alphas, num_aug=config["num_aug"],
+            is_append_original=config["is_append_original"], interned=config["interned"], vectorized=config["vectorized"],
+            plans=plans, synonym_map=self.synonym_map, rng=self.rng, stop_words=self.stop_words,
+        )
+
+    def iter_augment(self, sentences: Iterable[str], batch_size: int = 1000) -> Iterator[List[str]]:
+        """Lazily augment `sentences` in batches of `batch_size`, yielding the augmented sentences of each sentence."""
+        for batch in iter_chunks(sentences, batch_size):
+            yield from self.augment_batch(batch)
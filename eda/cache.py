@@ -0,0 +1,143 @@
+"""Caches for synonym lookups: a bounded in-memory LRU cache and a persistent SQLite cache."""
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+DEFAULT_CACHE_SIZE = 100000
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class LRUCache:
+    """Least-recently-used cache with hit, miss and eviction counters.
+
+    Args:
+        maxsize: Maximum number of entries. `None` means unbounded and `0`
+            disables caching (every lookup is a miss).
+    """
+    def __init__(self, maxsize: Optional[int] = DEFAULT_CACHE_SIZE):
+        assert maxsize is None or maxsize >= 0, "maxsize must be None or non-negative."
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value of `key` and mark it as recently used."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store `value`, evicting the least recently used entries if full."""
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[Hashable], Any]) -> Any:
+        """Return the cached value of `key`, computing and storing it on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute(key)
+            self.put(key, value)
+        return value
+
+    def resize(self, maxsize: Optional[int]) -> None:
+        """Change the size bound, evicting entries that no longer fit."""
+        assert maxsize is None or maxsize >= 0, "maxsize must be None or non-negative."
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.maxsize is None:
+            return
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._data))
+
+
+class SQLiteSynonymCache:
+    """Synonyms of words stored in a SQLite database, kept between runs.
+
+    The database can be shared by threads and by processes.
+
+    Args:
+        path: Database file, created if missing.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=60.0, check_same_thread=False)
+        with self._lock, self.connection:
+            # WAL lets worker processes read while another one writes
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS synonyms (word TEXT PRIMARY KEY, synonyms TEXT NOT NULL)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM synonyms").fetchone()[0]
+
+    def __contains__(self, word: str) -> bool:
+        return self.get(word) is not None
+
+    def get(self, word: str) -> Optional[List[str]]:
+        """Return the stored synonyms of `word`, or None if it was never stored."""
+        with self._lock:
+            row = self.connection.execute("SELECT synonyms FROM synonyms WHERE word = ?", (word,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, word: str, synonyms: List[str]) -> None:
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO synonyms (word, synonyms) VALUES (?, ?)",
+                (word, json.dumps(synonyms, ensure_ascii=False)),
+            )
+
+    def put_many(self, items: Iterable[Tuple[str, List[str]]]) -> None:
+        """Store the synonyms of many words in one transaction."""
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO synonyms (word, synonyms) VALUES (?, ?)",
+                ((word, json.dumps(synonyms, ensure_ascii=False)) for word, synonyms in items),
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+_MISSING = object()
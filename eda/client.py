@@ -0,0 +1,92 @@
+"""Thin client of the augmentation server (see `eda.server`)."""
+import http.client
+import json
+import socket
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket."""
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class EDAClient:
+    """Client of an augmentation server, keeping one connection alive between requests.
+
+    Args:
+        url: Server URL such as `http://127.0.0.1:8080`.
+        socket_path: Unix socket of the server, used instead of `url`.
+        timeout: Socket timeout in seconds.
+    """
+    def __init__(self, url: str = "http://127.0.0.1:8080", socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        if socket_path is not None:
+            self.connection: http.client.HTTPConnection = UnixHTTPConnection(socket_path, timeout)
+        else:
+            parts = urlsplit(url)
+            self.connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The kept-alive connection was closed by the server, so retry once on a new one
+            self.connection.close()
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        result = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"EDA server error ({response.status}): {result.get('error')}")
+        return result
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def augment(
+        self,
+        sentences: List[str],
+        lang: str = "en",
+        alpha_sr: float = 0.1,
+        alpha_ri: float = 0.1,
+        alpha_rs: float = 0.1,
+        p_rd: float = 0.1,
+        num_aug: int = 9,
+        seed: Optional[int] = None,
+    ) -> List[List[str]]:
+        """Augment a batch of sentences on the server.
+
+        Returns:
+            List[List[str]]: Augmented sentences of each sentence, like
+            `eda_english_batch` / `eda_japanese_batch`.
+        """
+        payload = {
+            "lang": lang,
+            "sentences": list(sentences),
+            "alpha_sr": alpha_sr,
+            "alpha_ri": alpha_ri,
+            "alpha_rs": alpha_rs,
+            "p_rd": p_rd,
+            "num_aug": num_aug,
+            "seed": seed,
+        }
+        return self._request("POST", "/augment", payload)["augmented"]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "EDAClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
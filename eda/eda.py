@@ -1,12 +1,12 @@
 # Easy data augmentation techniques for text classification
 # Jason Wei and Kai Zou
 
+import functools
 import random
-from random import shuffle
 random.seed(1)
 
-#stop words list
-stop_words = ['i', 'me', 'my', 'myself', 'we', 'our', 
+#stop words set
+stop_words = frozenset(['i', 'me', 'my', 'myself', 'we', 'our', 
 			'ours', 'ourselves', 'you', 'your', 'yours', 
 			'yourself', 'yourselves', 'he', 'him', 'his', 
 			'himself', 'she', 'her', 'hers', 'herself', 
@@ -26,7 +26,7 @@ stop_words = ['i', 'me', 'my', 'myself', 'we', 'our',
 			'few', 'more', 'most', 'other', 'some', 'such', 'no', 
 			'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 
 			'very', 's', 't', 'can', 'will', 'just', 'don', 
-			'should', 'now', '']
+			'should', 'now', ''])
 
 #cleaning up text
 import re
@@ -57,65 +57,107 @@ def get_only_chars(line):
 # Replace n words in the sentence with synonyms from wordnet
 ########################################################################
 
-#for the first time you use wordnet
-#import nltk
-#nltk.download('wordnet')
-from nltk.corpus import wordnet 
-
-def synonym_replacement(words, n):
-	new_words = words.copy()
-	random_word_list = list(set([word for word in words if word not in stop_words]))
-	random.shuffle(random_word_list)
-	num_replaced = 0
-	for random_word in random_word_list:
-		synonyms = get_synonyms(random_word)
-		if len(synonyms) >= 1:
-			synonym = random.choice(list(synonyms))
-			new_words = [synonym if word == random_word else word for word in new_words]
-			#print("replaced", random_word, "with", synonym)
-			num_replaced += 1
-		if num_replaced >= n: #only replace up to n words
-			break
+#synonyms are read from a precompiled WordNet lexicon (see wordnet_lexicon.py),
+#which is built from nltk's wordnet the first time it is needed
+from .wordnet_lexicon import WordNetLexicon
+from .cache import LRUCache
+from .interned import Vocabulary, SynonymIdTable
+from .planner import TECHNIQUES, plan_augmentation
+
+def synonym_replacement(words, n, synonym_table=None, candidates=None, positions=None, rng=random):
+	new_words = words[:]
+	if candidates is None:
+		candidates = get_replacement_candidates(words, synonym_table)
+	if positions is None:
+		positions = get_word_positions(words)
+	random_word_list = candidates.copy()
+	rng.shuffle(random_word_list)
+	for random_word in random_word_list[:n]: #only replace up to n words
+		synonym = rng.choice(get_table_synonyms(random_word, synonym_table))
+		for i in positions[random_word]:
+			new_words[i] = synonym
+		#print("replaced", random_word, "with", synonym)
 
 	#this is stupid but we need it, trust me
-	sentence = ' '.join(new_words)
-	new_words = sentence.split(' ')
+	#(interned ids keep a multi-word synonym as a single token instead)
+	if isinstance(new_words, list):
+		sentence = ' '.join(new_words)
+		new_words = sentence.split(' ')
 
 	return new_words
 
+wordnet_lexicon = None
+
+#memoized lookups; resize with synonym_cache.resize(n) and inspect with synonym_cache.info()
+#the returned lists are shared between calls, so they must not be mutated
+synonym_cache = LRUCache()
+
 def get_synonyms(word):
-	synonyms = set()
-	for syn in wordnet.synsets(word): 
-		for l in syn.lemmas(): 
-			synonym = l.name().replace("_", " ").replace("-", " ").lower()
-			synonym = "".join([char for char in synonym if char in ' qwertyuiopasdfghjklzxcvbnm'])
-			synonyms.add(synonym) 
-	if word in synonyms:
-		synonyms.remove(word)
-	return list(synonyms)
+	return synonym_cache.get_or_compute(word, lookup_synonyms)
+
+def lookup_synonyms(word):
+	global wordnet_lexicon
+	if wordnet_lexicon is None:
+		wordnet_lexicon = WordNetLexicon()
+	return wordnet_lexicon.get_synonyms(word)
+
+#look up the synonyms of every distinct word once, e.g. for a whole batch of sentences
+def get_synonym_table(words):
+	return {word: get_synonyms(word) for word in set(words)}
+
+#synonym table of a batch that looks each word up on first access,
+#so that batches whose plans have no sr or ri do no lookups at all
+class LazySynonymTable(dict):
+	def __missing__(self, word):
+		synonyms = self[word] = get_synonyms(word)
+		return synonyms
+
+def get_table_synonyms(word, synonym_table=None):
+	if synonym_table is None:
+		return get_synonyms(word)
+	#words missing from the table (e.g. inserted synonyms) are looked up directly
+	try:
+		return synonym_table[word]
+	except KeyError:
+		return get_synonyms(word)
+
+#distinct non stop words that can be replaced by a synonym, in order of first occurrence
+def get_replacement_candidates(words, synonym_table=None, stop_words=stop_words):
+	return [word for word in dict.fromkeys(words) if word not in stop_words and len(get_table_synonyms(word, synonym_table)) >= 1]
+
+#positions of every occurrence of each word, for in-place replacement
+def get_word_positions(words):
+	positions = {}
+	for i, word in enumerate(words):
+		positions.setdefault(word, []).append(i)
+	return positions
+
+#words (with repetition) whose synonyms can be inserted
+def get_insertion_candidates(words, synonym_table=None):
+	return [word for word in words if len(get_table_synonyms(word, synonym_table)) >= 1]
 
 ########################################################################
 # Random deletion
 # Randomly delete words from the sentence with probability p
 ########################################################################
 
-def random_deletion(words, p):
+def random_deletion(words, p, rng=random):
 
 	#obviously, if there's only one word, don't delete it
 	if len(words) == 1:
 		return words
 
 	#randomly delete words with probability p
-	new_words = []
+	new_words = words[:0]
 	for word in words:
-		r = random.uniform(0, 1)
+		r = rng.uniform(0, 1)
 		if r > p:
 			new_words.append(word)
 
 	#if you end up deleting all words, just return a random word
 	if len(new_words) == 0:
-		rand_int = random.randint(0, len(words)-1)
-		return [words[rand_int]]
+		rand_int = rng.randint(0, len(words)-1)
+		return words[rand_int:rand_int+1]
 
 	return new_words
 
@@ -124,18 +166,18 @@ def random_deletion(words, p):
 # Randomly swap two words in the sentence n times
 ########################################################################
 
-def random_swap(words, n):
-	new_words = words.copy()
+def random_swap(words, n, rng=random):
+	new_words = words[:]
 	for _ in range(n):
-		new_words = swap_word(new_words)
+		new_words = swap_word(new_words, rng)
 	return new_words
 
-def swap_word(new_words):
-	random_idx_1 = random.randint(0, len(new_words)-1)
+def swap_word(new_words, rng=random):
+	random_idx_1 = rng.randint(0, len(new_words)-1)
 	random_idx_2 = random_idx_1
 	counter = 0
 	while random_idx_2 == random_idx_1:
-		random_idx_2 = random.randint(0, len(new_words)-1)
+		random_idx_2 = rng.randint(0, len(new_words)-1)
 		counter += 1
 		if counter > 3:
 			return new_words
@@ -147,77 +189,195 @@ def swap_word(new_words):
 # Randomly insert n words into the sentence
 ########################################################################
 
-def random_insertion(words, n):
-	new_words = words.copy()
+def random_insertion(words, n, synonym_table=None, candidates=None, rng=random):
+	new_words = words[:]
+	#only words that have synonyms are picked, so no draw is wasted
+	if candidates is None:
+		candidates = get_insertion_candidates(words, synonym_table)
+	candidates = candidates.copy()
 	for _ in range(n):
-		add_word(new_words)
+		add_word(new_words, candidates, synonym_table, rng)
 	return new_words
 
-def add_word(new_words):
-	synonyms = []
-	counter = 0
-	while len(synonyms) < 1:
-		random_word = new_words[random.randint(0, len(new_words)-1)]
-		synonyms = get_synonyms(random_word)
-		counter += 1
-		if counter >= 10:
-			return
-	random_synonym = synonyms[0]
-	random_idx = random.randint(0, len(new_words)-1)
+def add_word(new_words, candidates, synonym_table=None, rng=random):
+	if len(candidates) == 0:
+		return
+	random_word = candidates[rng.randint(0, len(candidates)-1)]
+	random_synonym = rng.choice(get_table_synonyms(random_word, synonym_table))
+	random_idx = rng.randint(0, len(new_words)-1)
 	new_words.insert(random_idx, random_synonym)
+	#the inserted word can be picked by later insertions as well
+	if len(get_table_synonyms(random_synonym, synonym_table)) >= 1:
+		candidates.append(random_synonym)
 
 ########################################################################
 # main data augmentation function
 ########################################################################
 
-def eda(sentence, alpha_sr=0.1, alpha_ri=0.1, alpha_rs=0.1, p_rd=0.1, num_aug=9):
-	
-	sentence = get_only_chars(sentence)
+def get_words(sentence):
 	words = sentence.split(' ')
-	words = [word for word in words if word is not '']
-	num_words = len(words)
-	
-	augmented_sentences = []
-	num_new_per_technique = int(num_aug/4)+1
-
-	#sr
-	if (alpha_sr > 0):
-		n_sr = max(1, int(alpha_sr*num_words))
-		for _ in range(num_new_per_technique):
-			a_words = synonym_replacement(words, n_sr)
-			augmented_sentences.append(' '.join(a_words))
+	return [word for word in words if word != '']
 
-	#ri
-	if (alpha_ri > 0):
-		n_ri = max(1, int(alpha_ri*num_words))
-		for _ in range(num_new_per_technique):
-			a_words = random_insertion(words, n_ri)
-			augmented_sentences.append(' '.join(a_words))
-
-	#rs
+def eda(sentence, alpha_sr=0.1, alpha_ri=0.1, alpha_rs=0.1, p_rd=0.1, num_aug=9, rng=random):
+	
+	sentence = get_only_chars(sentence)
+	words = get_words(sentence)
+	return eda_words(sentence, words, None, alpha_sr, alpha_ri, alpha_rs, p_rd, num_aug, rng=rng)
+
+#augment many sentences at once: cleaning and synonym lookups are shared by the whole batch
+#with interned=True the words of the batch are turned into integer ids (see interned.py)
+#with vectorized=True random swap and random deletion run on the whole batch with numpy (see vectorized.py)
+#plans optionally fixes the technique of each augmented sentence of each sentence (see planner.py)
+#synonym_map optionally holds the synonyms of the whole corpus vocabulary (see build_synonym_map)
+#rng is the source of randomness (the random module by default) and stop_words the words never replaced
+#rngs optionally holds a random generator for each sentence, so that its output does not depend on the
+#rest of the batch
+def eda_batch(sentences, alpha_sr=0.1, alpha_ri=0.1, alpha_rs=0.1, p_rd=0.1, num_aug=9, interned=False, vectorized=False, plans=None, synonym_map=None, rng=random, stop_words=stop_words, rngs=None):
+
+	sentences, words_list, synonym_table, vocabulary = prepare_batch(sentences, interned, synonym_map, stop_words)
+	rngs = sentence_rngs(rng, rngs, len(words_list))
+	if plans is None and vectorized:
+		#the random swaps and deletions are drawn up front, so the plans have to be as well
+		techniques = get_techniques(alpha_sr, alpha_ri, alpha_rs, p_rd)
+		plans = [plan_augmentation(techniques, num_aug, sentence_rng) for sentence_rng in rngs]
+	elif plans is None:
+		plans = [None] * len(words_list)
+	rs_batch, rd_batch = [None] * len(words_list), [None] * len(words_list)
+	if vectorized:
+		rs_batch, rd_batch = vectorized_variants(words_list, alpha_rs, p_rd, plans, rngs)
+	return [
+		eda_words(sentence, words, synonym_table, alpha_sr, alpha_ri, alpha_rs, p_rd, num_aug, vocabulary, plan, rs_variants, rd_variants, sentence_rng, stop_words)
+		for sentence, words, plan, rs_variants, rd_variants, sentence_rng in zip(sentences, words_list, plans, rs_batch, rd_batch, rngs)
+	]
+
+#augment a batch with every (technique, alpha, num_aug) configuration of a grid (see planner.GridConfig)
+#the sentences are cleaned, split and looked up only once for the whole grid
+#returns the augmented sentences of each sentence for each configuration
+def eda_grid_batch(sentences, configs, interned=False, synonym_map=None, rng=random, stop_words=stop_words, rngs=None):
+
+	sentences, words_list, synonym_table, vocabulary = prepare_batch(sentences, interned, synonym_map, stop_words)
+	rngs = sentence_rngs(rng, rngs, len(words_list))
+	return [
+		[
+			eda_words(sentence, words, synonym_table, *config.alphas(), config.num_aug, vocabulary, config.plan(), rng=sentence_rng, stop_words=stop_words)
+			for sentence, words, sentence_rng in zip(sentences, words_list, rngs)
+		]
+		for config in configs
+	]
+
+#the random generator of each sentence of a batch: its own one in rngs, or the shared rng
+def sentence_rngs(rng, rngs, num_sentences):
+	if rngs is None:
+		return [rng] * num_sentences
+	rngs = list(rngs)
+	if len(rngs) != num_sentences:
+		raise ValueError("rngs has " + str(len(rngs)) + " random generators for " + str(num_sentences) + " sentences")
+	return rngs
+
+#clean and split the sentences of a batch and make their synonym table (interned into a Vocabulary or not),
+#which only looks words up when an sr or ri variant needs them
+#with a synonym_map of the corpus, its words are not looked up again
+def prepare_batch(sentences, interned=False, synonym_map=None, stop_words=stop_words):
+	sentences = [get_only_chars(sentence) for sentence in sentences]
+	words_list = [get_words(sentence) for sentence in sentences]
+	vocabulary = None
+	if interned:
+		vocabulary = Vocabulary(' ', stop_words)
+		words_list = [vocabulary.encode(words) for words in words_list]
+		lookup = get_synonyms if synonym_map is None else functools.partial(get_table_synonyms, synonym_table=synonym_map)
+		synonym_table = SynonymIdTable(vocabulary, lookup)
+	elif synonym_map is not None:
+		synonym_table = synonym_map
+	else:
+		synonym_table = LazySynonymTable()
+	return sentences, words_list, synonym_table, vocabulary
+
+#first pass of the two-pass mode: the synonyms of every distinct word of a corpus (see synonym_map.py)
+def build_synonym_map(sentences):
+	words = set()
+	for sentence in sentences:
+		words.update(get_words(get_only_chars(sentence)))
+	synonym_map = get_synonym_table(words)
+	#random insertion inserts any synonym of a word and looks up its synonyms in turn
+	inserted = [word for synonyms in synonym_map.values() for word in synonyms]
+	while inserted:
+		word = inserted.pop()
+		if word not in synonym_map:
+			synonym_map[word] = get_synonyms(word)
+			inserted.extend(synonym_map[word])
+	return synonym_map
+
+#techniques with a non zero alpha, in the order of planner.TECHNIQUES
+def get_techniques(alpha_sr, alpha_ri, alpha_rs, p_rd):
+	alphas = [alpha_sr, alpha_ri, alpha_rs, p_rd]
+	return [technique for technique, alpha in zip(TECHNIQUES, alphas) if alpha > 0]
+
+#random swap and random deletion variants of every sentence, drawn at once for the whole batch
+#every variant gets a random key from the generator of its sentence in rngs (see vectorized.py), so
+#random.seed() (or the seeds of rngs) still controls the output, and per sentence generators keep
+#it independent of the rest of the batch
+def vectorized_variants(words_list, alpha_rs, p_rd, plans, rngs):
+	from .vectorized import random_swap_batch, random_deletion_batch
+
+	rs_batch, rd_batch = [None] * len(words_list), [None] * len(words_list)
 	if (alpha_rs > 0):
-		n_rs = max(1, int(alpha_rs*num_words))
-		for _ in range(num_new_per_technique):
-			a_words = random_swap(words, n_rs)
-			augmented_sentences.append(' '.join(a_words))
-
-	#rd
+		ns = [max(1, int(alpha_rs*len(words))) for words in words_list]
+		keys = [[rng.getrandbits(64) for _ in range(plan.count('rs'))] for plan, rng in zip(plans, rngs)]
+		rs_batch = random_swap_batch(words_list, ns, keys)
 	if (p_rd > 0):
-		for _ in range(num_new_per_technique):
-			a_words = random_deletion(words, p_rd)
-			augmented_sentences.append(' '.join(a_words))
+		keys = [[rng.getrandbits(64) for _ in range(plan.count('rd'))] for plan, rng in zip(plans, rngs)]
+		rd_batch = random_deletion_batch(words_list, p_rd, keys)
+	return rs_batch, rd_batch
 
-	augmented_sentences = [get_only_chars(sentence) for sentence in augmented_sentences]
-	shuffle(augmented_sentences)
+#augment a cleaned sentence that is already split into words (or interned into ids of vocabulary)
+#plan optionally fixes the technique of each augmented sentence (see planner.py), and
+#rs_variants and rd_variants optionally hold precomputed random swap and random deletion variants
+def eda_words(sentence, words, synonym_table, alpha_sr, alpha_ri, alpha_rs, p_rd, num_aug, vocabulary=None, plan=None, rs_variants=None, rd_variants=None, rng=random, stop_words=stop_words):
 
-	#trim so that we have the desired number of augmented sentences
-	if num_aug >= 1:
-		augmented_sentences = augmented_sentences[:num_aug]
+	num_words = len(words)
+	if vocabulary is None:
+		join, stop = ' '.join, stop_words
 	else:
-		keep_prob = num_aug / len(augmented_sentences)
-		augmented_sentences = [s for s in augmented_sentences if random.uniform(0, 1) < keep_prob]
+		join, stop = vocabulary.decode, vocabulary.stop_ids
+
+	#decide up front which technique produces each kept sentence, so that nothing is generated and thrown away
+	if plan is None:
+		plan = plan_augmentation(get_techniques(alpha_sr, alpha_ri, alpha_rs, p_rd), num_aug, rng)
+	if rs_variants is not None:
+		rs_variants = iter(rs_variants)
+	if rd_variants is not None:
+		rd_variants = iter(rd_variants)
+
+	#the synonym candidates of the sentence are shared by all sr and ri variants
+	#(without a table, one is built for the sentence, and only if the plan needs synonyms)
+	if synonym_table is None and ('sr' in plan or 'ri' in plan):
+		synonym_table = get_synonym_table(words)
+	if 'sr' in plan:
+		n_sr = max(1, int(alpha_sr*num_words))
+		sr_candidates = get_replacement_candidates(words, synonym_table, stop)
+		positions = get_word_positions(words)
+	if 'ri' in plan:
+		n_ri = max(1, int(alpha_ri*num_words))
+		ri_candidates = get_insertion_candidates(words, synonym_table)
+	n_rs = max(1, int(alpha_rs*num_words))
+
+	augmented_sentences = []
+	for technique in plan:
+		#sr
+		if technique == 'sr':
+			a_words = synonym_replacement(words, n_sr, synonym_table, sr_candidates, positions, rng)
+		#ri
+		elif technique == 'ri':
+			a_words = random_insertion(words, n_ri, synonym_table, ri_candidates, rng)
+		#rs
+		elif technique == 'rs':
+			a_words = random_swap(words, n_rs, rng) if rs_variants is None else next(rs_variants)
+		#rd
+		else:
+			a_words = random_deletion(words, p_rd, rng) if rd_variants is None else next(rd_variants)
+		augmented_sentences.append(get_only_chars(join(a_words)))
 
 	#append the original sentence
 	augmented_sentences.append(sentence)
 
-	return augmented_sentences
\ No newline at end of file
+	return augmented_sentences
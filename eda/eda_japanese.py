@@ -1,16 +1,29 @@
+import functools
 import re
 import random
 import unicodedata
-from typing import List
+from typing import AbstractSet, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple
 
-from spacy.lang import ja
-
-from .eda import random_swap, random_deletion
-from .tokenizer import BaseTokenizer
+from .eda import random_swap, random_deletion, get_word_positions, get_techniques, sentence_rngs, vectorized_variants
+from .formats import iter_chunks
+from .planner import GridConfig, plan_augmentation
+from .interned import Vocabulary, SynonymIdTable
+from .tokenizer import BaseTokenizer, Token
 from .synonym_extractor import BaseSynonymExtractor
 
 
-stop_words = ja.STOP_WORDS  # Set
+@functools.lru_cache(maxsize=None)
+def get_stop_words() -> FrozenSet[str]:
+    """spaCy's Japanese stop words, loaded on first use since importing spaCy takes about a second."""
+    from spacy.lang.ja.stop_words import STOP_WORDS
+    return frozenset(STOP_WORDS)
+
+
+def __getattr__(name: str):
+    # `stop_words` used to be a module constant
+    if name == "stop_words":
+        return get_stop_words()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_only_chars(line: str) -> str:
@@ -41,42 +54,157 @@ def get_only_chars(line: str) -> str:
     return clean_line
 
 
-def synonym_replacement(words: List[str], n: int, synonym_extractor: BaseSynonymExtractor) -> List[str]:
-    new_words = words.copy()
-    random_word_list = list(set([word for word in words if word not in stop_words]))
-    random.shuffle(random_word_list)
-    num_replaced = 0
-    for random_word in random_word_list:
-        synonyms = synonym_extractor.get_synonyms(random_word)
-        if len(synonyms) >= 1:
-            synonym = random.choice(list(synonyms))
-            new_words = [synonym if word == random_word else word for word in new_words]
-            num_replaced += 1
-        if num_replaced >= n:
-            break
+def get_synonym_table(words: Iterable[str], synonym_extractor: BaseSynonymExtractor) -> Dict[str, List[str]]:
+    """Look up the synonyms of every distinct word once."""
+    return {word: synonym_extractor.get_synonyms(word) for word in set(words)}
+
+
+class SentenceSynonymTable(dict):
+    """Synonyms of the words of one sentence, looked up from their tokens on first access.
+
+    A word is looked up from its first token in the sentence, so a homograph
+    (e.g. 行っ of 行く and of 行う) gets the synonyms of its own reading
+    whatever the other sentences of its batch are. Words that are not in the
+    sentence, such as inserted synonyms, are looked up with `fallback`.
+
+    Args:
+        words: Words (or interned ids) of the sentence.
+        tokens: Tokens of the words.
+        lookup: Synonyms (or their ids) of a token.
+        fallback: Synonyms (or their ids) of a word that is not in the sentence.
+    """
+    def __init__(
+        self,
+        words: Sequence[Hashable],
+        tokens: Sequence[Token],
+        lookup: Callable[[Token], Sequence],
+        fallback: Callable[[Hashable], Sequence],
+    ):
+        super().__init__()
+        self.tokens: Dict[Hashable, Token] = {}
+        for word, token in zip(words, tokens):
+            self.tokens.setdefault(word, token)
+        self.lookup = lookup
+        self.fallback = fallback
+
+    def __missing__(self, word: Hashable) -> Sequence:
+        token = self.tokens.get(word)
+        synonyms = self.lookup(token) if token is not None else self.fallback(word)
+        self[word] = synonyms
+        return synonyms
+
+
+def token_key(token: Token) -> str:
+    """Key of a token in a synonym map: its surface, followed by its synonym group ids if it has any.
+
+    Homographs such as 行っ of 行く and of 行う have different keys, while
+    tokens without group ids are keyed by their surface, like plain words.
+    Cleaned sentences have no tabs, so the key cannot clash with a word.
+    """
+    if not token.synonym_group_ids:
+        return token.surface
+    return token.surface + "\t" + ",".join(map(str, token.synonym_group_ids))
+
+
+def get_token_synonyms(
+    token: Token,
+    synonym_extractor: BaseSynonymExtractor,
+    synonym_map: Optional[Dict[str, List[str]]] = None,
+) -> List[str]:
+    """Synonyms of a token, from the `synonym_map` of the corpus if it has them (see `token_key`)."""
+    if synonym_map is not None:
+        synonyms = synonym_map.get(token_key(token))
+        if synonyms is not None:
+            return synonyms
+    return synonym_extractor.get_synonyms_for_token(token)
+
+def get_table_synonyms(
+    word: str,
+    synonym_extractor: BaseSynonymExtractor,
+    synonym_table: Optional[Dict[str, List[str]]] = None,
+) -> List[str]:
+    if synonym_table is None:
+        return synonym_extractor.get_synonyms(word)
+    try:
+        return synonym_table[word]
+    except KeyError:
+        return synonym_extractor.get_synonyms(word)
+
+
+def get_replacement_candidates(
+    words: List[str],
+    synonym_extractor: BaseSynonymExtractor,
+    synonym_table: Optional[Dict[str, List[str]]] = None,
+    stop_words: Optional[AbstractSet] = None,
+) -> List[str]:
+    """Distinct non stop words that can be replaced by a synonym, in order of first occurrence."""
+    if stop_words is None:
+        stop_words = get_stop_words()
+    return [
+        word for word in dict.fromkeys(words)
+        if word not in stop_words and len(get_table_synonyms(word, synonym_extractor, synonym_table)) >= 1
+    ]
+
+
+def get_insertion_candidates(
+    words: List[str],
+    synonym_extractor: BaseSynonymExtractor,
+    synonym_table: Optional[Dict[str, List[str]]] = None,
+) -> List[str]:
+    """Words (with repetition) whose synonyms can be inserted."""
+    return [word for word in words if len(get_table_synonyms(word, synonym_extractor, synonym_table)) >= 1]
+
+
+def synonym_replacement(
+    words: List[str],
+    n: int,
+    synonym_extractor: BaseSynonymExtractor,
+    synonym_table: Optional[Dict[str, List[str]]] = None,
+    candidates: Optional[List[str]] = None,
+    positions: Optional[Dict[str, List[int]]] = None,
+    rng=random,
+) -> List[str]:
+    new_words = words[:]
+    if candidates is None:
+        candidates = get_replacement_candidates(words, synonym_extractor, synonym_table)
+    if positions is None:
+        positions = get_word_positions(words)
+    random_word_list = candidates.copy()
+    rng.shuffle(random_word_list)
+    for random_word in random_word_list[:n]:
+        synonym = rng.choice(get_table_synonyms(random_word, synonym_extractor, synonym_table))
+        for i in positions[random_word]:
+            new_words[i] = synonym
 
     # followed original eda.py
     # > this is stupid but we need it, trust me
-    sentence = " ".join(new_words)
-    new_words = sentence.split(" ")
+    if isinstance(new_words, list):
+        sentence = " ".join(new_words)
+        new_words = sentence.split(" ")
     return new_words
 
 
-def random_insertion(words: List[str], n: int, synonym_extractor: BaseSynonymExtractor) -> List[str]:
+def random_insertion(
+    words: List[str],
+    n: int,
+    synonym_extractor: BaseSynonymExtractor,
+    synonym_table: Optional[Dict[str, List[str]]] = None,
+    candidates: Optional[List[str]] = None,
+    rng=random,
+) -> List[str]:
+    # Only words that have synonyms are picked, so no draw is wasted
+    if candidates is None:
+        candidates = get_insertion_candidates(words, synonym_extractor, synonym_table)
+
     def add_word(new_words: List[str]) -> None:
-        synonyms = []
-        counter = 0
-        while len(synonyms) < 1:
-            random_word = words[random.randint(0, len(words) - 1)]
-            synonyms = synonym_extractor.get_synonyms(random_word)
-            counter += 1
-            if counter >= 10:
-                return
-        random_synonym = synonyms[0]
-        random_idx = random.randint(0, len(new_words) - 1)
+        if len(candidates) == 0:
+            return
+        random_word = candidates[rng.randint(0, len(candidates) - 1)]
+        random_synonym = rng.choice(get_table_synonyms(random_word, synonym_extractor, synonym_table))
+        random_idx = rng.randint(0, len(new_words) - 1)
         new_words.insert(random_idx, random_synonym)
 
-    new_words = words.copy()
+    new_words = words[:]
     for _ in range(n):
         add_word(new_words)
     return new_words
@@ -92,49 +220,249 @@ def eda_ja(
     p_rd: float = 0.1,
     num_aug: int = 9,
     is_append_original: bool = False,
+    rng=random,
 ) -> List[str]:
     """Perform EDA for Japanese."""
     if synonym_extractor.name == "sudachi":
         assert tokenizer.name == "sudachi"
 
     sentence = get_only_chars(sentence)
-    words = tokenizer.tokenize(sentence)
+    tokens = tokenizer.tokenize_tokens(sentence)
+    words = [token.surface for token in tokens]
+    synonym_table = SentenceSynonymTable(words, tokens, synonym_extractor.get_synonyms_for_token, synonym_extractor.get_synonyms)
+    return eda_ja_words(
+        sentence, words, synonym_extractor, synonym_table,
+        alpha_sr, alpha_ri, alpha_rs, p_rd, num_aug, is_append_original, rng=rng,
+    )
+
+
+def eda_ja_batch(
+    sentences: Iterable[str],
+    tokenizer: BaseTokenizer,
+    synonym_extractor: BaseSynonymExtractor,
+    alpha_sr: float = 0.1,
+    alpha_ri: float = 0.1,
+    alpha_rs: float = 0.1,
+    p_rd: float = 0.1,
+    num_aug: int = 9,
+    is_append_original: bool = False,
+    interned: bool = False,
+    vectorized: bool = False,
+    plans: Optional[List[List[str]]] = None,
+    synonym_map: Optional[Dict[str, List[str]]] = None,
+    rng=random,
+    stop_words: Optional[AbstractSet[str]] = None,
+    rngs: Optional[Sequence[random.Random]] = None,
+) -> List[List[str]]:
+    """Perform EDA for Japanese on a batch of sentences.
+
+    Sentences are tokenized in bulk and the synonyms of each distinct word
+    in the batch are looked up only once. With `interned=True` the words are
+    turned into integer ids of a batch `Vocabulary` before augmentation, and
+    with `vectorized=True` random swap and random deletion are drawn for the
+    whole batch with NumPy. `plans` optionally fixes the technique of each
+    augmented sentence of each input sentence (see `planner.py`), and
+    `synonym_map` optionally holds the synonyms of the whole corpus
+    vocabulary (see `build_ja_synonym_map`). `rng` is the source of
+    randomness (the `random` module by default) and `stop_words` the words
+    that are never replaced (spaCy's by default). `rngs` optionally holds a
+    random generator for each sentence, so that its augmented sentences do
+    not depend on the rest of the batch.
+
+    Returns:
+        List[List[str]]: Augmented sentences for each input sentence.
+    """
+    sentences, words_list, synonym_tables, vocabulary = prepare_ja_batch(
+        sentences, tokenizer, synonym_extractor, interned, synonym_map, stop_words,
+    )
+    rngs = sentence_rngs(rng, rngs, len(words_list))
+    if plans is None and vectorized:
+        # The random swaps and deletions are drawn up front, so the plans have to be as well
+        techniques = get_techniques(alpha_sr, alpha_ri, alpha_rs, p_rd)
+        plans = [plan_augmentation(techniques, num_aug, sentence_rng) for sentence_rng in rngs]
+    elif plans is None:
+        plans = [None] * len(words_list)
+    rs_batch, rd_batch = [None] * len(words_list), [None] * len(words_list)
+    if vectorized:
+        rs_batch, rd_batch = vectorized_variants(words_list, alpha_rs, p_rd, plans, rngs)
+    return [
+        eda_ja_words(
+            sentence, words, synonym_extractor, synonym_table,
+            alpha_sr, alpha_ri, alpha_rs, p_rd, num_aug, is_append_original, vocabulary,
+            plan, rs_variants, rd_variants, sentence_rng, stop_words,
+        )
+        for sentence, words, synonym_table, plan, rs_variants, rd_variants, sentence_rng
+        in zip(sentences, words_list, synonym_tables, plans, rs_batch, rd_batch, rngs)
+    ]
+
+
+def eda_ja_grid_batch(
+    sentences: Iterable[str],
+    tokenizer: BaseTokenizer,
+    synonym_extractor: BaseSynonymExtractor,
+    configs: Iterable[GridConfig],
+    is_append_original: bool = False,
+    interned: bool = False,
+    synonym_map: Optional[Dict[str, List[str]]] = None,
+    rng=random,
+    stop_words: Optional[AbstractSet[str]] = None,
+    rngs: Optional[Sequence[random.Random]] = None,
+) -> List[List[List[str]]]:
+    """Perform EDA for Japanese with every configuration of a grid.
+
+    The sentences are cleaned, tokenized and looked up only once for the
+    whole grid of single-technique configurations. `rngs` optionally holds
+    a random generator for each sentence (see `eda_ja_batch`).
+
+    Returns:
+        List[List[List[str]]]: Augmented sentences of each input sentence for each configuration.
+    """
+    sentences, words_list, synonym_tables, vocabulary = prepare_ja_batch(
+        sentences, tokenizer, synonym_extractor, interned, synonym_map, stop_words,
+    )
+    rngs = sentence_rngs(rng, rngs, len(words_list))
+    return [
+        [
+            eda_ja_words(
+                sentence, words, synonym_extractor, synonym_table,
+                *config.alphas(), config.num_aug, is_append_original, vocabulary, config.plan(),
+                rng=sentence_rng, stop_words=stop_words,
+            )
+            for sentence, words, synonym_table, sentence_rng in zip(sentences, words_list, synonym_tables, rngs)
+        ]
+        for config in configs
+    ]
+
+
+def prepare_ja_batch(
+    sentences: Iterable[str],
+    tokenizer: BaseTokenizer,
+    synonym_extractor: BaseSynonymExtractor,
+    interned: bool = False,
+    synonym_map: Optional[Dict[str, List[str]]] = None,
+    stop_words: Optional[AbstractSet[str]] = None,
+) -> Tuple[List[str], List[Sequence], List[SentenceSynonymTable], Optional[Vocabulary]]:
+    """Clean and tokenize a batch and build the synonym table of each sentence.
+
+    The synonyms of the words are looked up from their tokens (see
+    `BaseSynonymExtractor.get_synonyms_for_token`), unless they are in the
+    `synonym_map` of the corpus. Every distinct token of the batch, i.e.
+    surface and synonym group ids, is looked up at most once.
+
+    Returns:
+        Tuple[List[str], List[Sequence], List[SentenceSynonymTable], Optional[Vocabulary]]: Cleaned sentences, their words
+        (or ids), their synonym tables and the `Vocabulary` of the ids (None unless `interned`).
+    """
+    if synonym_extractor.name == "sudachi":
+        assert tokenizer.name == "sudachi"
+
+    sentences = [get_only_chars(sentence) for sentence in sentences]
+    tokens_list = tokenizer.tokenize_tokens_batch(sentences)
+    words_list: List[Sequence] = [[token.surface for token in tokens] for tokens in tokens_list]
+    lookup = functools.lru_cache(maxsize=None)(
+        functools.partial(get_token_synonyms, synonym_extractor=synonym_extractor, synonym_map=synonym_map)
+    )
+    fallback = functools.partial(get_table_synonyms, synonym_extractor=synonym_extractor, synonym_table=synonym_map)
+    vocabulary = None
+    if interned:
+        vocabulary = Vocabulary("", get_stop_words() if stop_words is None else stop_words)
+        words_list = [vocabulary.encode(words) for words in words_list]
+        token_lookup = lookup
+
+        def lookup_ids(token: Token) -> Sequence[int]:
+            return vocabulary.encode(token_lookup(token))
+
+        lookup = functools.lru_cache(maxsize=None)(lookup_ids)
+        fallback = SynonymIdTable(vocabulary, fallback).__getitem__
+    synonym_tables = [
+        SentenceSynonymTable(words, tokens, lookup, fallback) for words, tokens in zip(words_list, tokens_list)
+    ]
+    return sentences, words_list, synonym_tables, vocabulary
+
+
+def build_ja_synonym_map(
+    sentences: Iterable[str],
+    tokenizer: BaseTokenizer,
+    synonym_extractor: BaseSynonymExtractor,
+    batch_size: int = 1000,
+) -> Dict[str, List[str]]:
+    """Look up the synonyms of every distinct token of a corpus, for the two-pass mode (see `synonym_map.py`).
+
+    The map is keyed by `token_key`, i.e. by surface and synonym group ids,
+    so every reading of a homograph keeps its own synonyms. The surfaces are
+    prefetched first (see `BaseSynonymExtractor.prefetch`).
+    """
+    if synonym_extractor.name == "sudachi":
+        assert tokenizer.name == "sudachi"
+
+    tokens: Dict[str, Token] = {}
+    for batch in iter_chunks(sentences, batch_size):
+        for sentence_tokens in tokenizer.tokenize_tokens_batch([get_only_chars(sentence) for sentence in batch]):
+            for token in sentence_tokens:
+                tokens.setdefault(token_key(token), token)
+    synonym_extractor.prefetch({token.surface for token in tokens.values()})
+    return {key: synonym_extractor.get_synonyms_for_token(token) for key, token in tokens.items()}
+
+
+def eda_ja_words(
+    sentence: str,
+    words: List[str],
+    synonym_extractor: BaseSynonymExtractor,
+    synonym_table: Optional[Dict[str, List[str]]],
+    alpha_sr: float,
+    alpha_ri: float,
+    alpha_rs: float,
+    p_rd: float,
+    num_aug: int,
+    is_append_original: bool,
+    vocabulary: Optional[Vocabulary] = None,
+    plan: Optional[List[str]] = None,
+    rs_variants: Optional[List[List[str]]] = None,
+    rd_variants: Optional[List[List[str]]] = None,
+    rng=random,
+    stop_words: Optional[AbstractSet[str]] = None,
+) -> List[str]:
+    """Perform EDA on a cleaned sentence that is already tokenized into `words`.
+
+    If `vocabulary` is given, `words` and `synonym_table` hold its integer ids.
+    `plan` optionally fixes the technique of each augmented sentence (see
+    `eda.planner`), and `rs_variants` and `rd_variants` optionally hold
+    precomputed random swap and random deletion variants. Random draws come
+    from `rng` and `stop_words` overrides spaCy's stop words.
+    """
     num_words = len(words)
+    if vocabulary is None:
+        join, stop = "".join, get_stop_words() if stop_words is None else stop_words
+    else:
+        join, stop = vocabulary.decode, vocabulary.stop_ids
 
-    augmented_sentences = []
-    num_new_per_technique = int(num_aug / 4) + 1
+    # Decide up front which technique produces each kept sentence, so that nothing is generated and thrown away
+    if plan is None:
+        plan = plan_augmentation(get_techniques(alpha_sr, alpha_ri, alpha_rs, p_rd), num_aug, rng)
+    rs_iter = iter(rs_variants) if rs_variants is not None else None
+    rd_iter = iter(rd_variants) if rd_variants is not None else None
 
-    if alpha_sr > 0:
+    # The synonym candidates of the sentence are shared by all SR and RI variants
+    if "sr" in plan:
         n_sr = max(1, int(alpha_sr * num_words))
-        for _ in range(num_new_per_technique):
-            a_words = synonym_replacement(words, n_sr, synonym_extractor)
-            augmented_sentences.append("".join(a_words))
-
-    if alpha_ri > 0:
+        sr_candidates = get_replacement_candidates(words, synonym_extractor, synonym_table, stop)
+        positions = get_word_positions(words)
+    if "ri" in plan:
         n_ri = max(1, int(alpha_ri * num_words))
-        for _ in range(num_new_per_technique):
-            a_words = random_insertion(words, n_ri, synonym_extractor)
-            augmented_sentences.append("".join(a_words))
-
-    if alpha_rs > 0:
-        n_rs = max(1, int(alpha_rs * num_words))
-        for _ in range(num_new_per_technique):
-            a_words = random_swap(words, n_rs)
-            augmented_sentences.append("".join(a_words))
-
-    if p_rd > 0:
-        for _ in range(num_new_per_technique):
-            a_words = random_deletion(words, p_rd)
-            augmented_sentences.append("".join(a_words))
-
-    augmented_sentences = [get_only_chars(sentence) for sentence in augmented_sentences]
-    random.shuffle(augmented_sentences)
-
-    if num_aug >= 1:
-        augmented_sentences = augmented_sentences[:num_aug]
-    else:
-        keep_prob = num_aug / len(augmented_sentences)
-        augmented_sentences = [s for s in augmented_sentences if random.uniform(0, 1) < keep_prob]
+        ri_candidates = get_insertion_candidates(words, synonym_extractor, synonym_table)
+    n_rs = max(1, int(alpha_rs * num_words))
+
+    augmented_sentences = []
+    for technique in plan:
+        if technique == "sr":
+            a_words = synonym_replacement(words, n_sr, synonym_extractor, synonym_table, sr_candidates, positions, rng)
+        elif technique == "ri":
+            a_words = random_insertion(words, n_ri, synonym_extractor, synonym_table, ri_candidates, rng)
+        elif technique == "rs":
+            a_words = random_swap(words, n_rs, rng) if rs_iter is None else next(rs_iter)
+        else:
+            a_words = random_deletion(words, p_rd, rng) if rd_iter is None else next(rd_iter)
+        augmented_sentences.append(get_only_chars(join(a_words)))
 
     if is_append_original:
         augmented_sentences.append(sentence)
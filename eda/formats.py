@@ -0,0 +1,290 @@
+"""Readers and writers of the augmentation data formats.
+
+* `tsv`: `label<TAB>sentence` lines, the format of the original EDA code.
+* `jsonl`: one JSON object per line.
+* `parquet` and `arrow` (Arrow IPC file): columnar tables.
+
+The text formats can be compressed with gzip (`.gz`) or zstd (`.zst`). The
+format and the compression are detected from the file extension, and `-`
+stands for stdin / stdout. Augmented records carry the id (0-based line
+number) of the input record they come from and the technique that produced
+them: JSON lines and the columnar formats store them, TSV keeps only the
+label and the sentence.
+
+zstd requires `zstandard` and the columnar formats require `pyarrow`
+(`pip install -e ".[zstd]"`, `pip install -e ".[arrow]"`).
+"""
+import gzip
+import io
+import itertools
+import json
+import os
+import sys
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+
+FORMATS = ("tsv", "jsonl", "parquet", "arrow")
+COLUMNAR_FORMATS = ("parquet", "arrow")
+FORMAT_EXTENSIONS = {
+    ".tsv": "tsv",
+    ".txt": "tsv",
+    ".jsonl": "jsonl",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+T = TypeVar("T")
+
+
+class Record(NamedTuple):
+    label: str
+    sentence: str
+
+
+class AugmentedRecord(NamedTuple):
+    line_id: int
+    label: str
+    sentence: str
+    technique: str
+
+
+def detect_format(path: str, format: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Return the format and the compression of `path`.
+
+    Args:
+        path: File path, or `-` for stdin / stdout (uncompressed).
+        format: Format that overrides the one of the file extension.
+            Unknown extensions are TSV.
+
+    Returns:
+        Tuple[str, Optional[str]]: Format and compression (`"gzip"`, `"zstd"` or None).
+    """
+    if path == "-":
+        return format or "tsv", None
+    root, extension = os.path.splitext(path)
+    compression = COMPRESSIONS.get(extension.lower())
+    if compression is not None:
+        extension = os.path.splitext(root)[1]
+    format = format or FORMAT_EXTENSIONS.get(extension.lower(), "tsv")
+    if format not in FORMATS:
+        raise ValueError(f"Invalid format: {format}")
+    if compression is not None and format in COLUMNAR_FORMATS:
+        raise ValueError(f"{format} files are compressed internally, not with {compression}")
+    return format, compression
+
+
+def is_resumable_output(path: str, format: Optional[str] = None) -> bool:
+    """Whether an interrupted output can be truncated to a checkpoint and appended to."""
+    return path != "-" and detect_format(path, format) in [("tsv", None), ("jsonl", None)]
+
+
+def iter_chunks(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Lazily split `items` into lists of `batch_size` items."""
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, batch_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _open_binary(path: str, mode: str, compression: Optional[str]) -> IO[bytes]:
+    if compression == "gzip":
+        return gzip.open(path, mode)
+    if compression == "zstd":
+        import zstandard
+        stream = zstandard.open(path, mode)
+        # The zstd reader has no line iteration of its own
+        return io.BufferedReader(stream) if mode == "rb" else stream
+    return open(path, mode)
+
+
+def _skip(stream: IO[bytes], offset: int) -> None:
+    if stream.seekable():
+        stream.seek(offset)
+        return
+    while offset > 0:
+        block = stream.read(min(offset, 1 << 20))
+        if not block:
+            return
+        offset -= len(block)
+
+
+def _parse_tsv(line: bytes) -> Record:
+    parts = line.decode("utf-8").rstrip("\r\n").split("\t")
+    return Record(parts[0], parts[1])
+
+
+def _parse_jsonl(line: bytes) -> Record:
+    record = json.loads(line)
+    return Record(str(record["label"]), record["sentence"])
+
+
+def read_chunks(
+    path: str,
+    batch_size: int,
+    offset: int = 0,
+    format: Optional[str] = None,
+) -> Iterator[Tuple[List[Record], int]]:
+    """Lazily read the records of `path` in chunks of `batch_size`.
+
+    Args:
+        path: Input file, or `-` for stdin.
+        batch_size: Number of records per chunk.
+        offset: Offset returned with an earlier chunk to continue after it.
+        format: Format that overrides the one of the file extension.
+
+    Yields:
+        Tuple[List[Record], int]: Records of a chunk and the offset after it
+        (the uncompressed byte offset for text formats and the row number
+        for columnar formats).
+    """
+    format, compression = detect_format(path, format)
+    if format in COLUMNAR_FORMATS:
+        if path == "-":
+            raise ValueError(f"{format} input cannot be read from stdin")
+        yield from _read_columnar_chunks(path, format, batch_size, offset)
+        return
+
+    parse = _parse_tsv if format == "tsv" else _parse_jsonl
+    if path == "-":
+        assert offset == 0, "stdin cannot be resumed."
+        stream = sys.stdin.buffer
+    else:
+        stream = _open_binary(path, "rb", compression)
+    try:
+        if offset:
+            _skip(stream, offset)
+        for lines in iter_chunks(stream, batch_size):
+            offset += sum(map(len, lines))
+            yield [parse(line) for line in lines], offset
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+def _read_columnar_chunks(path: str, format: str, batch_size: int, offset: int) -> Iterator[Tuple[List[Record], int]]:
+    import pyarrow as pa
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=["label", "sentence"])
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    rows = (
+        Record(str(label), sentence)
+        for batch in batches
+        for label, sentence in zip(batch.column("label").to_pylist(), batch.column("sentence").to_pylist())
+    )
+    for records in iter_chunks(itertools.islice(rows, offset, None), batch_size):
+        offset += len(records)
+        yield records, offset
+
+
+class TextWriter:
+    """Write augmented records as (compressed) TSV or JSON lines.
+
+    Args:
+        path: Output file, or `-` for stdout.
+        format: `"tsv"` or `"jsonl"`.
+        compression: `"gzip"`, `"zstd"` or None.
+        offset: Byte offset to truncate an uncompressed output to and
+            append after, to continue an interrupted run.
+    """
+    def __init__(self, path: str, format: str, compression: Optional[str] = None, offset: Optional[int] = None):
+        self.format = format
+        if path == "-":
+            assert offset is None, "stdout cannot be resumed."
+            self.stream = sys.stdout.buffer
+        elif offset is not None:
+            if compression is not None:
+                raise ValueError(f"{compression} compressed output cannot be resumed")
+            if os.path.getsize(path) < offset:
+                raise ValueError(path + " is shorter than its checkpoint, it cannot be resumed")
+            self.stream = open(path, "r+b")
+            self.stream.seek(offset)
+            self.stream.truncate()
+        else:
+            self.stream = _open_binary(path, "wb", compression)
+
+    def _encode(self, record: AugmentedRecord) -> str:
+        if self.format == "tsv":
+            return record.label + "\t" + record.sentence + "\n"
+        return json.dumps(record._asdict(), ensure_ascii=False) + "\n"
+
+    def write(self, records: Iterable[AugmentedRecord]) -> None:
+        self.stream.write("".join(map(self._encode, records)).encode("utf-8"))
+
+    def sync(self) -> int:
+        """Flush the written records to disk and return the output offset."""
+        self.stream.flush()
+        os.fsync(self.stream.fileno())
+        return self.stream.tell()
+
+    def close(self) -> None:
+        if self.stream is sys.stdout.buffer:
+            self.stream.flush()
+        else:
+            self.stream.close()
+
+    def __enter__(self) -> "TextWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ColumnarWriter:
+    """Write augmented records as a Parquet or Arrow IPC file, one record batch per `write`.
+
+    Args:
+        path: Output file.
+        format: `"parquet"` or `"arrow"`.
+    """
+    def __init__(self, path: str, format: str):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("line_id", pa.int64()),
+            ("label", pa.string()),
+            ("sentence", pa.string()),
+            ("technique", pa.string()),
+        ])
+        if format == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, records: Sequence[AugmentedRecord]) -> None:
+        if not records:
+            return
+        columns = [self.pa.array(column, field.type) for column, field in zip(zip(*records), self.schema)]
+        self.writer.write_batch(self.pa.record_batch(columns, schema=self.schema))
+
+    def sync(self) -> int:
+        raise ValueError("columnar output cannot be resumed")
+
+    def close(self) -> None:
+        self.writer.close()
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def open_writer(path: str, format: Optional[str] = None, offset: Optional[int] = None):
+    """Open a writer of augmented records for `path` (see `TextWriter` and `ColumnarWriter`)."""
+    format, compression = detect_format(path, format)
+    if format in COLUMNAR_FORMATS:
+        if path == "-":
+            raise ValueError(f"{format} output cannot be written to stdout")
+        if offset is not None:
+            raise ValueError(f"{format} output cannot be resumed")
+        return ColumnarWriter(path, format)
+    return TextWriter(path, format, compression, offset)
@@ -0,0 +1,54 @@
+"""Integer-interned token representation for the augmentation operators.
+
+In interned mode every distinct word of a batch gets an integer id and
+sentences become compact `array('i')` ids. The operators of `eda.eda` and
+`eda.eda_japanese` work on those ids directly, and text is only rebuilt
+when the augmented sentences are output.
+"""
+from array import array
+from typing import Callable, Dict, Iterable, List, Sequence
+
+
+class Vocabulary:
+    """Bidirectional mapping between words and integer ids.
+
+    Args:
+        separator: String placed between words when decoding ids to text.
+        stop_words: Words whose ids are exposed as `stop_ids`.
+    """
+    def __init__(self, separator: str = " ", stop_words: Iterable[str] = ()):
+        self.separator = separator
+        self.ids: Dict[str, int] = {}
+        self.words: List[str] = []
+        self.stop_ids = frozenset(self.intern(word) for word in stop_words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def intern(self, word: str) -> int:
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.ids[word] = word_id
+            self.words.append(word)
+        return word_id
+
+    def encode(self, words: Iterable[str]) -> array:
+        return array("i", map(self.intern, words))
+
+    def decode(self, ids: Sequence[int]) -> str:
+        words = self.words
+        return self.separator.join([words[word_id] for word_id in ids])
+
+
+class SynonymIdTable(dict):
+    """Map word ids to the ids of their synonyms, looked up on first access."""
+    def __init__(self, vocabulary: Vocabulary, get_synonyms: Callable[[str], List[str]]):
+        super().__init__()
+        self.vocabulary = vocabulary
+        self.get_synonyms = get_synonyms
+
+    def __missing__(self, word_id: int) -> array:
+        synonym_ids = self.vocabulary.encode(self.get_synonyms(self.vocabulary.words[word_id]))
+        self[word_id] = synonym_ids
+        return synonym_ids
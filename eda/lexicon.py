@@ -0,0 +1,200 @@
+"""Compiled, memory-mapped string lexicon.
+
+A lexicon maps string keys to lists of strings and is stored in a single
+binary file that is memory-mapped at load time, so lookups do not require
+parsing the whole resource and pages are shared between processes.
+
+Layout (all integers are little-endian uint32)::
+
+    magic (8 bytes) | n_entries
+    key offsets   (n_entries + 1)
+    value offsets (n_entries + 1)
+    key pool      (utf-8 keys, sorted by their encoded bytes)
+    value pool    (utf-8 values, every item terminated by "\\n")
+
+An id lexicon maps small non-negative integer ids to lists of strings. The
+id indexes the offset table directly, so there is no key pool to search::
+
+    magic (8 bytes) | n_ids (largest id + 1)
+    value offsets (n_ids + 1)
+    value pool    (as above)
+"""
+import mmap
+import os
+import struct
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"EDALEX\x00\x01"
+ID_MAGIC = b"EDAIDX\x00\x01"
+_HEADER = struct.Struct("<8sI")
+_UINT = struct.Struct("<I")
+
+
+def write_lexicon(path: str, entries: Dict[str, Iterable[str]]) -> None:
+    """Compile `entries` into a lexicon file at `path`.
+
+    The file is written to a temporary path first and moved into place, so
+    readers never observe a partially written lexicon.
+    """
+    keys = sorted(entries, key=lambda k: k.encode("utf-8"))
+    key_offsets = [0]
+    key_pool = bytearray()
+    for key in keys:
+        key_pool += key.encode("utf-8")
+        key_offsets.append(len(key_pool))
+    value_offsets, value_pool = _value_pool(entries[key] for key in keys)
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(keys)))
+        f.write(struct.pack(f"<{len(key_offsets)}I", *key_offsets))
+        f.write(struct.pack(f"<{len(value_offsets)}I", *value_offsets))
+        f.write(key_pool)
+        f.write(value_pool)
+    os.replace(tmp_path, path)
+
+
+def user_cache_path(path: str) -> str:
+    """Path of the file name of `path` in the user cache directory, `$XDG_CACHE_HOME/eda` (default `~/.cache/eda`)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "eda", os.path.basename(path))
+
+
+def is_writable(path: str) -> bool:
+    """Whether a file can be created at `path`, creating its missing parent directories if needed."""
+    directory = os.path.dirname(os.path.abspath(path))
+    while not os.path.isdir(directory):
+        if os.path.exists(directory):
+            return False
+        directory = os.path.dirname(directory)
+    return os.access(directory, os.W_OK)
+
+
+def compiled_path(
+    path: str,
+    build: Callable[[str], None],
+    is_stale: Callable[[str], bool] = lambda path: not os.path.isfile(path),
+) -> str:
+    """Path of an up-to-date compiled file, building it with `build` if needed.
+
+    The file is built at `path`, unless its directory is not writable (e.g. a
+    read-only site-packages), in which case it is built at or reused from
+    `user_cache_path(path)`.
+    """
+    if not is_stale(path):
+        return path
+    if is_writable(path):
+        build(path)
+        return path
+    cache_path = user_cache_path(path)
+    if is_stale(cache_path):
+        build(cache_path)
+    return cache_path
+
+
+def _value_pool(values_list: Iterable[Iterable[str]]) -> Tuple[List[int], bytearray]:
+    value_offsets = [0]
+    value_pool = bytearray()
+    for values in values_list:
+        for value in values:
+            assert "\n" not in value, f"Lexicon values must not contain newlines: {value!r}"
+            value_pool += value.encode("utf-8") + b"\n"
+        value_offsets.append(len(value_pool))
+    return value_offsets, value_pool
+
+
+def write_id_lexicon(path: str, entries: Dict[int, Iterable[str]]) -> None:
+    """Compile `entries`, keyed by non-negative integer ids, into an id lexicon file at `path`."""
+    n_ids = max(entries, default=-1) + 1
+    value_offsets, value_pool = _value_pool(entries.get(i, ()) for i in range(n_ids))
+
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(ID_MAGIC, n_ids))
+        f.write(struct.pack(f"<{len(value_offsets)}I", *value_offsets))
+        f.write(value_pool)
+    os.replace(tmp_path, path)
+
+
+class Lexicon:
+    """Read-only view of a compiled lexicon file."""
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._size = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled lexicon.")
+        self._key_offsets = _HEADER.size
+        self._value_offsets = self._key_offsets + _UINT.size * (self._size + 1)
+        self._key_pool = self._value_offsets + _UINT.size * (self._size + 1)
+        self._value_pool = self._key_pool + self._offset(self._key_offsets, self._size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._size):
+            yield self._key(index).decode("utf-8")
+
+    def _offset(self, table: int, index: int) -> int:
+        return _UINT.unpack_from(self._buffer, table + _UINT.size * index)[0]
+
+    def _key(self, index: int) -> bytes:
+        start = self._key_pool + self._offset(self._key_offsets, index)
+        end = self._key_pool + self._offset(self._key_offsets, index + 1)
+        return self._buffer[start:end]
+
+    def _find(self, key: str) -> Optional[int]:
+        target = key.encode("utf-8")
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._size and self._key(low) == target:
+            return low
+        return None
+
+    def get(self, key: str, default: Optional[List[str]] = None) -> Optional[List[str]]:
+        """Return the values stored for `key`, or `default` if it is absent."""
+        index = self._find(key)
+        if index is None:
+            return default
+        start = self._value_pool + self._offset(self._value_offsets, index)
+        end = self._value_pool + self._offset(self._value_offsets, index + 1)
+        return self._buffer[start:end].decode("utf-8").split("\n")[:-1]
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+class IdLexicon:
+    """Read-only view of a compiled id lexicon file."""
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._size = _HEADER.unpack_from(self._buffer, 0)
+        if magic != ID_MAGIC:
+            raise ValueError(f"{path} is not a compiled id lexicon.")
+        self._value_offsets = _HEADER.size
+        self._value_pool = self._value_offsets + _UINT.size * (self._size + 1)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, id: int, default: Optional[List[str]] = None) -> Optional[List[str]]:
+        """Return the values stored for `id` (empty for ids without values), or `default` if it is out of range."""
+        if not 0 <= id < self._size:
+            return default
+        start, end = struct.unpack_from("<2I", self._buffer, self._value_offsets + _UINT.size * id)
+        return self._buffer[self._value_pool + start:self._value_pool + end].decode("utf-8").split("\n")[:-1]
+
+    def close(self) -> None:
+        self._buffer.close()
@@ -0,0 +1,86 @@
+"""Exact-budget augmentation planning.
+
+EDA used to generate `int(num_aug/4)+1` sentences with every enabled
+technique, shuffle them and then keep the first `num_aug` of them (or each
+one with probability `num_aug / total` when `num_aug < 1`). The planner
+shuffles and trims a pool of technique labels instead, so only the kept
+sentences have to be generated. Since the sentences of one technique are
+drawn independently, this keeps the same distribution over the techniques
+and the order of the output.
+"""
+import math
+import random
+from typing import List, NamedTuple, Sequence, Tuple
+
+TECHNIQUES = ("sr", "ri", "rs", "rd")
+
+
+class GridConfig(NamedTuple):
+    """Single-technique configuration of an augmentation grid.
+
+    Every input sentence gets `num_aug` augmented sentences made with
+    `technique` and `alpha`, like `experiments/methods.py`'s `gen_sr_aug`.
+    """
+    technique: str
+    alpha: float
+    num_aug: int
+
+    def alphas(self) -> Tuple[float, float, float, float]:
+        """`(alpha_sr, alpha_ri, alpha_rs, p_rd)` with only the alpha of the technique set."""
+        sr, ri, rs, rd = (self.alpha if technique == self.technique else 0.0 for technique in TECHNIQUES)
+        return sr, ri, rs, rd
+
+    def plan(self) -> List[str]:
+        return [self.technique] * self.num_aug
+
+
+def parse_grid_config(spec: str) -> GridConfig:
+    """Parse a `technique:alpha:num_aug` grid configuration, e.g. `sr:0.1:16`."""
+    technique, alpha, num_aug = spec.split(":")
+    if technique not in TECHNIQUES:
+        raise ValueError(f"Invalid technique: {technique}")
+    return GridConfig(technique, float(alpha), int(num_aug))
+
+
+def plan_augmentation(techniques: Sequence[str], num_aug: float, rng=random) -> List[str]:
+    """Decide which technique produces each augmented sentence.
+
+    Args:
+        techniques: Enabled techniques, e.g. `["sr", "ri", "rs", "rd"]`.
+        num_aug: Number of augmented sentences. Values below 1 are the
+            expected number of sentences.
+        rng: Source of randomness, the `random` module by default.
+
+    Returns:
+        List[str]: Technique of each augmented sentence, in output order.
+    """
+    num_new_per_technique = int(num_aug / 4) + 1
+    pool = [technique for technique in techniques for _ in range(num_new_per_technique)]
+    if not pool:
+        return []
+    rng.shuffle(pool)
+
+    if num_aug >= 1:
+        return pool[:int(num_aug)]
+    keep_prob = num_aug / len(pool)
+    return [technique for technique in pool if rng.uniform(0, 1) < keep_prob]
+
+
+def nested_counts(num_augs: Sequence[float], rng=random) -> List[int]:
+    """Numbers of augmented sentences of one sentence for several `num_aug` values at once.
+
+    One uniform draw decides all counts: `num_aug` gives `floor(num_aug)`
+    sentences plus one more with probability `num_aug - floor(num_aug)`.
+    The counts grow with `num_aug`, so taking that many sentences from the
+    front of a single plan for `max(num_augs)` makes the smaller outputs
+    prefixes of the larger ones.
+
+    Args:
+        num_augs: Numbers of augmented sentences, e.g. `[0.5, 1, 2, 4]`.
+        rng: Source of randomness, the `random` module by default.
+
+    Returns:
+        List[int]: Number of sentences for each of `num_augs`.
+    """
+    u = rng.uniform(0, 1)
+    return [math.floor(num_aug) + (u < num_aug - math.floor(num_aug)) for num_aug in num_augs]
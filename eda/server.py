@@ -0,0 +1,193 @@
+"""Long-lived augmentation server.
+
+The tokenizers, synonym resources and caches of each language are loaded
+once at start-up, and batches of sentences are then augmented over HTTP,
+either on a local TCP port or on a Unix socket::
+
+    $ python -m eda.server --port 8080
+    $ python -m eda.server --socket /tmp/eda.sock --lang en ja
+
+Endpoints:
+
+* `GET /health`: `{"status": "ok", "langs": [...]}`.
+* `POST /augment`: `{"lang": "en", "sentences": [...], "num_aug": 9, ...}`
+  with the optional keys `alpha_sr`, `alpha_ri`, `alpha_rs`, `p_rd` and
+  `seed`, answered with `{"augmented": [[...], ...]}`.
+
+Bad requests, such as sentences without any word to augment, are answered
+with status 400 and `{"error": "..."}`, and failures with status 500.
+
+See `eda.client.EDAClient` for a client.
+"""
+import argparse
+import json
+import os
+import socketserver
+import threading
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .augment import build_eda_func, rng_kwargs
+from .cache import DEFAULT_CACHE_SIZE
+from .eda import get_only_chars as get_english_chars
+from .eda_japanese import get_only_chars as get_japanese_chars
+
+AUGMENT_PARAMS = ("alpha_sr", "alpha_ri", "alpha_rs", "p_rd", "num_aug")
+# Cleaning of each language, which has to leave some text to augment
+GET_ONLY_CHARS = {"en": get_english_chars, "ja": get_japanese_chars}
+
+
+class EDAService:
+    """Augmentation functions of several languages with their resources loaded.
+
+    Args:
+        langs: Languages to serve, `"en"` and/or `"ja"`.
+        **eda_config: Keyword arguments of `eda.augment.build_eda_func`
+            other than `lang`.
+    """
+    def __init__(self, langs: Iterable[str] = ("en", "ja"), **eda_config: Any):
+        self.eda_funcs: Dict[str, Callable] = {}
+        for lang in langs:
+            self.eda_funcs[lang], _ = build_eda_func(lang, **eda_config)
+        # Unseeded requests draw from the global random module and the
+        # tokenizers are not thread-safe, so requests are augmented one at a time.
+        self.lock = threading.Lock()
+
+    def augment(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(request, dict):
+            raise ValueError("the request must be a JSON object")
+        lang = request.get("lang", "en")
+        if lang not in self.eda_funcs:
+            raise ValueError(f"Unsupported language: {lang}")
+        sentences = request["sentences"]
+        if not isinstance(sentences, list) or not all(isinstance(sentence, str) for sentence in sentences):
+            raise ValueError("sentences must be a list of strings")
+        for i, sentence in enumerate(sentences):
+            if not sentence.strip() or not GET_ONLY_CHARS[lang](sentence).strip():
+                raise ValueError(f"sentences[{i}] has no words to augment: {sentence!r}")
+        params = {key: request[key] for key in AUGMENT_PARAMS if key in request}
+        # seeded requests get their own random generators and leave the global state alone
+        params.update(rng_kwargs(request.get("seed"), 0, len(sentences)))
+        with self.lock:
+            augmented = self.eda_funcs[lang](sentences, **params)
+        return {"augmented": augmented}
+
+
+class EDARequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Not found: {self.path}"})
+            return
+        self.send_json(HTTPStatus.OK, {"status": "ok", "langs": sorted(self.server.service.eda_funcs)})
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/augment":
+            self.send_json(HTTPStatus.NOT_FOUND, {"error": f"Not found: {self.path}"})
+            return
+        try:
+            response = self.server.service.augment(json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(HTTPStatus.BAD_REQUEST, {"error": f"{type(e).__name__}: {e}"})
+            return
+        except Exception as e:
+            # answer instead of dropping the connection, which clients would retry
+            self.log_error("%s", traceback.format_exc())
+            self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self.send_json(HTTPStatus.OK, response)
+
+    def send_json(self, status: HTTPStatus, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class EDAHTTPServer(ThreadingHTTPServer):
+    """HTTP server of an `EDAService` on a TCP address."""
+    def __init__(self, address, service: EDAService, quiet: bool = False):
+        super().__init__(address, EDARequestHandler)
+        self.service = service
+        self.quiet = quiet
+
+
+class EDAUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """HTTP server of an `EDAService` on a Unix socket."""
+    daemon_threads = True
+
+    def __init__(self, path: str, service: EDAService, quiet: bool = False):
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, EDARequestHandler)
+        self.service = service
+        self.quiet = quiet
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def make_server(
+    service: EDAService,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    socket_path: Optional[str] = None,
+    quiet: bool = False,
+):
+    """Create the server of `service`, on `socket_path` if given and on `host:port` otherwise."""
+    if socket_path is not None:
+        return EDAUnixHTTPServer(socket_path, service, quiet)
+    return EDAHTTPServer((host, port), service, quiet)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serve EDA over HTTP with warm resources.")
+    ap.add_argument("--host", type=str, default="127.0.0.1", help="host to listen on")
+    ap.add_argument("--port", type=int, default=8080, help="port to listen on")
+    ap.add_argument("--socket", type=str, help="Unix socket to listen on instead of host and port")
+    ap.add_argument("--lang", type=str, nargs="+", default=["en", "ja"], choices=["en", "ja"], help="languages to serve")
+    ap.add_argument("--tokenizer", type=str, default="sudachi", help="tokenizer to use for Japanese")
+    ap.add_argument("--mecab-dict", type=str, default="ipadic", help="mecab dictionary to use")
+    ap.add_argument("--synonym_extractor", type=str, default="sudachi", help="synonym extractor to use for Japanese")
+    ap.add_argument("--synonym_cache_size", type=int, default=DEFAULT_CACHE_SIZE, help="number of words whose synonyms are cached")
+    ap.add_argument("--interned", action="store_true", help="augment integer-interned word ids instead of strings")
+    ap.add_argument("--vectorized", action="store_true", help="draw random swaps and deletions for whole batches with numpy")
+    ap.add_argument("--quiet", action="store_true", help="do not log requests")
+    args = ap.parse_args()
+
+    service = EDAService(
+        args.lang,
+        tokenizer=args.tokenizer,
+        mecab_dict=args.mecab_dict,
+        synonym_extractor=args.synonym_extractor,
+        synonym_cache_size=args.synonym_cache_size,
+        interned=args.interned,
+        vectorized=args.vectorized,
+    )
+    server = make_server(service, args.host, args.port, args.socket, args.quiet)
+    print("serving eda for " + ", ".join(args.lang) + " on " + (args.socket or f"http://{args.host}:{server.server_port}"))
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Precompiled Sudachi synonym dictionary for Japanese EDA.
+
+`SudachiSynonymExtractor` used to parse all of `resource/sudachi_synonyms.txt`
+with `csv.reader` into a `Dict[int, Set[str]]` in every process that built
+it. The build step below does that once and stores the synonyms of every
+synonym group in an id lexicon (group id -> offset table plus string pool),
+which is memory-mapped at load time and shared between worker processes.
+
+Build it once with::
+
+    $ python -m eda.sudachi_synonyms
+
+Otherwise it is built on first use, in `$XDG_CACHE_HOME/eda` if the package
+directory is not writable, and rebuilt if the text file is newer.
+"""
+import argparse
+import csv
+import os
+from typing import Dict, List, Optional, Set
+
+from .lexicon import IdLexicon, compiled_path, write_id_lexicon
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+synonym_path = os.path.join(current_dir, "resource/sudachi_synonyms.txt")
+default_index_path = os.environ.get(
+    "EDA_SUDACHI_SYNONYM_INDEX",
+    os.path.join(current_dir, "resource/sudachi_synonyms.bin"),
+)
+
+
+def load_synonym_groups(path: str = synonym_path) -> Dict[int, Set[str]]:
+    """Parse the Sudachi synonym dictionary into the headwords (8th column) of each group id (0th column)."""
+    with open(path, "r") as f:
+        reader = csv.reader(f)
+        data = [row for row in reader]
+
+    synonym_data: Dict[int, Set[str]] = {}
+    synonym_set = set()  # 8th index
+    synonym_group_id: Optional[int] = None  # 0th index
+    for line in data:
+        if not line:
+            if synonym_group_id is not None:
+                synonym_data[synonym_group_id] = synonym_set
+            synonym_set = set()
+            synonym_group_id = None
+        else:
+            synonym_group_id = int(line[0])
+            synonym_set.add(line[8])
+    return synonym_data
+
+
+def build_sudachi_synonym_index(path: str = default_index_path, source: str = synonym_path) -> None:
+    """Compile the Sudachi synonym dictionary `source` into an id lexicon at `path`."""
+    assert os.path.isfile(source), f"Not Found Synonym data at {source}."
+    groups = load_synonym_groups(source)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_id_lexicon(path, {group_id: sorted(synonyms) for group_id, synonyms in groups.items()})
+
+
+class SudachiSynonymIndex:
+    """Synonyms of Sudachi synonym group ids, looked up in the compiled index."""
+    def __init__(self, path: str = default_index_path, source: str = synonym_path):
+        def is_stale(path: str) -> bool:
+            return not os.path.isfile(path) or (os.path.isfile(source) and os.path.getmtime(source) > os.path.getmtime(path))
+
+        self.lexicon = IdLexicon(compiled_path(path, lambda path: build_sudachi_synonym_index(path, source), is_stale))
+
+    def get_synonyms(self, synonym_group_id: int) -> List[str]:
+        """Headwords of the synonym group, or an empty list for unknown ids."""
+        return self.lexicon.get(synonym_group_id, [])
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compile the Sudachi synonym index.")
+    ap.add_argument("--output", required=False, type=str, default=default_index_path, help="path of the compiled index")
+    args = ap.parse_args()
+    build_sudachi_synonym_index(args.output)
+    print("compiled Sudachi synonym index to " + args.output)
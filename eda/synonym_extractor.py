@@ -1,14 +1,11 @@
 """Synonym Extractor for Japanese"""
-import csv
-import os
 from abc import ABC, abstractmethod
-from urllib3.util import Retry
-from typing import List, Dict, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
 
-import requests
-from requests.adapters import HTTPAdapter
-
-from .tokenizer import SudachiTokenizer
+from .cache import DEFAULT_CACHE_SIZE, CacheInfo, LRUCache, SQLiteSynonymCache
+from .sudachi_synonyms import SudachiSynonymIndex, default_index_path
+from .tokenizer import SudachiTokenizer, Token
 
 
 class BaseSynonymExtractor(ABC):
@@ -22,6 +19,22 @@ class BaseSynonymExtractor(ABC):
         """
         pass
 
+    def get_synonyms_for_token(self, token: Token) -> List[str]:
+        """Get synonyms of a token of a tokenized sentence.
+
+        Extractors that can use what the tokenizer found out about the token
+        override this; the others look up its surface.
+        """
+        return self.get_synonyms(token.surface)
+
+    def prefetch(self, words: Iterable[str]) -> None:
+        """Look up the synonyms of many words ahead of augmentation.
+
+        Only extractors with slow lookups override this; the local ones look
+        words up on demand.
+        """
+        pass
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -31,66 +44,148 @@ class BaseSynonymExtractor(ABC):
 class SudachiSynonymExtractor(BaseSynonymExtractor):
     """Sudachi synonym extractor.
 
+    The synonym dictionary is read from a memory-mapped compiled index (see
+    `eda.sudachi_synonyms`), which is built on first use.
+
     TODO: Use chikkar https://github.com/WorksApplications/chikkar/
     """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    synonym_path = os.path.join(current_dir, "resource/sudachi_synonyms.txt")
-    def __init__(self, tokenizer: SudachiTokenizer):
-        assert os.path.isfile(self.synonym_path), f"Not Found Synonym data at {self.synonym_path}."
-        self.synonym_data = self._load_synonyms()
+    def __init__(self, tokenizer: SudachiTokenizer, index_path: str = default_index_path):
+        self.synonym_index = SudachiSynonymIndex(index_path)
         self.tokenizer = tokenizer
 
-    def _load_synonyms(self) -> Dict[int, Set[str]]:
-        with open(self.synonym_path, "r") as f:
-            reader = csv.reader(f)
-            data = [row for row in reader]
-
-        synonym_data: Dict[int, Set[str]] = {}
-        synonym_set = set()  # 8th index
-        synonym_group_id: Optional[int] = None  # 0th index
-        for line in data:
-            if not line:
-                if synonym_group_id is not None:
-                    synonym_data[synonym_group_id] = synonym_set
-                synonym_set = set()
-                synonym_group_id = None
-            else:
-                synonym_group_id = int(line[0])
-                synonym_set.add(line[8])
-        return synonym_data
-
     @property
     def name(self) -> str:
         return "sudachi"
 
     def get_synonyms(self, word: str) -> List[str]:
-        synonym_group_ids = self.tokenizer.get_synonym_group_ids(word)
+        return self._get_group_synonyms(word, self.tokenizer.get_synonym_group_ids(word))
+
+    def get_synonyms_for_token(self, token: Token) -> List[str]:
+        # The group ids come from the sentence pass, so the word is not tokenized again
+        return self._get_group_synonyms(token.surface, token.synonym_group_ids)
+
+    def _get_group_synonyms(self, word: str, synonym_group_ids: Iterable[int]) -> List[str]:
         synonyms = set()
         for synonym_group_id in synonym_group_ids:
-            synonyms |= self.synonym_data.get(synonym_group_id, set())
+            synonyms.update(self.synonym_index.get_synonyms(synonym_group_id))
         synonyms = synonyms - {word}  # Remove original word
-        return list(synonyms)
+        return sorted(synonyms)
 
 
 class ConceptNetSynonymExtractor(BaseSynonymExtractor):
+    """ConceptNet synonym extractor.
+
+    Lookups go through one pooled keep-alive session, and the synonyms found
+    can be kept in a SQLite cache between runs. `prefetch` resolves a whole
+    vocabulary concurrently, so that augmentation only does local lookups.
+
+    Args:
+        base_url: ConceptNet API server, e.g. a local mirror.
+        cache_path: SQLite file caching the synonyms of looked up words.
+        offline: Only serve synonyms from the cache at `cache_path`; words
+            that are not in it have no synonyms.
+        max_connections: Maximum number of concurrent requests of `prefetch`.
+    """
     n_retry = 5
-    url = "http://api.conceptnet.io/query?node=/c/ja/{}&rel=/r/Synonym&limit=1000"
+    backoff_factor = 1.0
+    default_base_url = "http://api.conceptnet.io"
+    query = "/query?node=/c/ja/{}&rel=/r/Synonym&limit=1000"
     connect_timeout = 10.0
     read_timeout = 30.0
-    def __init__(self):
-        self.retry = Retry(total=self.n_retry, backoff_factor=1, status_forcelist=[502, 503, 504])
+    def __init__(
+        self,
+        base_url: str = default_base_url,
+        cache_path: Optional[str] = None,
+        offline: bool = False,
+        max_connections: int = 8,
+    ):
+        if offline and cache_path is None:
+            raise ValueError("Offline ConceptNet lookups need a cache_path.")
+        assert max_connections >= 1, "max_connections must be positive."
+        self.url = base_url.rstrip("/") + self.query
+        self.offline = offline
+        self.max_connections = max_connections
+        self.disk_cache = SQLiteSynonymCache(cache_path) if cache_path is not None else None
+        self.prefetched: Dict[str, List[str]] = {}
+        self._session = None
 
     @property
     def name(self) -> str:
         return "conceptnet"
 
+    @property
+    def session(self):
+        """The HTTP session, created on first use so that offline runs do not import requests."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util import Retry
+
+            # Failed and throttled requests are retried with exponential backoff (honouring Retry-After)
+            retry = Retry(total=self.n_retry, backoff_factor=self.backoff_factor, status_forcelist=[429, 502, 503, 504])
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
     def get_synonyms(self, word: str) -> List[str]:
-        session = requests.Session()
-        session.mount("http://", HTTPAdapter(max_retries=self.retry))
-        response = session.get(
+        synonyms = self.prefetched.get(word)
+        if synonyms is not None:
+            return synonyms
+        if self.disk_cache is not None:
+            synonyms = self.disk_cache.get(word)
+            if synonyms is not None:
+                return synonyms
+        if self.offline:
+            return []
+        synonyms = self._fetch_synonyms(word)
+        if self.disk_cache is not None:
+            self.disk_cache.put(word, synonyms)
+        return synonyms
+
+    def prefetch(self, words: Iterable[str]) -> None:
+        """Resolve the synonyms of `words` with up to `max_connections` concurrent requests.
+
+        Words already in the cache are not requested again. Words whose
+        requests still fail after the retries are left out and looked up
+        again on demand.
+        """
+        import requests
+
+        missing = []
+        for word in set(words) - self.prefetched.keys():
+            synonyms = self.disk_cache.get(word) if self.disk_cache is not None else None
+            if synonyms is not None:
+                self.prefetched[word] = synonyms
+            elif not self.offline:
+                missing.append(word)
+        if not missing:
+            return
+
+        def fetch(word: str) -> Optional[List[str]]:
+            try:
+                return self._fetch_synonyms(word)
+            except (requests.RequestException, ValueError):
+                return None
+
+        self.session  # create the session before the threads share it
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_connections, len(missing))) as executor:
+            for word, synonyms in zip(missing, executor.map(fetch, missing)):
+                if synonyms is not None:
+                    fetched[word] = synonyms
+        self.prefetched.update(fetched)
+        if self.disk_cache is not None:
+            self.disk_cache.put_many(fetched.items())
+
+    def _fetch_synonyms(self, word: str) -> List[str]:
+        response = self.session.get(
             url=self.url.format(word),
             timeout=(self.connect_timeout, self.read_timeout),
         )
+        response.raise_for_status()
         response = response.json()
 
         synonyms = set()
@@ -111,7 +206,40 @@ class ConceptNetSynonymExtractor(BaseSynonymExtractor):
             if language == "ja":
                 synonyms.add(link.split("/")[-1])  # Remove prefix
         synonyms = synonyms - {word}  # Remove original word
-        return list(synonyms)
+        return sorted(synonyms)
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+
+
+class CachedSynonymExtractor(BaseSynonymExtractor):
+    """Memoize the lookups of another synonym extractor in a bounded LRU cache.
+
+    The returned lists are shared between calls, so callers must not mutate them.
+    """
+    def __init__(self, extractor: BaseSynonymExtractor, maxsize: Optional[int] = DEFAULT_CACHE_SIZE):
+        self.extractor = extractor
+        self.cache = LRUCache(maxsize)
+
+    @property
+    def name(self) -> str:
+        return self.extractor.name
+
+    def get_synonyms(self, word: str) -> List[str]:
+        return self.cache.get_or_compute(word, self.extractor.get_synonyms)
+
+    def prefetch(self, words: Iterable[str]) -> None:
+        self.extractor.prefetch(words)
+
+    def get_synonyms_for_token(self, token: Token) -> List[str]:
+        # Tokens are cached apart from plain words since their synonyms can depend on the context
+        return self.cache.get_or_compute(token, self.extractor.get_synonyms_for_token)
+
+    def cache_info(self) -> CacheInfo:
+        return self.cache.info()
 
 
 EXTRACTOR = {
@@ -120,10 +248,25 @@ EXTRACTOR = {
 }
 
 
-def get_synonym_extractor(name: str, tokenizer: SudachiTokenizer) -> BaseSynonymExtractor:
+def get_synonym_extractor(
+    name: str,
+    tokenizer: SudachiTokenizer,
+    cache_size: Optional[int] = DEFAULT_CACHE_SIZE,
+    **options: Any,
+) -> BaseSynonymExtractor:
+    """Create a synonym extractor, memoized by an LRU cache of `cache_size` words.
+
+    `cache_size=0` disables the cache and `None` makes it unbounded. `options`
+    are passed to the extractor, e.g. `cache_path` and `offline` of
+    `ConceptNetSynonymExtractor`.
+    """
+    extractor: BaseSynonymExtractor
     if name == "sudachi":
-        return SudachiSynonymExtractor(tokenizer)
+        extractor = SudachiSynonymExtractor(tokenizer, **options)
     elif name == "conceptnet":
-        return ConceptNetSynonymExtractor()
+        extractor = ConceptNetSynonymExtractor(**options)
     else:
         raise ValueError("Invalid synonym extractor.")
+    if cache_size == 0:
+        return extractor
+    return CachedSynonymExtractor(extractor, cache_size)
@@ -0,0 +1,78 @@
+"""Persisted synonym maps of a corpus vocabulary.
+
+In the two-pass mode of `eda.augment`, the first pass scans the input and
+looks up the synonyms of every distinct word with the configured backend
+(WordNet, Sudachi or ConceptNet). The resulting `word -> synonyms` map is
+stored as a lexicon (see `eda.lexicon`) next to the output, and the second
+pass augments with plain dict lookups in it. Japanese maps are keyed by
+surface and synonym group ids (see `eda_japanese.token_key`), so the
+readings of a homograph keep their own synonyms. The map does not depend on
+the alphas or `num_aug`, so later runs over the same input reuse it and
+skip synonym extraction entirely. It does depend on the language and the
+synonym backend, which are stored in header entries of the map and checked
+before it is reused.
+"""
+import os
+from typing import Dict, List, Optional
+
+from .lexicon import Lexicon, write_lexicon
+
+
+# Keys of the header entries, which sort before every word of the map.
+HEADER_PREFIX = "\x00"
+
+
+def synonym_backend(lang: str, tokenizer: str = "sudachi", mecab_dict: str = "ipadic", synonym_extractor: str = "sudachi") -> str:
+    """Name of the synonym source of a configuration, which a synonym map is only valid for."""
+    if lang == "en":
+        return "wordnet"
+    if tokenizer == "mecab":
+        tokenizer += "-" + mecab_dict
+    return tokenizer + "-" + synonym_extractor
+
+
+def synonym_map_path(train_orig: str, output: str, backend: str) -> str:
+    """Default path of the synonym map of `train_orig` for `backend`, next to `output`."""
+    directory = os.path.dirname(output) if output != "-" else ""
+    return os.path.join(directory, os.path.basename(train_orig) + "." + backend + ".synonyms.bin")
+
+
+def read_header(path: str) -> Dict[str, str]:
+    """Language and backend a synonym map was built for, as `{"lang": ..., "backend": ...}`."""
+    lexicon = Lexicon(path)
+    try:
+        return {name: (lexicon.get(HEADER_PREFIX + name) or [""])[0] for name in ("lang", "backend")}
+    finally:
+        lexicon.close()
+
+
+def is_up_to_date(path: str, source: str, lang: str, backend: str) -> bool:
+    """Whether the synonym map at `path` exists, is not older than its input `source` and was built for `lang` and `backend`."""
+    if not os.path.isfile(path) or os.path.getmtime(path) < os.path.getmtime(source):
+        return False
+    return read_header(path) == {"lang": lang, "backend": backend}
+
+
+def save_synonym_map(path: str, synonym_map: Dict[str, List[str]], lang: str, backend: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    header = {HEADER_PREFIX + "lang": [lang], HEADER_PREFIX + "backend": [backend]}
+    write_lexicon(path, {**synonym_map, **header})
+
+
+def load_synonym_map(path: str, lang: Optional[str] = None, backend: Optional[str] = None) -> Dict[str, List[str]]:
+    """Load a synonym map into a dict, so that augmentation only does dict lookups.
+
+    Raises:
+        ValueError: If `lang` or `backend` is given and the map was built for another one.
+    """
+    header = read_header(path)
+    for name, expected in [("lang", lang), ("backend", backend)]:
+        if expected is not None and header[name] != expected:
+            raise ValueError(f"{path} is a synonym map of {name} {header[name] or 'unknown'}, not {expected}.")
+    lexicon = Lexicon(path)
+    try:
+        return {word: lexicon.get(word) for word in lexicon if not word.startswith(HEADER_PREFIX)}
+    finally:
+        lexicon.close()
@@ -1,11 +1,13 @@
 import functools
 import os
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Tuple
 
-import fugashi
-from sudachipy import tokenizer as sudachi_tokenizer
-from sudachipy import dictionary
+
+class Token(NamedTuple):
+    """Word of a tokenized sentence with what the tokenizer knows about it in context."""
+    surface: str
+    synonym_group_ids: Tuple[int, ...] = ()
 
 
 class BaseTokenizer(ABC):
@@ -13,6 +15,21 @@ class BaseTokenizer(ABC):
     def tokenize(self, text: str) -> List[str]:
         pass
 
+    def tokenize_batch(self, texts: Iterable[str]) -> List[List[str]]:
+        """Tokenize many texts at once.
+
+        Backends override this with a faster bulk version.
+        """
+        return [self.tokenize(text) for text in texts]
+
+    def tokenize_tokens(self, text: str) -> List[Token]:
+        """Tokenize text into `Token`s."""
+        return [Token(word) for word in self.tokenize(text)]
+
+    def tokenize_tokens_batch(self, texts: Iterable[str]) -> List[List[Token]]:
+        """Tokenize many texts into `Token`s at once."""
+        return [[Token(word) for word in words] for words in self.tokenize_batch(texts)]
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -21,6 +38,10 @@ class BaseTokenizer(ABC):
 
 class SudachiTokenizer(BaseTokenizer):
     def __init__(self):
+        # SudachiPy (and fugashi below) are imported when a tokenizer is created, not with the package
+        from sudachipy import tokenizer as sudachi_tokenizer
+        from sudachipy import dictionary
+
         self.tokenizer = dictionary.Dictionary().create()
         mode = sudachi_tokenizer.Tokenizer.SplitMode.C
         self.tokenizer = functools.partial(self.tokenizer.tokenize, mode=mode)
@@ -32,6 +53,43 @@ class SudachiTokenizer(BaseTokenizer):
     def tokenize(self, text: str) -> List[str]:
         return [m.surface() for m in self.tokenizer(text)]
 
+    def _iter_morphemes(self, texts: Iterable[str]) -> Iterator[Any]:
+        # One MorphemeList is refilled for every text instead of allocating a
+        # new one, so each list has to be consumed before the next is yielded.
+        morphemes = None
+        for text in texts:
+            morphemes = self.tokenizer(text, out=morphemes)
+            yield morphemes
+
+    def tokenize_batch(self, texts: Iterable[str]) -> List[List[str]]:
+        """Tokenize many texts at once, reusing one `MorphemeList`."""
+        return [[m.surface() for m in morphemes] for morphemes in self._iter_morphemes(texts)]
+
+    def tokenize_tokens(self, text: str) -> List[Token]:
+        """Tokenize text into `Token`s that carry the synonym group ids of each morpheme."""
+        return [Token(m.surface(), tuple(m.synonym_group_ids())) for m in self.tokenizer(text)]
+
+    def tokenize_tokens_batch(self, texts: Iterable[str]) -> List[List[Token]]:
+        """Tokenize many texts into `Token`s at once, reusing one `MorphemeList`.
+
+        The synonym group ids are read for every morpheme, since homographs
+        (e.g. 行っ of 行く and of 行う) get different ids in different contexts.
+        Equal tokens of the batch share one `Token`, which is cheaper than
+        building a new one for every morpheme.
+        """
+        tokens: Dict[Tuple[str, Tuple[int, ...]], Token] = {}
+        tokens_list = []
+        for morphemes in self._iter_morphemes(texts):
+            sentence_tokens = []
+            for m in morphemes:
+                key = (m.surface(), tuple(m.synonym_group_ids()))
+                token = tokens.get(key)
+                if token is None:
+                    token = tokens[key] = Token(*key)
+                sentence_tokens.append(token)
+            tokens_list.append(sentence_tokens)
+        return tokens_list
+
     def get_synonym_group_ids(self, word: str) -> List[int]:
         token = self.tokenizer(word)[0]
         return token.synonym_group_ids()
@@ -55,6 +113,7 @@ class MeCabTokenizer(BaseTokenizer):
         mecabrc = os.path.join(dic_dir, "mecabrc")
         mecab_option = f'-d "{dic_dir}" -r "{mecabrc}" -Owakati'
 
+        import fugashi
         self.tokenizer = fugashi.GenericTagger(mecab_option)
 
     @property
@@ -64,6 +123,16 @@ class MeCabTokenizer(BaseTokenizer):
     def tokenize(self, text: str) -> List[str]:
         return self.tokenizer.parse(text).split()
 
+    def tokenize_batch(self, texts: Iterable[str]) -> List[List[str]]:
+        """Tokenize many texts at once.
+
+        Each text is still parsed on its own: parsing the texts joined with
+        sentinels is slower in MeCab (one long lattice), and the connection
+        costs across a sentinel can change the words next to it.
+        """
+        parse = self.tokenizer.parse
+        return [parse(text).split() for text in texts]
+
 
 def get_tokenizer(name: str, dictionary: str = "ipadic") -> BaseTokenizer:
     if name == "sudachi":
@@ -0,0 +1,133 @@
+"""NumPy-vectorized random deletion and random swap over whole batches.
+
+Instead of drawing one random number per word (random deletion) or running
+a Python loop per swap (random swap), the variants of all sentences of a
+batch are laid out as rows of integer matrices, padded to the longest
+sentence, and deletion masks and swap index pairs are drawn for all rows at
+once. Only word positions are drawn and permuted; the words themselves are
+picked with a single gather per variant.
+
+Every variant has its own 64-bit key, which seeds a counter-based stream of
+random numbers (SplitMix64 of the key and the position in the stream). A
+variant therefore gets the same draws whatever the other rows of its batch
+are, so callers that derive the keys from per-line random generators get
+output that does not depend on how lines are batched.
+
+Requires NumPy (`pip install -e ".[numpy]"`).
+"""
+from itertools import accumulate, chain
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# `swap_word` gives up after drawing the second index this many times
+SWAP_ATTEMPTS = 3
+
+# Constants of SplitMix64
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def uniform(keys: np.ndarray, size: int) -> np.ndarray:
+    """The first `size` numbers in [0, 1) of the random stream of each key, as a `(len(keys), size)` matrix."""
+    x = keys[:, None] + np.arange(1, size + 1, dtype=np.uint64) * _GAMMA
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+def _rows(sentences: Sequence[Sequence], keys: Sequence[Sequence[int]]) -> Tuple[List[int], np.ndarray, np.ndarray, np.ndarray]:
+    """Number of variants of each sentence, and sentence index, length and key of every (sentence, variant) row."""
+    counts = [len(sentence_keys) for sentence_keys in keys]
+    sentence_ids = np.repeat(np.arange(len(sentences)), counts)
+    lengths = np.array([len(words) for words in sentences], dtype=np.int64)[sentence_ids]
+    row_keys = np.array(list(chain.from_iterable(keys)), dtype=np.uint64)
+    return counts, sentence_ids, lengths, row_keys
+
+
+def _slices(items: list, sizes: Sequence[int]) -> List[list]:
+    """Split `items` into consecutive slices of `sizes`."""
+    ends = list(accumulate(sizes))
+    return [items[end - size:end] for size, end in zip(sizes, ends)]
+
+
+def _gather(
+    sentences: Sequence[Sequence],
+    counts: Sequence[int],
+    sentence_ids: np.ndarray,
+    positions: np.ndarray,
+    mask: np.ndarray,
+) -> List[List[list]]:
+    """Words at the masked `positions` of every row, grouped into the `counts[i]` variants of each sentence.
+
+    All words of the batch are gathered with one indexing of a flat array and
+    the variants are slices of the result.
+    """
+    words = np.empty(sum(len(sentence) for sentence in sentences), dtype=object)
+    words[:] = list(chain.from_iterable(sentences))
+    offsets = np.cumsum([0] + [len(sentence) for sentence in sentences])[sentence_ids]
+    variants = _slices(words[(offsets[:, None] + positions)[mask]].tolist(), mask.sum(axis=1).tolist())
+    return _slices(variants, counts)
+
+
+def random_deletion_batch(
+    sentences: Sequence[Sequence],
+    p: float,
+    keys: Sequence[Sequence[int]],
+) -> List[List[list]]:
+    """Vectorized `eda.eda.random_deletion`.
+
+    Args:
+        sentences: Words (or interned ids) of each sentence.
+        p: Probability of deleting each word.
+        keys: Random 64-bit key of each variant to generate for each sentence.
+
+    Returns:
+        List[List[list]]: `len(keys[i])` variants of each sentence.
+    """
+    counts, sentence_ids, lengths, row_keys = _rows(sentences, keys)
+    max_length = int(lengths.max(initial=0))
+    draws = uniform(row_keys, max_length + 1)
+    positions = np.arange(max_length)
+    keep = (draws[:, :max_length] > p) & (positions < lengths[:, None])
+    # if all words are deleted, keep a random one
+    deleted_all = np.flatnonzero(~keep.any(axis=1) & (lengths > 1))
+    keep[deleted_all, (draws[deleted_all, max_length] * lengths[deleted_all]).astype(np.int64)] = True
+    # obviously, if there's only one word, don't delete it
+    keep[lengths <= 1] = positions < lengths[lengths <= 1, None]
+    return _gather(sentences, counts, sentence_ids, np.broadcast_to(positions, keep.shape), keep)
+
+
+def random_swap_batch(
+    sentences: Sequence[Sequence],
+    ns: Sequence[int],
+    keys: Sequence[Sequence[int]],
+) -> List[List[list]]:
+    """Vectorized `eda.eda.random_swap`.
+
+    Args:
+        sentences: Words (or interned ids) of each sentence.
+        ns: Number of swaps for each sentence.
+        keys: Random 64-bit key of each variant to generate for each sentence.
+
+    Returns:
+        List[List[list]]: `len(keys[i])` variants of each sentence.
+    """
+    counts, sentence_ids, lengths, row_keys = _rows(sentences, keys)
+    n_swaps = np.array(ns, dtype=np.int64)[sentence_ids]
+    max_length, max_swaps = int(lengths.max(initial=0)), int(n_swaps.max(initial=0))
+    draws = uniform(row_keys, max_swaps * (1 + SWAP_ATTEMPTS)).reshape(len(lengths), max_swaps, 1 + SWAP_ATTEMPTS)
+    indexes = (draws * lengths[:, None, None]).astype(np.int64)
+    order = np.tile(np.arange(max_length), (len(lengths), 1))
+    row_index = np.arange(len(lengths))
+    for s in range(max_swaps):
+        first, candidates = indexes[:, s, 0], indexes[:, s, 1:]
+        differs = candidates != first[:, None]
+        # like swap_word, skip the swap if every attempt hit the first index
+        swapped = differs.any(axis=1) & (s < n_swaps)
+        second = candidates[row_index, differs.argmax(axis=1)]
+        r, a, b = row_index[swapped], first[swapped], second[swapped]
+        order[r, a], order[r, b] = order[r, b], order[r, a]
+    return _gather(sentences, counts, sentence_ids, order, np.arange(max_length) < lengths[:, None])
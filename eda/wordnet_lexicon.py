@@ -0,0 +1,146 @@
+"""Precompiled WordNet synonym lexicon for English EDA.
+
+`eda.eda.get_synonyms` used to walk `wordnet.synsets(word)` and clean every
+lemma on each call. The build step below does that work once for every
+WordNet lemma and stores the cleaned synonyms in a memory-mapped lexicon.
+Lookups replay NLTK's morphological normalization (exception lists and
+suffix rules) on top of it, so they return the same synonyms without
+touching the NLTK corpus reader.
+
+Build it once with::
+
+    $ python -m eda.wordnet_lexicon
+
+Otherwise it is built on first use, in `$XDG_CACHE_HOME/eda` if the package
+directory is not writable.
+"""
+import argparse
+import os
+from typing import Dict, List, Set
+
+from .lexicon import Lexicon, compiled_path, write_lexicon
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+default_lexicon_path = os.environ.get(
+    "EDA_WORDNET_LEXICON",
+    os.path.join(current_dir, "resource/wordnet_synonyms.bin"),
+)
+
+# Same order as nltk.corpus.reader.wordnet.POS_LIST, which `wordnet.synsets` walks.
+POS_LIST = ["n", "v", "a", "r"]
+
+# Mirrors WordNetCorpusReader.MORPHOLOGICAL_SUBSTITUTIONS.
+MORPHOLOGICAL_SUBSTITUTIONS = {
+    "n": [
+        ("s", ""),
+        ("ses", "s"),
+        ("ves", "f"),
+        ("xes", "x"),
+        ("zes", "z"),
+        ("ches", "ch"),
+        ("shes", "sh"),
+        ("men", "man"),
+        ("ies", "y"),
+    ],
+    "v": [
+        ("s", ""),
+        ("ies", "y"),
+        ("es", "e"),
+        ("es", ""),
+        ("ed", "e"),
+        ("ed", ""),
+        ("ing", "e"),
+        ("ing", ""),
+    ],
+    "a": [("er", ""), ("est", ""), ("er", "e"), ("est", "e")],
+    "r": [],
+}
+
+
+def clean_lemma_name(name: str) -> str:
+    """Clean a WordNet lemma name the same way as the original EDA code."""
+    synonym = name.replace("_", " ").replace("-", " ").lower()
+    return "".join([char for char in synonym if char in " qwertyuiopasdfghjklzxcvbnm"])
+
+
+def _synonym_key(pos: str, lemma: str) -> str:
+    return f"{pos}:{lemma}"
+
+
+def _exception_key(pos: str, form: str) -> str:
+    return f"{pos}!{form}"
+
+
+def build_wordnet_lexicon(path: str = default_lexicon_path) -> None:
+    """Compile NLTK's WordNet into a synonym lexicon at `path`.
+
+    Every (part of speech, lemma) pair of the WordNet index gets the cleaned
+    lemma names of all its synsets, and every morphological exception is
+    stored alongside so that lookups can normalize inflected forms.
+    """
+    #for the first time you use wordnet
+    #import nltk
+    #nltk.download('wordnet')
+    from nltk.corpus import wordnet
+    wordnet.ensure_loaded()
+
+    entries: Dict[str, List[str]] = {}
+    for lemma, offsets_by_pos in wordnet._lemma_pos_offset_map.items():
+        for pos in POS_LIST:
+            if pos not in offsets_by_pos:
+                continue
+            synonyms: Set[str] = set()
+            for offset in offsets_by_pos[pos]:
+                synset = wordnet.synset_from_pos_and_offset(pos, offset)
+                if synset is None:
+                    continue
+                synonyms.update(clean_lemma_name(name) for name in synset.lemma_names())
+            entries[_synonym_key(pos, lemma)] = sorted(synonyms)
+    for pos in POS_LIST:
+        for form, base_forms in wordnet._exception_map[pos].items():
+            entries[_exception_key(pos, form)] = list(base_forms)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_lexicon(path, entries)
+
+
+class WordNetLexicon:
+    """Synonym lookups against a compiled WordNet lexicon."""
+    def __init__(self, path: str = default_lexicon_path):
+        self.lexicon = Lexicon(compiled_path(path, build_wordnet_lexicon))
+
+    def _morphy(self, form: str, pos: str) -> List[str]:
+        """Candidate base forms of `form`, following `WordNetCorpusReader._morphy`."""
+        forms = self.lexicon.get(_exception_key(pos, form))
+        if forms is None:
+            forms = [
+                form[: -len(old)] + new
+                for old, new in MORPHOLOGICAL_SUBSTITUTIONS[pos]
+                if form.endswith(old)
+            ]
+        return [form] + forms
+
+    def get_synonyms(self, word: str) -> List[str]:
+        """Get synonyms of word.
+
+        Returns:
+            List[str]: Same synonyms as collecting the cleaned lemma names of
+            `wordnet.synsets(word)`, without the word itself.
+        """
+        lemma = word.lower()
+        synonyms: Set[str] = set()
+        for pos in POS_LIST:
+            for form in self._morphy(lemma, pos):
+                synonyms.update(self.lexicon.get(_synonym_key(pos, form), ()))
+        synonyms.discard(word)
+        return sorted(synonyms)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compile the WordNet synonym lexicon.")
+    ap.add_argument("--output", required=False, type=str, default=default_lexicon_path, help="path of the compiled lexicon")
+    args = ap.parse_args()
+    build_wordnet_lexicon(args.output)
+    print("compiled WordNet synonym lexicon to " + args.output)
@@ -9,12 +9,9 @@ if __name__ == "__main__":
 		#pre-existing file locations
 		train_orig = dataset_folder + '/train_orig.txt'
 
-		#file to be created
-		train_aug_st = dataset_folder + '/train_aug_st.txt'
-
-		#standard augmentation
-		gen_standard_aug(train_orig, train_aug_st)
+		#standard augmentation is generated online while training (see AugmentedSequence),
+		#so only the words it can produce are added to the vocab dictionary
 
 		#generate the vocab dictionary
 		word2vec_pickle = dataset_folder + '/word2vec.p' # don't want to load the huge pickle every time, so just save the words that are actually used into a smaller dictionary
-		gen_vocab_dicts(dataset_folder, word2vec_pickle, huge_word2vec)
+		gen_vocab_dicts(dataset_folder, word2vec_pickle, huge_word2vec, get_aug_vocab(train_orig))
@@ -7,27 +7,38 @@ seed(0)
 #### run model and get acc ####
 ###############################
 
-def run_model(train_file, test_file, num_classes, percent_dataset):
+#with online_aug the train file is augmented batch by batch while training (see AugmentedSequence)
+def run_model(train_file, test_file, num_classes, percent_dataset, online_aug=False):
 
 	#initialize model
 	model = build_model(input_size, word2vec_len, num_classes)
 
 	#load data
-	train_x, train_y = get_x_y(train_file, num_classes, word2vec_len, input_size, word2vec, percent_dataset)
 	test_x, test_y = get_x_y(test_file, num_classes, word2vec_len, input_size, word2vec, 1)
 
 	#implement early stopping
 	callbacks = [EarlyStopping(monitor='val_loss', patience=3)]
 
 	#train model
-	model.fit(	train_x, 
-				train_y, 
-				epochs=100000, 
-				callbacks=callbacks,
-				validation_split=0.1, 
-				batch_size=1024, 
-				shuffle=True, 
-				verbose=0)
+	if online_aug:
+		train_seq = AugmentedSequence(train_file, num_classes, word2vec_len, input_size, word2vec, percent_dataset, batch_size=1024)
+		model.fit(	train_seq, 
+					epochs=100000, 
+					callbacks=callbacks,
+					validation_data=train_seq.validation_data(), 
+					workers=4, 
+					use_multiprocessing=True, 
+					verbose=0)
+	else:
+		train_x, train_y = get_x_y(train_file, num_classes, word2vec_len, input_size, word2vec, percent_dataset)
+		model.fit(	train_x, 
+					train_y, 
+					epochs=100000, 
+					callbacks=callbacks,
+					validation_split=0.1, 
+					batch_size=1024, 
+					shuffle=True, 
+					verbose=0)
 	#model.save('checkpoints/lol')
 	#model = load_model('checkpoints/lol')
 
@@ -60,7 +71,6 @@ if __name__ == "__main__":
 		num_classes = num_classes_list[i]
 		input_size = input_size_list[i]
 		train_orig = dataset_folder + '/train_orig.txt'
-		train_aug_st = dataset_folder + '/train_aug_st.txt'
 		test_path = dataset_folder + '/test.txt'
 		word2vec_pickle = dataset_folder + '/word2vec.p'
 		word2vec = load_pickle(word2vec_pickle)
@@ -68,7 +78,7 @@ if __name__ == "__main__":
 		for increment in increments:
 			
 			#calculate augmented accuracy
-			aug_acc = run_model(train_aug_st, test_path, num_classes, increment)
+			aug_acc = run_model(train_orig, test_path, num_classes, increment, online_aug=True)
 			aug_accs[dataset][increment] = aug_acc
 
 			#calculate original accuracy
@@ -14,15 +14,18 @@ if __name__ == "__main__":
 			train_orig = dataset_folder + '/train_orig.txt'
 
 			#for each n_aug value
+			outputs = []
 			for num_aug in num_aug_list:
 
 				output_file = dataset_folder + '/train_' + str(num_aug) + '.txt'
 
-				#generate the augmented data
 				if num_aug > 4 and '4_full/pc' in train_orig:
-					gen_standard_aug(train_orig, output_file, num_aug=4)
+					outputs.append((4, output_file))
 				else:
-					gen_standard_aug(train_orig, output_file, num_aug=num_aug)
+					outputs.append((num_aug, output_file))
+
+			#generate the augmented data of every n_aug value in one pass
+			gen_nested_aug(train_orig, outputs)
 
 			#generate the vocab dictionary
 			word2vec_pickle = dataset_folder + '/word2vec.p'
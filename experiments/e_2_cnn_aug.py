@@ -7,26 +7,26 @@ from e_config import *
 #### run model and get acc ####
 ###############################
 
-def run_cnn(train_file, test_file, num_classes, input_size, percent_dataset, word2vec):
+#the train file is augmented n_aug times batch by batch while training (see AugmentedSequence)
+def run_cnn(train_file, test_file, num_classes, input_size, percent_dataset, word2vec, n_aug):
 
 	#initialize model
 	model = build_cnn(input_size, word2vec_len, num_classes)
 
 	#load data
-	train_x, train_y = get_x_y(train_file, num_classes, word2vec_len, input_size, word2vec, percent_dataset)
+	train_seq = AugmentedSequence(train_file, num_classes, word2vec_len, input_size, word2vec, percent_dataset, num_aug=n_aug, batch_size=1024)
 	test_x, test_y = get_x_y(test_file, num_classes, word2vec_len, input_size, word2vec, 1)
 
 	#implement early stopping
 	callbacks = [EarlyStopping(monitor='val_loss', patience=3)]
 
 	#train model
-	model.fit(	train_x, 
-				train_y, 
+	model.fit(	train_seq, 
 				epochs=100000, 
 				callbacks=callbacks,
-				validation_split=0.1, 
-				batch_size=1024, 
-				shuffle=True, 
+				validation_data=train_seq.validation_data(), 
+				workers=4, 
+				use_multiprocessing=True, 
 				verbose=0)
 	#model.save('checkpoints/lol')
 	#model = load_model('checkpoints/lol')
@@ -38,7 +38,7 @@ def run_cnn(train_file, test_file, num_classes, input_size, percent_dataset, wor
 	acc = accuracy_score(test_y_cat, y_pred_cat)
 
 	#clean memory???
-	train_x, train_y, model = None, None, None
+	train_seq, model = None, None
 	gc.collect()
 
 	#return the accuracy
@@ -68,10 +68,11 @@ def compute_baselines(writer):
 			input_size = input_size_list[i]
 			word2vec_pickle = dataset_folder + '/word2vec.p'
 			word2vec = load_pickle(word2vec_pickle)
+			n_aug = n_aug_list_dict[size_folder][i]
 
-			train_path = dataset_folder + '/train_aug_st.txt'
+			train_path = dataset_folder + '/train_orig.txt'
 			test_path = 'size_data_t1/test/' + dataset + '/test.txt'
-			acc = run_cnn(train_path, test_path, num_classes, input_size, 1, word2vec)
+			acc = run_cnn(train_path, test_path, num_classes, input_size, 1, word2vec, n_aug)
 			performances.append(str(acc))
 
 		line = ','.join(performances)
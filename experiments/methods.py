@@ -5,6 +5,7 @@ import keras.layers as layers
 from keras.models import Sequential
 from keras.models import load_model
 from keras.callbacks import EarlyStopping
+from keras.utils import Sequence
 
 from sklearn.utils import shuffle
 from sklearn.metrics import accuracy_score
@@ -28,6 +29,10 @@ import pickle
 
 #import data augmentation methods
 from nlp_aug import *
+from eda import GridConfig, eda_english_batch, eda_english_grid
+from eda.augment import gen_eda_grid, gen_eda_nested
+from eda.eda import build_synonym_map
+from eda.formats import iter_chunks
 
 ###################################################
 ######### loading folders and txt files ###########
@@ -75,9 +80,10 @@ def get_all_txt_paths(master_folder):
 ###################################################
 
 #get the pickle file for the word2vec so you don't have to load the entire huge file each time
-def gen_vocab_dicts(folder, output_pickle_path, huge_word2vec):
+#extra_vocab adds words that are not in the txt files, such as the words of online augmentation (see get_aug_vocab)
+def gen_vocab_dicts(folder, output_pickle_path, huge_word2vec, extra_vocab=()):
 
-    vocab = set()
+    vocab = set(extra_vocab)
     text_embeddings = open(huge_word2vec, 'r').readlines()
     word2vec = {}
 
@@ -119,6 +125,11 @@ def get_x_y(train_txt, num_classes, word2vec_len, input_size, word2vec, percent_
 	train_lines = open(train_txt, 'r').readlines()
 	shuffle(train_lines)
 	train_lines = train_lines[:int(percent_dataset*len(train_lines))]
+	return encode_lines(train_lines, num_classes, word2vec_len, input_size, word2vec)
+
+#getting the x and y inputs in numpy array form from "label\tsentence" lines
+def encode_lines(train_lines, num_classes, word2vec_len, input_size, word2vec):
+
 	num_lines = len(train_lines)
 
 	#initialize x and y matrix
@@ -157,8 +168,7 @@ def get_x_y(train_txt, num_classes, word2vec_len, input_size, word2vec, percent_
 def gen_tsne_aug(train_orig, output_file):
 
     writer = open(output_file, 'w')
-    lines = open(train_orig, 'r').readlines()
-    for i, line in enumerate(lines):
+    for line in open(train_orig, 'r'):
     	parts = line[:-1].split('\t')
     	label = parts[0]
     	sentence = parts[1]
@@ -173,24 +183,93 @@ def gen_tsne_aug(train_orig, output_file):
 
 
 #generate more data with standard augmentation
-def gen_standard_aug(train_orig, output_file, num_aug=9):
+#uses the batch api of the eda package with the same alphas as eda_4
+def gen_standard_aug(train_orig, output_file, num_aug=9, batch_size=1000):
     writer = open(output_file, 'w')
-    lines = open(train_orig, 'r').readlines()
-    for i, line in enumerate(lines):
-        parts = line[:-1].split('\t')
-        label = parts[0]
-        sentence = parts[1]
-        aug_sentences = eda_4(sentence, num_aug=num_aug)
-        for aug_sentence in aug_sentences:
-            writer.write(label + "\t" + aug_sentence + '\n')
+    for lines in iter_chunks(open(train_orig, 'r'), batch_size):
+        batch = [line[:-1].split('\t') for line in lines]
+        aug_batch = eda_english_batch([parts[1] for parts in batch], alpha_sr=0.3, alpha_ri=0.2, alpha_rs=0.1, p_rd=0.15, num_aug=num_aug)
+        for parts, aug_sentences in zip(batch, aug_batch):
+            label = parts[0]
+            for aug_sentence in aug_sentences:
+                writer.write(label + "\t" + aug_sentence + '\n')
     writer.close()
     print("finished eda for", train_orig, "to", output_file)
 
+#every word that augmented sentences of train_orig can contain: its own words and their synonyms
+#(pass it to gen_vocab_dicts when the augmented data is generated online instead of written to a file)
+def get_aug_vocab(train_orig):
+    synonym_map = build_synonym_map(line[:-1].split('\t')[1] for line in open(train_orig, 'r'))
+    vocab = set(synonym_map)
+    for synonyms in synonym_map.values():
+        for synonym in synonyms:
+            vocab.update(synonym.split(' '))
+    return vocab
+
+#standard augmentation of train_orig generated online, as a keras Sequence of (x, y) batches
+#instead of writing train_aug_st.txt with gen_standard_aug and loading all of it with get_x_y,
+#only the original lines are kept in memory, and every batch of them is augmented (with the alphas
+#of gen_standard_aug) and encoded when keras asks for it, so every epoch sees new augmented sentences
+#batch_size counts augmented sentences, so each batch holds batch_size // (num_aug+1) original lines
+#the first validation_split of the original lines is held out, not augmented, for validation_data()
+#every line gets its own random generator for every epoch, so the batches are the same whichever
+#process makes them: model.fit(sequence, workers=n, use_multiprocessing=True) augments in a pool
+class AugmentedSequence(Sequence):
+
+    def __init__(self, train_orig, num_classes, word2vec_len, input_size, word2vec, percent_dataset=1, num_aug=9, batch_size=1024, validation_split=0.1, seed=0):
+        super().__init__()
+        lines = open(train_orig, 'r').readlines()
+        random.Random(seed).shuffle(lines)
+        lines = lines[:int(percent_dataset*len(lines))]
+        num_val = int(validation_split*len(lines))
+        self.val_lines = lines[:num_val]
+        self.records = [line[:-1].split('\t') for line in lines[num_val:]]
+        #the synonyms of the whole vocabulary are looked up once, so batches only do dict lookups
+        self.synonym_map = build_synonym_map(parts[1] for parts in self.records)
+        self.encoding = (num_classes, word2vec_len, input_size, word2vec)
+        self.num_aug = num_aug
+        self.lines_per_batch = max(1, batch_size // (num_aug + 1))
+        self.seed = seed
+        self.set_epoch(0)
+
+    #the lines are shuffled again for every epoch
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+        self.order = list(range(len(self.records)))
+        random.Random(str(self.seed) + ':' + str(epoch)).shuffle(self.order)
+
+    def on_epoch_end(self):
+        self.set_epoch(self.epoch + 1)
+
+    def __len__(self):
+        return math.ceil(len(self.records) / self.lines_per_batch)
+
+    def __getitem__(self, index):
+        line_ids = self.order[index * self.lines_per_batch:(index + 1) * self.lines_per_batch]
+        records = [self.records[line_id] for line_id in line_ids]
+        rngs = [random.Random(str(self.seed) + ':' + str(self.epoch) + ':' + str(line_id)) for line_id in line_ids]
+        aug_batch = eda_english_batch([parts[1] for parts in records], alpha_sr=0.3, alpha_ri=0.2, alpha_rs=0.1, p_rd=0.15, num_aug=self.num_aug, synonym_map=self.synonym_map, rngs=rngs)
+        aug_lines = [parts[0] + '\t' + aug_sentence + '\n' for parts, aug_sentences in zip(records, aug_batch) for aug_sentence in aug_sentences]
+        return encode_lines(aug_lines, *self.encoding)
+
+    #the held out original lines as (x, y), for model.fit(validation_data=...)
+    def validation_data(self):
+        return encode_lines(self.val_lines, *self.encoding)
+
+#generate more data with standard augmentation for several num_aug values from a single augmentation pass
+#outputs is a list of (num_aug, output_file) pairs, and smaller num_aug outputs are subsets of the larger ones
+def gen_nested_aug(train_orig, outputs, batch_size=1000):
+    gen_eda_nested(eda_english_batch, train_orig, outputs, alpha_sr=0.3, alpha_ri=0.2, alpha_rs=0.1, alpha_rd=0.15, batch_size=batch_size)
+
+#generate more data for a grid of single-technique configurations in one pass over the data
+#outputs is a list of (GridConfig(technique, alpha, n_aug), output_file) pairs
+def gen_grid_aug(train_orig, outputs, batch_size=1000):
+    gen_eda_grid(eda_english_grid, train_orig, outputs, batch_size=batch_size)
+
 #generate more data with only synonym replacement (SR)
 def gen_sr_aug(train_orig, output_file, alpha_sr, n_aug):
     writer = open(output_file, 'w')
-    lines = open(train_orig, 'r').readlines()
-    for i, line in enumerate(lines):
+    for line in open(train_orig, 'r'):
         parts = line[:-1].split('\t')
         label = parts[0]
         sentence = parts[1]
@@ -203,8 +282,7 @@ def gen_sr_aug(train_orig, output_file, alpha_sr, n_aug):
 #generate more data with only random insertion (RI)
 def gen_ri_aug(train_orig, output_file, alpha_ri, n_aug):
     writer = open(output_file, 'w')
-    lines = open(train_orig, 'r').readlines()
-    for i, line in enumerate(lines):
+    for line in open(train_orig, 'r'):
         parts = line[:-1].split('\t')
         label = parts[0]
         sentence = parts[1]
@@ -217,8 +295,7 @@ def gen_ri_aug(train_orig, output_file, alpha_ri, n_aug):
 #generate more data with only random swap (RS)
 def gen_rs_aug(train_orig, output_file, alpha_rs, n_aug):
     writer = open(output_file, 'w')
-    lines = open(train_orig, 'r').readlines()
-    for i, line in enumerate(lines):
+    for line in open(train_orig, 'r'):
         parts = line[:-1].split('\t')
         label = parts[0]
         sentence = parts[1]
@@ -231,8 +308,7 @@ def gen_rs_aug(train_orig, output_file, alpha_rs, n_aug):
 #generate more data with only random deletion (RD)
 def gen_rd_aug(train_orig, output_file, alpha_rd, n_aug):
     writer = open(output_file, 'w')
-    lines = open(train_orig, 'r').readlines()
-    for i, line in enumerate(lines):
+    for line in open(train_orig, 'r'):
         parts = line[:-1].split('\t')
         label = parts[0]
         sentence = parts[1]
@@ -0,0 +1,21 @@
+from typing import Callable
+
+import pytest
+
+
+@pytest.fixture
+def aug_kwargs() -> dict:
+    """Augmentation arguments of gen_eda shared by the augmentation tests."""
+    return dict(alpha_sr=0.1, alpha_ri=0.1, alpha_rs=0.1, alpha_rd=0.1, num_aug=4, batch_size=50, seed=1)
+
+
+@pytest.fixture
+def make_input(tmp_path) -> Callable[..., str]:
+    """Write the first `n_lines` lines of the SST-2 sample to train_orig.txt and return its path."""
+    def make_input(n_lines: int = 200) -> str:
+        input_file = tmp_path / "train_orig.txt"
+        with open("data/sst2_train_500.txt") as f:
+            input_file.write_text("".join(f.readlines()[:n_lines]))
+        return str(input_file)
+
+    return make_input
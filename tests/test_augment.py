@@ -0,0 +1,318 @@
+import collections
+import functools
+import gzip
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from eda.augment import (
+    build_eda_func,
+    checkpoint_path,
+    gen_eda,
+    gen_eda_grid,
+    gen_eda_nested,
+    gen_eda_parallel,
+    grid_outputs,
+    nested_outputs,
+)
+from eda.planner import parse_grid_config
+from eda.synonym_map import is_up_to_date, load_synonym_map
+
+
+def test_gen_eda(tmp_path, make_input, aug_kwargs) -> None:
+    """Test that every input line gets num_aug augmentations plus the original."""
+    input_file = make_input()
+    output_file = str(tmp_path / "eda_train_orig.txt")
+    eda_func, _ = build_eda_func("en")
+    gen_eda(eda_func, input_file, output_file, **aug_kwargs)
+
+    input_lines = open(input_file).readlines()
+    output_lines = open(output_file).readlines()
+    assert len(output_lines) == len(input_lines) * 5
+    for i, line in enumerate(input_lines):
+        labels = {output_line.split("\t")[0] for output_line in output_lines[5 * i:5 * (i + 1)]}
+        assert labels == {line.split("\t")[0]}
+
+
+def test_gen_eda_parallel(tmp_path, make_input, aug_kwargs) -> None:
+    """Test that worker processes reproduce the single-process output in order."""
+    input_file = make_input()
+    eda_func, _ = build_eda_func("en")
+    gen_eda(eda_func, input_file, str(tmp_path / "single.txt"), **aug_kwargs)
+    for workers in [2, 3]:
+        output_file = str(tmp_path / f"parallel_{workers}.txt")
+        gen_eda_parallel({"lang": "en"}, input_file, output_file, workers=workers, **aug_kwargs)
+        assert open(output_file).read() == open(tmp_path / "single.txt").read()
+
+
+#Japanese lines whose 行っ is 行く (no synonyms) or 行う depending on the sentence
+JA_LINES = ["1\t学校に行った。", "0\t彼が行った研究です。", "1\t昨日は公園に行った。", "0\t会議を行った結果、計画を変更した。"]
+
+
+@pytest.mark.parametrize("lang, vectorized", [("en", False), ("ja", False), ("en", True), ("ja", True)])
+def test_gen_eda_batch_size(tmp_path, lang, vectorized, make_input, aug_kwargs) -> None:
+    """Test that every line is augmented the same whatever the batch size and the number of workers."""
+    if vectorized:
+        pytest.importorskip("numpy")
+    if lang == "en":
+        input_file = make_input(60)
+        kwargs = aug_kwargs
+    else:
+        input_file = str(tmp_path / "train_orig.txt")
+        with open(input_file, "w") as f:
+            f.writelines(JA_LINES[i % len(JA_LINES)] + "\n" for i in range(30))
+        kwargs = dict(aug_kwargs, alpha_sr=0.5, num_aug=8)
+    eda_func, _ = build_eda_func(lang, vectorized=vectorized)
+    gen_eda(eda_func, input_file, str(tmp_path / "single.txt"), **kwargs)
+    expected = open(tmp_path / "single.txt").read()
+    for batch_size in [1, 2, 7]:
+        output_file = str(tmp_path / f"single_{batch_size}.txt")
+        gen_eda(eda_func, input_file, output_file, **dict(kwargs, batch_size=batch_size))
+        assert open(output_file).read() == expected
+    output_file = str(tmp_path / "parallel.txt")
+    gen_eda_parallel({"lang": lang, "vectorized": vectorized}, input_file, output_file, workers=2, **dict(kwargs, batch_size=13))
+    assert open(output_file).read() == expected
+
+
+def test_gen_eda_shards(tmp_path, make_input, aug_kwargs) -> None:
+    """Test that shards augmented with their first line id make up the output of a single run."""
+    input_file = make_input(60)
+    eda_func, _ = build_eda_func("en")
+    gen_eda(eda_func, input_file, str(tmp_path / "single.jsonl"), **aug_kwargs)
+    grid = parse_grid_config("rd:0.2:2")
+    gen_eda_grid(build_eda_func("en", grid=True)[0], input_file, [(grid, str(tmp_path / "single_grid.jsonl"))], seed=1)
+
+    lines = open(input_file).readlines()
+    shards = []
+    for first_line_id, shard_lines in [(0, lines[:25]), (25, lines[25:])]:
+        shard_file = tmp_path / f"shard_{first_line_id}.txt"
+        shard_file.write_text("".join(shard_lines))
+        output_file = str(tmp_path / f"eda_shard_{first_line_id}.jsonl")
+        grid_output_file = str(tmp_path / f"grid_shard_{first_line_id}.jsonl")
+        gen_eda(eda_func, str(shard_file), output_file, first_line_id=first_line_id, **aug_kwargs)
+        gen_eda_grid(build_eda_func("en", grid=True)[0], str(shard_file), [(grid, grid_output_file)], seed=1, first_line_id=first_line_id)
+        shards.append((output_file, grid_output_file))
+    # line ids are part of the jsonl records, so they have to match as well
+    assert "".join(open(output_file).read() for output_file, _ in shards) == open(tmp_path / "single.jsonl").read()
+    assert "".join(open(output_file).read() for _, output_file in shards) == open(tmp_path / "single_grid.jsonl").read()
+
+
+def test_gen_eda_stdin_stdout(tmp_path, make_input) -> None:
+    """Test that streaming through stdin and stdout gives the same output as files."""
+    input_file = make_input()
+    output_file = str(tmp_path / "eda_train_orig.txt")
+    command = [sys.executable, "-m", "eda.augment", "--num_aug", "4", "--batch_size", "50"]
+    subprocess.run(command + ["--input", input_file, "--output", output_file], check=True, capture_output=True)
+    with open(input_file) as stdin:
+        result = subprocess.run(command + ["--input", "-"], stdin=stdin, check=True, capture_output=True, text=True)
+    assert result.stdout == open(output_file).read()
+    assert "generated augmented sentences" in result.stderr
+
+
+def crash_after(eda_func, n_chunks):
+    calls = []
+
+    @functools.wraps(eda_func)
+    def crashing_eda_func(*args, **kwargs):
+        if len(calls) == n_chunks:
+            raise KeyboardInterrupt
+        calls.append(None)
+        return eda_func(*args, **kwargs)
+    return crashing_eda_func
+
+
+@pytest.mark.parametrize("seed", [1, None])
+def test_gen_eda_resume(tmp_path, seed, make_input, aug_kwargs) -> None:
+    """Test that a resumed run writes the same output as an uninterrupted one."""
+    input_file = make_input()
+    expected_file = str(tmp_path / "expected.txt")
+    output_file = str(tmp_path / "resumed.txt")
+    kwargs = dict(aug_kwargs, seed=seed, batch_size=30, checkpoint_every=2)
+    eda_func, _ = build_eda_func("en")
+    random.seed(5)
+    gen_eda(eda_func, input_file, expected_file, **kwargs)
+    assert not os.path.exists(checkpoint_path(expected_file))
+
+    random.seed(5)
+    with pytest.raises(KeyboardInterrupt):
+        gen_eda(crash_after(eda_func, 5), input_file, output_file, **kwargs)
+    assert os.path.exists(checkpoint_path(output_file))
+    random.seed(6)
+    gen_eda(eda_func, input_file, output_file, resume=True, **kwargs)
+    assert open(output_file).read() == open(expected_file).read()
+    assert not os.path.exists(checkpoint_path(output_file))
+
+
+def test_gen_eda_parallel_resume(tmp_path, make_input, aug_kwargs) -> None:
+    """Test that a single-process run can be resumed with worker processes."""
+    input_file = make_input()
+    kwargs = dict(aug_kwargs, checkpoint_every=1)
+    eda_func, _ = build_eda_func("en")
+    gen_eda(eda_func, input_file, str(tmp_path / "expected.txt"), **kwargs)
+
+    output_file = str(tmp_path / "resumed.txt")
+    with pytest.raises(KeyboardInterrupt):
+        gen_eda(crash_after(eda_func, 2), input_file, output_file, **kwargs)
+    gen_eda_parallel({"lang": "en"}, input_file, output_file, workers=2, resume=True, **kwargs)
+    assert open(output_file).read() == open(tmp_path / "expected.txt").read()
+
+
+def test_gen_eda_resume_settings(tmp_path, make_input, aug_kwargs) -> None:
+    """Test that a checkpoint is not resumed with different settings."""
+    input_file = make_input()
+    output_file = str(tmp_path / "resumed.txt")
+    eda_func, _ = build_eda_func("en")
+    with pytest.raises(KeyboardInterrupt):
+        gen_eda(crash_after(eda_func, 2), input_file, output_file, checkpoint_every=1, **aug_kwargs)
+    with pytest.raises(ValueError):
+        gen_eda(eda_func, input_file, output_file, resume=True, **dict(aug_kwargs, num_aug=8))
+    for options in [dict(lang="ja"), dict(vectorized=True), dict(interned=True)]:
+        with pytest.raises(ValueError):
+            gen_eda(build_eda_func(**options)[0], input_file, output_file, resume=True, **aug_kwargs)
+    with pytest.raises(ValueError):
+        gen_eda_parallel({"lang": "ja"}, input_file, output_file, workers=2, resume=True, **aug_kwargs)
+
+
+def test_gen_eda_resume_jsonl(tmp_path, make_input, aug_kwargs) -> None:
+    """Test resuming a JSON lines output from a gzip compressed input."""
+    input_file = str(tmp_path / "train_orig.tsv.gz")
+    with open(make_input(), "rb") as f, gzip.open(input_file, "wb") as g:
+        g.write(f.read())
+    kwargs = dict(aug_kwargs, checkpoint_every=1)
+    eda_func, _ = build_eda_func("en")
+    gen_eda(eda_func, input_file, str(tmp_path / "expected.jsonl"), **kwargs)
+
+    output_file = str(tmp_path / "resumed.jsonl")
+    with pytest.raises(KeyboardInterrupt):
+        gen_eda(crash_after(eda_func, 2), input_file, output_file, **kwargs)
+    gen_eda(eda_func, input_file, output_file, resume=True, **kwargs)
+    assert open(output_file).read() == open(tmp_path / "expected.jsonl").read()
+
+
+def test_gen_eda_grid(tmp_path, make_input) -> None:
+    """Test that a grid run writes num_aug augmentations plus the original per line for every configuration."""
+    input_file = make_input()
+    configs = [parse_grid_config(spec) for spec in ["sr:0.1:4", "rs:0.2:2", "rd:0.1:3"]]
+    outputs = grid_outputs(configs, str(tmp_path / "eda_{technique}_{alpha}_{num_aug}.txt"))
+    grid_func, _ = build_eda_func("en", grid=True)
+    gen_eda_grid(grid_func, input_file, outputs, batch_size=50, seed=1)
+
+    assert [os.path.basename(output_file) for _, output_file in outputs] == ["eda_sr_0.1_4.txt", "eda_rs_0.2_2.txt", "eda_rd_0.1_3.txt"]
+    input_lines = open(input_file).readlines()
+    for config, output_file in outputs:
+        n_lines = config.num_aug + 1
+        output_lines = open(output_file).readlines()
+        assert len(output_lines) == len(input_lines) * n_lines
+        for i, line in enumerate(input_lines):
+            labels = {output_line.split("\t")[0] for output_line in output_lines[n_lines * i:n_lines * (i + 1)]}
+            assert labels == {line.split("\t")[0]}
+    with pytest.raises(ValueError):
+        grid_outputs(configs, str(tmp_path / "eda_{alpha}.txt"))
+
+
+def test_gen_eda_nested(tmp_path, make_input) -> None:
+    """Test that the outputs of smaller num_aug values are subsets of the larger ones."""
+    input_file = make_input()
+    outputs = nested_outputs([0.5, 1, 2, 8], str(tmp_path / "eda_{num_aug}.txt"))
+    eda_func, _ = build_eda_func("en")
+    gen_eda_nested(eda_func, input_file, outputs, 0.1, 0.1, 0.1, 0.1, batch_size=50, seed=1)
+
+    n_input_lines = len(open(input_file).readlines())
+    output_lines = [open(output_file).readlines() for _, output_file in outputs]
+    for (num_aug, _), lines in zip(outputs, output_lines):
+        if num_aug >= 1:
+            assert len(lines) == n_input_lines * (num_aug + 1)
+    assert abs(len(output_lines[0]) / n_input_lines - 1.5) < 0.15
+    for smaller, larger in zip(output_lines, output_lines[1:]):
+        assert not collections.Counter(smaller) - collections.Counter(larger)
+
+
+@pytest.mark.parametrize("mode", [["--grid", "sr:0.1:2"], ["--nested_num_aug", "1", "2"]])
+@pytest.mark.parametrize("option", [["--workers", "2"], ["--checkpoint_every", "1"], ["--resume"]])
+def test_unsupported_options(tmp_path, mode, option, make_input) -> None:
+    """Test that grid and nested runs reject the options of gen_eda instead of ignoring them."""
+    command = [sys.executable, "-m", "eda.augment", "--input", make_input()]
+    result = subprocess.run(command + mode + option, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert mode[0] + " does not support" in result.stderr
+
+
+@pytest.mark.parametrize("option", [["--num_aug", "4"], ["--alpha_sr", "0.2"], ["--alpha_rd", "0"], ["--vectorized"]])
+def test_grid_unsupported_options(tmp_path, option, make_input) -> None:
+    """Test that grid runs reject the options that their configurations replace."""
+    command = [sys.executable, "-m", "eda.augment", "--input", make_input(), "--grid", "sr:0.1:2"]
+    result = subprocess.run(command + option, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "--grid does not support " + option[0] in result.stderr
+
+
+def test_two_pass(tmp_path, make_input) -> None:
+    """Test that the two-pass mode saves the synonym map next to the output and reuses it."""
+    input_file = make_input()
+    os.makedirs(tmp_path / "out")
+    command = [sys.executable, "-m", "eda.augment", "--input", input_file, "--num_aug", "4", "--batch_size", "50"]
+    subprocess.run(command + ["--output", str(tmp_path / "one_pass.txt")], check=True, capture_output=True)
+    result = subprocess.run(command + ["--output", str(tmp_path / "out/two_pass.txt"), "--two_pass"], check=True, capture_output=True, text=True)
+
+    map_path = str(tmp_path / "out/train_orig.txt.wordnet.synonyms.bin")
+    assert "saved the synonyms of" in result.stdout
+    assert os.path.isfile(map_path)
+    assert open(tmp_path / "out/two_pass.txt").read() == open(tmp_path / "one_pass.txt").read()
+
+    result = subprocess.run(
+        command + ["--output", str(tmp_path / "out/two_pass_sr.txt"), "--two_pass", "--alpha_sr", "0.3"],
+        check=True, capture_output=True, text=True,
+    )
+    assert "reusing the synonym map " + map_path in result.stdout
+
+
+@pytest.mark.parametrize("interned", [False, True])
+def test_synonym_map(tmp_path, monkeypatch, interned, make_input, aug_kwargs) -> None:
+    """Test that augmenting with a synonym map does not look synonyms up again."""
+    from eda import eda as eda_module
+    from eda.augment import build_input_synonym_map
+
+    input_file = make_input()
+    map_path = str(tmp_path / "synonyms.bin")
+    eda_func, _ = build_eda_func("en", interned=interned)
+    gen_eda(eda_func, input_file, str(tmp_path / "one_pass.txt"), **aug_kwargs)
+    build_input_synonym_map(eda_func, "en", input_file, map_path, "wordnet")
+    # the map is only reused for the language and backend it was built for
+    assert is_up_to_date(map_path, input_file, "en", "wordnet")
+    assert not is_up_to_date(map_path, input_file, "ja", "sudachi-sudachi")
+    with pytest.raises(ValueError):
+        build_eda_func("ja", synonym_map_path=map_path)
+
+    eda_module.synonym_cache.clear()
+    monkeypatch.setattr(eda_module, "lookup_synonyms", None)  # any lookup fails
+    eda_func, _ = build_eda_func("en", interned=interned, synonym_map_path=map_path)
+    gen_eda(eda_func, input_file, str(tmp_path / "two_pass.txt"), **aug_kwargs)
+    assert open(tmp_path / "two_pass.txt").read() == open(tmp_path / "one_pass.txt").read()
+
+
+def test_ja_synonym_map(tmp_path, monkeypatch, aug_kwargs) -> None:
+    """Test that Japanese augmentation with a synonym map does not look synonyms up again."""
+    from eda.augment import build_input_synonym_map
+    from eda.synonym_extractor import SudachiSynonymExtractor
+
+    input_file = str(tmp_path / "train_orig.txt")
+    with open(input_file, "w") as f:
+        f.write("0\t日本の首都は東京です。\n1\t今日はとても良い天気なので散歩に行きました。\n0\t東京で会議に参加します。\n")
+        f.writelines(line + "\n" for line in JA_LINES)
+    kwargs = dict(aug_kwargs, alpha_sr=0.5)
+    eda_func, _ = build_eda_func("ja")
+    gen_eda(eda_func, input_file, str(tmp_path / "one_pass.txt"), **kwargs)
+    map_path = str(tmp_path / "synonyms.bin")
+    assert build_input_synonym_map(eda_func, "ja", input_file, map_path, "sudachi-sudachi") > 0
+    # 行っ of 行く has no synonyms, and 行っ of 行う keeps its own
+    synonym_map = load_synonym_map(map_path)
+    assert synonym_map["行っ"] == []
+    assert "実施" in synonym_map["行っ\t22107,22589"]
+
+    monkeypatch.setattr(SudachiSynonymExtractor, "_get_group_synonyms", None)  # any lookup fails
+    eda_func, _ = build_eda_func("ja", synonym_map_path=map_path)
+    gen_eda(eda_func, input_file, str(tmp_path / "two_pass.txt"), **kwargs)
+    assert open(tmp_path / "two_pass.txt").read() == open(tmp_path / "one_pass.txt").read()
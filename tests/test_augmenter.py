@@ -0,0 +1,55 @@
+import pickle
+import random
+
+import pytest
+
+from eda import EDAAugmenter, eda_english_batch
+
+SENTENCES = {
+    "en": [
+        "the quick brown fox jumps over the lazy dog",
+        "a very good movie with a great story and fine acting",
+        "i did not like the ending of this film at all",
+    ],
+    "ja": ["日本の首都は東京です。", "今日はとても良い天気なので散歩に行きました。", "東京で会議に参加します。"],
+}
+
+
+def test_augmenter_matches_eda_batch() -> None:
+    """Test that an augmenter seeded like the random module gives the same output as eda_english_batch."""
+    augmenter = EDAAugmenter("en", num_aug=4, seed=3)
+    random.seed(3)
+    assert augmenter.augment_batch(SENTENCES["en"]) == eda_english_batch(SENTENCES["en"], num_aug=4)
+
+
+@pytest.mark.parametrize("lang", ["en", "ja"])
+def test_augmenter_rng(lang: str) -> None:
+    """Test that augmenters only depend on their own random generator."""
+    sentences = SENTENCES[lang]
+    augmenter = EDAAugmenter(lang, num_aug=4, seed=1)
+    expected = augmenter.augment_batch(sentences)
+
+    augmenter = EDAAugmenter(lang, num_aug=4, seed=1)
+    random.seed(0)
+    assert augmenter.augment_batch(sentences) == expected
+    assert all(len(augmented) == 4 + (lang == "en") for augmented in expected)
+
+    # Sentences draw from the generator one after the other, however they are batched
+    augmenter.seed(1)
+    assert list(augmenter.iter_augment(sentences, batch_size=2)) == expected
+    augmenter.seed(1)
+    assert [augmenter.augment(sentence) for sentence in sentences] == expected
+
+
+@pytest.mark.parametrize("lang", ["en", "ja"])
+def test_augmenter_pickle(lang: str) -> None:
+    """Test that a pickled augmenter carries its configuration and random state, not its resources."""
+    sentences = SENTENCES[lang]
+    augmenter = EDAAugmenter(lang, num_aug=4, seed=1)
+    augmenter.augment_batch(sentences)  # loads the resources and advances the random generator
+    data = pickle.dumps(augmenter)
+    assert len(data) < 20000
+
+    clone = pickle.loads(data)
+    assert "synonym_extractor" not in vars(clone) and "synonyms" not in vars(clone)
+    assert clone.augment_batch(sentences) == augmenter.augment_batch(sentences)
@@ -0,0 +1,66 @@
+from typing import List
+
+from eda.cache import LRUCache, SQLiteSynonymCache
+from eda.synonym_extractor import BaseSynonymExtractor, CachedSynonymExtractor
+
+
+class CountingSynonymExtractor(BaseSynonymExtractor):
+    def __init__(self):
+        self.calls: List[str] = []
+
+    @property
+    def name(self) -> str:
+        return "counting"
+
+    def get_synonyms(self, word: str) -> List[str]:
+        self.calls.append(word)
+        return [word + "_synonym"]
+
+
+def test_lru_cache() -> None:
+    """Test LRU eviction order and counters."""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions, info.maxsize, info.currsize) == (2, 1, 1, 2, 2)
+
+    cache.resize(1)
+    assert len(cache) == 1 and "c" in cache
+    assert cache.info().evictions == 2
+
+
+def test_cached_synonym_extractor() -> None:
+    """Test that repeated lookups hit the cache."""
+    extractor = CountingSynonymExtractor()
+    cached = CachedSynonymExtractor(extractor, maxsize=10)
+
+    for word in ["日本", "日本", "文章", "日本"]:
+        assert cached.get_synonyms(word) == [word + "_synonym"]
+
+    assert cached.name == "counting"
+    assert extractor.calls == ["日本", "文章"]
+    assert cached.cache_info().hits == 2
+    assert cached.cache_info().misses == 2
+
+
+def test_sqlite_synonym_cache(tmp_path) -> None:
+    """Test that the SQLite cache keeps synonyms between connections."""
+    path = str(tmp_path / "synonyms.sqlite")
+    cache = SQLiteSynonymCache(path)
+    assert cache.get("日本") is None
+    cache.put("日本", ["ジャパン", "日本国"])
+    cache.put("東京", [])
+    cache.close()
+
+    cache = SQLiteSynonymCache(path)
+    assert cache.get("日本") == ["ジャパン", "日本国"]
+    assert cache.get("東京") == []
+    assert "東京" in cache and "大阪" not in cache
+    assert len(cache) == 2
@@ -1,7 +1,19 @@
+import functools
+import random
+
 import pytest
-from eda import eda_english, eda_japanese
+from eda import (
+    GridConfig,
+    eda_english,
+    eda_english_batch,
+    eda_english_grid,
+    eda_japanese,
+    eda_japanese_batch,
+    eda_japanese_grid,
+    get_synonym_extractor,
+)
 from eda.tokenizer import SudachiTokenizer, MeCabTokenizer
-from eda.synonym_extractor import EXTRACTOR
+from eda.synonym_extractor import EXTRACTOR, BaseSynonymExtractor
 
 
 def test_eda():
@@ -50,3 +62,177 @@ def test_japanese_eda(synonym: str):
         assert type(sentence) == str
         # If the probability of random deletion is low, the sentence may be the same as the original sentence.
         # assert sentence != original_sentence
+
+
+def test_eda_batch():
+    """Test that eda_english_batch matches eda_english sentence by sentence."""
+    sentences = [
+        "It is a period of civil war.",
+        "Rebel spaceships, striking from a hidden base, have won their first victory against the evil Galactic Empire.",
+        "During the battle, rebel spies managed to steal secret plans.",
+    ]
+
+    random.seed(0)
+    expected = [eda_english(sentence) for sentence in sentences]
+    random.seed(0)
+    edit_batch = eda_english_batch(iter(sentences))
+
+    assert type(edit_batch) == list
+    assert edit_batch == expected
+
+
+def test_japanese_eda_batch():
+    """Test that eda_japanese_batch matches eda_japanese sentence by sentence."""
+    sentences = ["日本語の文章をテストします。", "吾輩は猫である。名前はまだ無い。"]
+    tokenizer = SudachiTokenizer()
+    synonym_extractor = get_synonym_extractor("sudachi", tokenizer)
+
+    random.seed(0)
+    expected = [eda_japanese(sentence, tokenizer, synonym_extractor) for sentence in sentences]
+    random.seed(0)
+    edit_batch = eda_japanese_batch(sentences, tokenizer, synonym_extractor)
+
+    assert edit_batch == expected
+
+
+@pytest.mark.parametrize("interned", [False, True])
+def test_japanese_homographs(interned: bool):
+    """Test that a homograph gets the synonyms of its own reading whatever the rest of its batch is."""
+    # 行っ is 行く (no synonyms) in the first sentence and 行う in the second
+    sentences = ["学校に行った。", "彼が行った研究です。"]
+    tokenizer = SudachiTokenizer()
+    synonym_extractor = get_synonym_extractor("sudachi", tokenizer)
+    augment = functools.partial(
+        eda_japanese_batch, tokenizer=tokenizer, synonym_extractor=synonym_extractor,
+        alpha_sr=0.5, alpha_ri=0, alpha_rs=0, p_rd=0, num_aug=8, interned=interned,
+    )
+
+    expected = eda_japanese(sentences[1], tokenizer, synonym_extractor, alpha_sr=0.5, alpha_ri=0, alpha_rs=0, p_rd=0, num_aug=8, rng=random.Random(0))
+    edit_batch = augment(sentences, rngs=[random.Random(1), random.Random(0)])
+
+    assert edit_batch[1] == expected
+    assert any("行った" not in sentence for sentence in expected)
+    assert edit_batch[1] == augment(sentences[1:], rngs=[random.Random(0)])[0]
+
+
+class FailingSynonymExtractor(BaseSynonymExtractor):
+    name = "failing"
+
+    def get_synonyms(self, word: str):
+        raise AssertionError(f"looked up {word}")
+
+
+@pytest.mark.parametrize("interned", [False, True])
+def test_no_synonym_lookups_without_sr_ri(monkeypatch, interned: bool):
+    """Test that batches without synonym replacement or insertion do not look up synonyms."""
+    import eda.eda
+
+    def fail(word):
+        raise AssertionError(f"looked up {word}")
+
+    monkeypatch.setattr(eda.eda, "get_synonyms", fail)
+    alphas = dict(alpha_sr=0, alpha_ri=0, alpha_rs=0.2, p_rd=0.2, num_aug=4, interned=interned)
+    sentences = [line.split("\t")[1] for line in open("data/sst2_train_500.txt").readlines()[:20]]
+    assert len(eda_english_batch(sentences, **alphas)[0]) == 5
+    assert len(eda_english(sentences[0], alpha_sr=0, alpha_ri=0, alpha_rs=0.2, p_rd=0.2, num_aug=4)) == 5
+    sentences = ["日本語の文章をテストします。", "吾輩は猫である。名前はまだ無い。"]
+    assert len(eda_japanese_batch(sentences, SudachiTokenizer(), FailingSynonymExtractor(), **alphas)[0]) == 4
+
+
+def test_random_insertion_candidates():
+    """Test that random insertion only picks words that have synonyms."""
+    from eda.eda import random_insertion
+
+    synonym_table = {"cat": [], "sat": ["seated"], "mat": [], "seated": []}
+    words = ["cat", "sat", "mat"]
+    new_words = random_insertion(words, 3, synonym_table)
+
+    assert len(new_words) == len(words) + 3
+    assert sorted(new_words) == sorted(words + ["seated"] * 3)
+
+
+def test_random_insertion_synonym_choice():
+    """Test that random insertion draws the inserted synonym instead of always taking the first one."""
+    from eda.eda import random_insertion
+
+    synonym_table = {"sat": ["perched", "posed", "seated"], "perched": [], "posed": [], "seated": []}
+    rng = random.Random(0)
+    inserted = {random_insertion(["sat"], 1, synonym_table, rng=rng)[0] for _ in range(50)} - {"sat"}
+
+    assert inserted == {"perched", "posed", "seated"}
+
+
+def test_synonym_replacement_all_occurrences():
+    """Test that synonym replacement substitutes every occurrence of a word."""
+    from eda.eda import synonym_replacement
+
+    synonym_table = {"the": ["a"], "dog": ["hot dog"], "chased": [], "cat": []}
+    words = ["the", "dog", "chased", "the", "dog"]
+    new_words = synonym_replacement(words, 1, synonym_table)
+
+    # "the" is a stop word, so only "dog" can be replaced
+    assert new_words == ["the", "hot", "dog", "chased", "the", "hot", "dog"]
+
+
+@pytest.mark.parametrize("lang", ["en", "ja"])
+def test_interned_eda_batch(lang: str):
+    """Test that interned mode produces the same augmentations as string mode."""
+    if lang == "en":
+        sentences = [line.split("\t")[1] for line in open("data/sst2_train_500.txt").readlines()[:20]]
+        augment = eda_english_batch
+    else:
+        sentences = ["日本語の文章をテストします。", "吾輩は猫である。名前はまだ無い。", "今日は良い天気ですね。"]
+        tokenizer = SudachiTokenizer()
+        augment = functools.partial(
+            eda_japanese_batch, tokenizer=tokenizer, synonym_extractor=get_synonym_extractor("sudachi", tokenizer)
+        )
+
+    random.seed(0)
+    expected = augment(sentences, num_aug=16)
+    random.seed(0)
+    edit_batch = augment(sentences, num_aug=16, interned=True)
+
+    assert edit_batch == expected
+
+
+@pytest.mark.parametrize("lang", ["en", "ja"])
+def test_eda_grid(lang: str):
+    """Test that each grid configuration matches a single-technique batch augmentation."""
+    configs = [GridConfig("sr", 0.1, 4), GridConfig("ri", 0.2, 2), GridConfig("rs", 0.1, 3), GridConfig("rd", 0.3, 1)]
+    if lang == "en":
+        sentences = [line.split("\t")[1] for line in open("data/sst2_train_500.txt").readlines()[:20]]
+        augment, augment_grid = eda_english_batch, eda_english_grid
+    else:
+        sentences = ["日本語の文章をテストします。", "吾輩は猫である。名前はまだ無い。", "今日は良い天気ですね。"]
+        tokenizer = SudachiTokenizer()
+        synonym_extractor = get_synonym_extractor("sudachi", tokenizer)
+        augment = functools.partial(eda_japanese_batch, tokenizer=tokenizer, synonym_extractor=synonym_extractor)
+        augment_grid = functools.partial(eda_japanese_grid, tokenizer=tokenizer, synonym_extractor=synonym_extractor)
+
+    random.seed(0)
+    expected = []
+    for config in configs:
+        alpha_sr, alpha_ri, alpha_rs, p_rd = config.alphas()
+        plans = [config.plan() for _ in sentences]
+        expected.append(augment(
+            sentences, alpha_sr=alpha_sr, alpha_ri=alpha_ri, alpha_rs=alpha_rs, p_rd=p_rd, num_aug=config.num_aug, plans=plans,
+        ))
+    random.seed(0)
+    grid = augment_grid(sentences, configs=configs)
+
+    assert grid == expected
+    for config, edit_batch in zip(configs, grid):
+        assert all(len(edit_sentences) == config.num_aug + (lang == "en") for edit_sentences in edit_batch)
+
+
+def test_lazy_imports():
+    """Test that English augmentation does not import the Japanese backends."""
+    import subprocess
+    import sys
+
+    code = (
+        "import sys; from eda import eda_english; eda_english('the quick brown fox'); "
+        "print(sorted(m for m in ('spacy', 'fugashi', 'sudachipy', 'requests') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,63 @@
+import pytest
+
+from eda.augment import build_eda_func, gen_eda
+from eda.formats import detect_format, read_chunks
+
+
+def read_records(path: str) -> list:
+    return [record for records, _ in read_chunks(path, 7) for record in records]
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("train.txt", ("tsv", None)),
+        ("train.tsv.gz", ("tsv", "gzip")),
+        ("train.jsonl.zst", ("jsonl", "zstd")),
+        ("train.parquet", ("parquet", None)),
+        ("train.arrow", ("arrow", None)),
+        ("-", ("tsv", None)),
+    ],
+)
+def test_detect_format(path, expected) -> None:
+    assert detect_format(path) == expected
+
+
+@pytest.mark.parametrize(
+    "extension, module",
+    [(".tsv.gz", None), (".jsonl", None), (".jsonl.zst", "zstandard"), (".parquet", "pyarrow"), (".arrow", "pyarrow")],
+)
+def test_output_formats(tmp_path, extension, module, make_input, aug_kwargs) -> None:
+    """Test that every output format holds the same augmented sentences as plain TSV."""
+    if module is not None:
+        pytest.importorskip(module)
+    input_file = make_input(120)
+    eda_func, _ = build_eda_func("en")
+    gen_eda(eda_func, input_file, str(tmp_path / "expected.txt"), **aug_kwargs)
+    output_file = str(tmp_path / ("eda" + extension))
+    gen_eda(eda_func, input_file, output_file, **aug_kwargs)
+
+    assert read_records(output_file) == read_records(str(tmp_path / "expected.txt"))
+    if extension == ".tsv.gz":
+        return
+    # the other formats can be read back as input, too
+    gen_eda(eda_func, output_file, str(tmp_path / "from_output.txt"), **aug_kwargs)
+    gen_eda(eda_func, str(tmp_path / "expected.txt"), str(tmp_path / "from_expected.txt"), **aug_kwargs)
+    assert open(tmp_path / "from_output.txt").read() == open(tmp_path / "from_expected.txt").read()
+
+
+def test_augmented_columns(tmp_path, make_input, aug_kwargs) -> None:
+    """Test the line id and technique columns of the augmented records."""
+    pa = pytest.importorskip("pyarrow")
+    input_file = make_input(120)
+    output_file = str(tmp_path / "eda.arrow")
+    eda_func, _ = build_eda_func("en")
+    gen_eda(eda_func, input_file, output_file, **aug_kwargs)
+
+    table = pa.ipc.open_file(output_file).read_all()
+    assert table.column_names == ["line_id", "label", "sentence", "technique"]
+    line_ids = table.column("line_id").to_pylist()
+    techniques = table.column("technique").to_pylist()
+    assert line_ids == [line_id for line_id in range(120) for _ in range(5)]
+    assert techniques[4::5] == ["orig"] * 120
+    assert set(techniques) == {"sr", "ri", "rs", "rd", "orig"}
@@ -1,5 +1,14 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Set, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
 import pytest
-from eda.synonym_extractor import EXTRACTOR
+from eda.augment import build_eda_func, gen_eda, prefetch_synonyms
+from eda.synonym_extractor import EXTRACTOR, ConceptNetSynonymExtractor
 from eda.tokenizer import SudachiTokenizer
 
 
@@ -20,3 +29,130 @@ def test_synonym_extractor(extractor: str) -> None:
 
     assert type(synonym_words) == list
     print(synonym_words)
+
+
+def test_synonyms_for_token() -> None:
+    """Test that sudachi looks up the synonyms of a token without tokenizing it again."""
+    tokenizer = SudachiTokenizer()
+    extractor = EXTRACTOR["sudachi"](tokenizer)
+    tokens = tokenizer.tokenize_tokens("日本の首都は東京です。")
+    expected = [extractor.get_synonyms(token.surface) for token in tokens]
+
+    tokenizer.get_synonym_group_ids = None  # any re-tokenization fails
+    assert [extractor.get_synonyms_for_token(token) for token in tokens] == expected
+    assert extractor.get_synonyms_for_token(tokens[0])
+
+
+class ConceptNetStandIn(BaseHTTPRequestHandler):
+    """Answer `/query` like the ConceptNet API from the synonym table of the server."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        server = self.server
+        query = parse_qs(urlsplit(self.path).query)
+        word = unquote(query["node"][0]).split("/")[-1]
+        with server.lock:
+            server.requests.append((word, self.client_address))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.delay)
+        with server.lock:
+            server.active -= 1
+        if word in server.failing:
+            self.send_json(500, {"error": "failing"})
+            return
+        edges = [
+            {
+                "start": {"term": f"/c/ja/{word}", "language": "ja"},
+                "end": {"term": f"/c/ja/{synonym}", "language": "ja"},
+            }
+            for synonym in server.synonyms.get(word, [])
+        ]
+        edges.append({"start": {"term": "/c/en/japan", "language": "en"}, "end": {"term": f"/c/ja/{word}", "language": "ja"}})
+        self.send_json(200, {"edges": edges})
+
+    def send_json(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def conceptnet_server() -> Iterator[ThreadingHTTPServer]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ConceptNetStandIn)
+    server.synonyms = {"日本": ["ジャパン", "日本国"], "東京": ["首都"]}
+    server.failing: Set[str] = set()
+    server.delay = 0.0
+    server.requests: List[Tuple[str, Tuple[str, int]]] = []
+    server.lock = threading.Lock()
+    server.active = server.max_active = 0
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_offline_synonym_cache(conceptnet_server, tmp_path) -> None:
+    """Test ConceptNet lookups on one connection, cached on disk and served offline."""
+    cache_path = os.path.join(tmp_path, "conceptnet.sqlite")
+    extractor = ConceptNetSynonymExtractor(conceptnet_server.url, cache_path)
+    assert extractor.get_synonyms("日本") == ["ジャパン", "日本国"]
+    assert extractor.get_synonyms("大阪") == []
+    assert extractor.get_synonyms("日本") == ["ジャパン", "日本国"]
+    extractor.close()
+
+    # Each word is fetched once, over one kept-alive connection
+    assert [word for word, _ in conceptnet_server.requests] == ["日本", "大阪"]
+    assert len({address for _, address in conceptnet_server.requests}) == 1
+
+    offline = ConceptNetSynonymExtractor(cache_path=cache_path, offline=True)
+    assert offline.get_synonyms("日本") == ["ジャパン", "日本国"]
+    assert offline.get_synonyms("東京") == []
+    with pytest.raises(ValueError):
+        ConceptNetSynonymExtractor(offline=True)
+
+
+def test_prefetch(conceptnet_server, tmp_path) -> None:
+    """Test that prefetching resolves a vocabulary concurrently, within the concurrency cap."""
+    conceptnet_server.delay = 0.05
+    conceptnet_server.failing.add("失敗")
+    words = ["日本", "東京", "大阪", "失敗"] + [f"単語{i}" for i in range(12)]
+    cache_path = os.path.join(tmp_path, "conceptnet.sqlite")
+    extractor = ConceptNetSynonymExtractor(conceptnet_server.url, cache_path, max_connections=4)
+    extractor.backoff_factor = 0.0
+    extractor.prefetch(words + ["日本"])
+
+    assert 1 <= conceptnet_server.max_active <= 4
+    assert sorted(extractor.prefetched) == sorted(set(words) - {"失敗"})
+    requested = len(conceptnet_server.requests)
+    assert extractor.get_synonyms("東京") == ["首都"]
+    assert len(conceptnet_server.requests) == requested  # served locally
+    extractor.close()
+
+    # The cached words are not requested again
+    extractor = ConceptNetSynonymExtractor(conceptnet_server.url, cache_path)
+    extractor.prefetch(["日本", "京都"])
+    assert [word for word, _ in conceptnet_server.requests[requested:]] == ["京都"]
+    assert extractor.get_synonyms("日本") == ["ジャパン", "日本国"]
+
+
+def test_prefetch_synonyms(conceptnet_server, tmp_path) -> None:
+    """Test that augmentation only does local lookups after prefetching the input vocabulary."""
+    input_path = os.path.join(tmp_path, "input.tsv")
+    with open(input_path, "w") as f:
+        f.write("0\t日本の首都は東京です。\n1\t東京は日本の首都です。\n")
+    eda_func, _ = build_eda_func(
+        "ja", tokenizer="mecab", synonym_extractor="conceptnet",
+        synonym_extractor_options=dict(base_url=conceptnet_server.url),
+    )
+    assert prefetch_synonyms(eda_func, input_path) == 7
+    requested = len(conceptnet_server.requests)
+    gen_eda(eda_func, input_path, os.path.join(tmp_path, "output.tsv"), 0.5, 0.5, 0.1, 0.1, num_aug=4, seed=1)
+    assert len(conceptnet_server.requests) == requested
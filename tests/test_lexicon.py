@@ -0,0 +1,109 @@
+import os
+
+import pytest
+from eda.lexicon import IdLexicon, Lexicon, compiled_path, user_cache_path, write_id_lexicon, write_lexicon
+from eda.sudachi_synonyms import SudachiSynonymIndex, load_synonym_groups
+from eda.wordnet_lexicon import WordNetLexicon, clean_lemma_name
+
+
+def test_lexicon(tmp_path) -> None:
+    """Test compiled lexicon round trip."""
+    entries = {
+        "dog": ["canis familiaris", "hound"],
+        "日本": ["にっぽん", "ジャパン"],
+        "one": [""],
+        "none": [],
+    }
+    path = str(tmp_path / "test.bin")
+    write_lexicon(path, entries)
+    lexicon = Lexicon(path)
+
+    assert len(lexicon) == len(entries)
+    assert sorted(lexicon) == sorted(entries)
+    for key, values in entries.items():
+        assert key in lexicon
+        assert lexicon.get(key) == values
+    assert "cat" not in lexicon
+    assert lexicon.get("cat") is None
+
+
+def test_compiled_path(tmp_path, monkeypatch) -> None:
+    """Test that lexicons are built in the user cache directory when the package directory is not writable."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    read_only = tmp_path / "site-packages" / "eda" / "resource"
+    read_only.mkdir(parents=True)
+    path = str(read_only / "test.bin")
+    cache_path = str(tmp_path / "cache" / "eda" / "test.bin")
+    assert user_cache_path(path) == cache_path
+
+    access = os.access
+    monkeypatch.setattr(os, "access", lambda path, mode: not str(path).startswith(str(tmp_path / "site-packages")) and access(path, mode))
+    built = []
+
+    def build(path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_lexicon(path, {"dog": ["hound"]})
+        built.append(path)
+
+    assert compiled_path(path, build) == cache_path
+    assert Lexicon(cache_path).get("dog") == ["hound"]
+    # the cached lexicon is reused
+    assert compiled_path(path, build) == cache_path
+    assert built == [cache_path]
+
+    writable = str(tmp_path / "writable" / "test.bin")
+    assert compiled_path(writable, build) == writable
+    assert built == [cache_path, writable]
+
+
+@pytest.mark.parametrize("word", ["dog", "dogs", "geese", "ran", "better", "one", "quickly", "the"])
+def test_wordnet_lexicon(word: str) -> None:
+    """Test that the compiled lexicon returns the same synonyms as WordNet."""
+    from nltk.corpus import wordnet
+
+    expected = set()
+    for synset in wordnet.synsets(word):
+        for lemma in synset.lemmas():
+            expected.add(clean_lemma_name(lemma.name()))
+    expected.discard(word)
+
+    synonyms = WordNetLexicon().get_synonyms(word)
+    assert type(synonyms) == list
+    assert set(synonyms) == expected
+
+
+def test_id_lexicon(tmp_path) -> None:
+    """Test compiled id lexicon round trip."""
+    entries = {1: ["曖昧", "あいまい"], 3: ["summary"], 4: []}
+    path = str(tmp_path / "test.bin")
+    write_id_lexicon(path, entries)
+    lexicon = IdLexicon(path)
+
+    assert len(lexicon) == 5
+    for id, values in entries.items():
+        assert lexicon.get(id) == values
+    assert lexicon.get(0) == []
+    assert lexicon.get(5) is None
+    assert lexicon.get(-1, []) == []
+
+
+def test_sudachi_synonym_index(tmp_path) -> None:
+    """Test that the compiled Sudachi index holds the same synonym groups as the text file."""
+    groups = load_synonym_groups()
+    index = SudachiSynonymIndex(str(tmp_path / "sudachi_synonyms.bin"))
+
+    assert len(index.lexicon) == max(groups) + 1
+    for group_id, synonyms in groups.items():
+        assert index.get_synonyms(group_id) == sorted(synonyms)
+
+
+def test_sudachi_synonym_index_cache(tmp_path, monkeypatch) -> None:
+    """Test that the Sudachi index is built in the user cache directory when the package directory is not writable."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    access = os.access
+    monkeypatch.setattr(os, "access", lambda path, mode: str(path) != str(tmp_path) and access(path, mode))
+    index = SudachiSynonymIndex(str(tmp_path / "sudachi_synonyms.bin"))
+
+    assert index.lexicon.path == str(tmp_path / "cache" / "eda" / "sudachi_synonyms.bin")
+    assert not os.path.exists(tmp_path / "sudachi_synonyms.bin")
+    assert len(index.lexicon) == max(load_synonym_groups()) + 1
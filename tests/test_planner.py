@@ -0,0 +1,51 @@
+import random
+from collections import Counter
+
+import pytest
+from eda.planner import TECHNIQUES, nested_counts, plan_augmentation
+
+
+@pytest.mark.parametrize("num_aug, techniques, expected", [
+    (9, TECHNIQUES, 9),
+    (16, TECHNIQUES, 16),
+    (9, ["sr"], 3),  # only int(9/4)+1 sentences per technique
+    (4, ["rs", "rd"], 4),
+])
+def test_plan_size(num_aug: int, techniques, expected: int) -> None:
+    """Test the number of planned sentences."""
+    plan = plan_augmentation(techniques, num_aug)
+    assert len(plan) == expected
+    assert set(plan) <= set(techniques)
+    assert max(Counter(plan).values()) <= int(num_aug / 4) + 1
+
+
+def test_plan_distribution() -> None:
+    """Test that the plan keeps the distribution of generate-then-truncate."""
+    rng = random.Random(0)
+    n_trials = 20000
+
+    # num_aug=2: two of the four techniques are drawn without replacement
+    counts = Counter()
+    for _ in range(n_trials):
+        counts.update(plan_augmentation(TECHNIQUES, 2, rng))
+    for technique in TECHNIQUES:
+        assert abs(counts[technique] / n_trials - 0.5) < 0.02
+
+    # num_aug<1: each of the four candidates is kept with probability num_aug/4
+    total = sum(len(plan_augmentation(TECHNIQUES, 0.5, rng)) for _ in range(n_trials))
+    assert abs(total / n_trials - 0.5) < 0.02
+
+
+def test_nested_counts() -> None:
+    """Test that nested counts grow with num_aug and have the expected mean."""
+    rng = random.Random(0)
+    num_augs = [0.125, 0.5, 1, 1.5, 2, 4]
+    n_trials = 20000
+    totals = [0] * len(num_augs)
+    for _ in range(n_trials):
+        counts = nested_counts(num_augs, rng)
+        assert counts == sorted(counts)
+        assert counts[2] == 1 and counts[4:] == [2, 4]
+        totals = [total + count for total, count in zip(totals, counts)]
+    for num_aug, total in zip(num_augs, totals):
+        assert abs(total / n_trials - num_aug) < 0.02
@@ -0,0 +1,73 @@
+import random
+import threading
+
+import pytest
+
+from eda import eda_english_batch
+from eda.augment import rng_kwargs
+from eda.client import EDAClient
+from eda.server import EDAService, make_server
+
+SENTENCES = ["It is a period of civil war.", "During the battle, rebel spies managed to steal secret plans."]
+
+
+@pytest.fixture(scope="module")
+def service() -> EDAService:
+    return EDAService(["en", "ja"])
+
+
+def serve(server) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_http_server(service) -> None:
+    """Test that the server augments like eda_english_batch with the same seed."""
+    random.seed(1)
+    state = random.getstate()
+    with make_server(service, port=0, quiet=True) as server:
+        serve(server)
+        with EDAClient(f"http://127.0.0.1:{server.server_port}") as client:
+            assert client.health() == {"status": "ok", "langs": ["en", "ja"]}
+            augmented = client.augment(SENTENCES, num_aug=4, seed=0)
+            # the connection is kept alive between requests
+            assert client.augment(SENTENCES, num_aug=4, seed=0) == augmented
+            with pytest.raises(RuntimeError):
+                client.augment(SENTENCES, lang="fr")
+        server.shutdown()
+
+    # seeded requests leave the global random state alone
+    assert random.getstate() == state
+    assert augmented == eda_english_batch(SENTENCES, num_aug=4, **rng_kwargs(0, 0, len(SENTENCES)))
+
+
+def test_server_errors(service, monkeypatch) -> None:
+    """Test that bad requests and failures are answered with JSON errors instead of dropped connections."""
+    def fail(sentences, **kwargs):
+        raise IndexError("string index out of range")
+
+    with make_server(service, port=0, quiet=True) as server:
+        serve(server)
+        with EDAClient(f"http://127.0.0.1:{server.server_port}") as client:
+            with pytest.raises(RuntimeError, match=r"\(400\).*sentences\[1\] has no words"):
+                client.augment([SENTENCES[0], ""])
+            monkeypatch.setitem(service.eda_funcs, "en", fail)
+            with pytest.raises(RuntimeError, match=r"\(500\).*IndexError"):
+                client.augment(SENTENCES)
+            monkeypatch.undo()
+            # the connection is still usable
+            assert len(client.augment(SENTENCES, num_aug=2)) == 2
+        server.shutdown()
+
+
+def test_unix_socket_server(service, tmp_path) -> None:
+    """Test Japanese augmentation over a Unix socket."""
+    socket_path = str(tmp_path / "eda.sock")
+    with make_server(service, socket_path=socket_path, quiet=True) as server:
+        serve(server)
+        with EDAClient(socket_path=socket_path) as client:
+            augmented = client.augment(["日本語の文章をテストします。"], lang="ja", num_aug=3)
+        server.shutdown()
+
+    assert len(augmented) == 1 and len(augmented[0]) == 3
@@ -16,3 +16,27 @@ def test_tokenizer(tokenizer: str) -> None:
 
     assert type(words) == list
     print(words)
+
+
+@pytest.mark.parametrize("tokenizer", ["sudachi", "mecab"])
+def test_tokenize_tokens(tokenizer: str) -> None:
+    """Test that tokens carry the words of `tokenize`."""
+    original_sentence = "日本語の文章をテストします。"
+    tokenizer = SudachiTokenizer() if tokenizer == "sudachi" else MeCabTokenizer()
+    tokens = tokenizer.tokenize_tokens(original_sentence)
+
+    assert [token.surface for token in tokens] == tokenizer.tokenize(original_sentence)
+    if tokenizer.name == "sudachi":
+        assert any(token.synonym_group_ids for token in tokens)
+
+
+@pytest.mark.parametrize("tokenizer", ["sudachi", "mecab"])
+def test_tokenize_batch(tokenizer: str) -> None:
+    """Test that bulk tokenization matches tokenizing one text at a time."""
+    texts = ["日本語の文章をテストします。", "", "東京に行きました。", "日本語の文章をテストします。", "学校に行った。", "彼が行った研究です。"]
+    tokenizer = SudachiTokenizer() if tokenizer == "sudachi" else MeCabTokenizer()
+    expected = [tokenizer.tokenize(text) for text in texts]
+
+    assert tokenizer.tokenize_batch(texts) == expected
+    # Homographs such as 行っ (行く and 行う) keep the synonym group ids of their own context
+    assert tokenizer.tokenize_tokens_batch(texts) == [tokenizer.tokenize_tokens(text) for text in texts]
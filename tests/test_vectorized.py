@@ -0,0 +1,73 @@
+import random
+
+import pytest
+from eda import eda_english_batch
+
+np = pytest.importorskip("numpy")
+from eda.vectorized import random_deletion_batch, random_swap_batch, uniform  # noqa: E402
+
+
+SENTENCES = [
+    ["neil", "burger", "here", "succeeded"],
+    ["it", "is", "a", "visual", "rorschach", "test"],
+    ["single"],
+    ["the", "only", "way", "to", "tolerate"],
+]
+
+
+def keys(counts, rng) -> list:
+    return [[rng.getrandbits(64) for _ in range(count)] for count in counts]
+
+
+def test_uniform() -> None:
+    """Test that the stream of a key is uniform and does not depend on the other keys."""
+    draws = uniform(np.array([1, 2**64 - 1], dtype=np.uint64), 10000)
+
+    assert draws.shape == (2, 10000)
+    assert ((0 <= draws) & (draws < 1)).all()
+    assert abs(draws.mean() - 0.5) < 0.01
+    assert (uniform(np.array([2**64 - 1], dtype=np.uint64), 100)[0] == draws[1, :100]).all()
+
+
+def test_random_deletion_batch() -> None:
+    """Test deletion masks and their edge cases."""
+    rng = random.Random(0)
+    counts = [3, 2, 4, 0]
+    variants = random_deletion_batch(SENTENCES, 0.5, keys(counts, rng))
+
+    assert [len(v) for v in variants] == counts
+    assert variants[2] == [["single"]] * 4  # single-word sentences are kept
+    for words, sentence_variants in zip(SENTENCES, variants):
+        for new_words in sentence_variants:
+            assert 1 <= len(new_words) <= len(words)
+            assert all(word in words for word in new_words)
+
+    # never delete every word
+    variants = random_deletion_batch(SENTENCES, 1.0, keys([5] * len(SENTENCES), rng))
+    assert all(len(new_words) == 1 for sentence_variants in variants for new_words in sentence_variants)
+
+
+def test_random_swap_batch() -> None:
+    """Test that swaps permute the words of each sentence."""
+    rng = random.Random(0)
+    counts = [2, 3, 2, 1]
+    variants = random_swap_batch(SENTENCES, [1, 2, 1, 1], keys(counts, rng))
+
+    assert [len(v) for v in variants] == counts
+    assert variants[2] == [["single"]] * 2
+    for words, sentence_variants in zip(SENTENCES, variants):
+        for new_words in sentence_variants:
+            assert sorted(new_words) == sorted(words)
+    assert any(new_words != SENTENCES[1] for new_words in variants[1])
+
+
+@pytest.mark.parametrize("interned", [False, True])
+def test_vectorized_eda_batch(interned: bool) -> None:
+    """Test eda_english_batch with the vectorized engine."""
+    sentences = ["It is a period of civil war.", "Rebels.", "They have won their first victory."]
+    edit_batch = eda_english_batch(sentences, alpha_sr=0, alpha_ri=0, num_aug=4, interned=interned, vectorized=True)
+
+    assert len(edit_batch) == len(sentences)
+    for edit_sentences in edit_batch:
+        assert len(edit_sentences) == 5
+        assert all(type(sentence) == str for sentence in edit_sentences)